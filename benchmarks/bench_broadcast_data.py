@@ -0,0 +1,61 @@
+"""
+Measures how many broadcast data frames per second BroadcastDataMessage decodes from a buffer,
+compared with the generic AbstractMessage.from_bytes path that unpacks every value of the frame
+
+Usage: python benchmarks/bench_broadcast_data.py
+"""
+import time
+from functools import reduce
+from operator import xor
+
+from lightuptraining.sources.antplus.messages.data_messages import BroadcastDataMessage
+from lightuptraining.sources.antplus.messages.message import AbstractMessage
+
+FRAMES = 100_000
+REPEAT = 5
+
+
+def _frame(channel_number: int, heart_rate: int) -> bytes:
+    frame = bytes([0xA4, 9, 0x4E, channel_number, 4, 0, 0, 0, 0x10, 0x20, 1, heart_rate])
+    return frame + bytes([reduce(xor, frame)])
+
+
+DATA = b''.join(_frame(i % 8, 60 + i % 100) for i in range(FRAMES))
+FRAME_SIZE = 13
+
+
+def generic():
+    from_bytes = AbstractMessage.from_bytes.__func__  # type: ignore
+
+    for offset in range(0, len(DATA), FRAME_SIZE):
+        from_bytes(BroadcastDataMessage, DATA, offset)
+
+
+def fast_path():
+    from_bytes = BroadcastDataMessage.from_bytes
+
+    for offset in range(0, len(DATA), FRAME_SIZE):
+        from_bytes(DATA, offset)
+
+
+def best_rate(func) -> float:
+    durations = []
+
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return FRAMES / min(durations)
+
+
+def main():
+    generic_rate = best_rate(generic)
+    fast_rate = best_rate(fast_path)
+    print(f'generic from_bytes:    {generic_rate:>12,.0f} frames/sec')
+    print(f'BroadcastDataMessage:  {fast_rate:>12,.0f} frames/sec')
+    print(f'speedup:               {fast_rate / generic_rate:>12.2f}x')
+
+
+if __name__ == '__main__':
+    main()
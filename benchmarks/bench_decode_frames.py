@@ -0,0 +1,51 @@
+"""
+Compares decoding a buffer of back-to-back frames one frame at a time, by slicing every
+frame and calling from_bytes, with decoding the whole buffer with decode_frames
+
+Usage: python benchmarks/bench_decode_frames.py
+"""
+import time
+
+from lightuptraining.sources.antplus.messages.decoder import decode_frame, decode_frames
+
+FRAMES = 100_000
+REPEAT = 5
+# Channel response (7 bytes) and set channel id (9 bytes) messages
+DATA = b'\xa4\x03@\x01K\x00\xad' * FRAMES
+
+
+def per_frame():
+    messages = []
+    offset = 0
+
+    while offset < len(DATA):
+        size = DATA[offset + 1] + 4
+        messages.append(decode_frame(DATA[offset:offset + size]))
+        offset += size
+
+
+def batch():
+    decode_frames(DATA)
+
+
+def best_rate(func) -> float:
+    durations = []
+
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return FRAMES / min(durations)
+
+
+def main():
+    per_frame_rate = best_rate(per_frame)
+    batch_rate = best_rate(batch)
+    print(f'per frame:      {per_frame_rate:>12,.0f} frames/sec')
+    print(f'decode_frames:  {batch_rate:>12,.0f} frames/sec')
+    print(f'speedup:        {batch_rate / per_frame_rate:>12.2f}x')
+
+
+if __name__ == '__main__':
+    main()
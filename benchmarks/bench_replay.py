@@ -0,0 +1,93 @@
+"""
+Replays a recorded session through the whole receive pipeline: read thread, ring buffer,
+frame assembler, message decoding and the scan mode source notifying an output
+
+The session is generated with extended broadcast data messages of 50 heart rate monitors,
+recorded in chunks of 64 bytes (one USB packet). Pass the path of a recorded session to
+replay that session instead.
+
+Usage: python benchmarks/bench_replay.py [session file]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.data_messages import BroadcastDataMessage
+from lightuptraining.sources.antplus.messages.util import calculate_checksum
+from lightuptraining.sources.antplus.profiles.const import DEVICE_TYPE_HEART_RATE
+from lightuptraining.sources.antplus.profiles.heart_rate_monitor import HeartRateMonitorProfile
+from lightuptraining.sources.antplus.scan_mode import ScanModeSource
+from lightuptraining.sources.antplus.usbdevice.replay import ReplayDevice
+from lightuptraining.sources.antplus.usbdevice.session import SessionRecorder
+
+FRAMES = 50_000
+SENSORS = 50
+CHUNK_SIZE = 64
+
+
+class CountingOutput:
+    def __init__(self):
+        self.count = 0
+
+    def notify(self, value):
+        self.count += 1
+
+
+def generate_session(path: str):
+    frames = bytearray()
+
+    for i in range(FRAMES):
+        device_number = 1000 + i % SENSORS
+        beat_count = (i // SENSORS) % 256
+        frame = [const.MESSAGE_SYNC, 14, const.MESSAGE_BROADCAST_DATA, 0, 0, 0, 0, 0, 0, 0, beat_count, 60,
+                 const.EXTENDED_FLAG_CHANNEL_ID, device_number & 0xFF, device_number >> 8, DEVICE_TYPE_HEART_RATE, 1]
+        frames += bytes(frame + [calculate_checksum(frame)])
+
+    with SessionRecorder(path) as recorder:
+        for offset in range(0, len(frames), CHUNK_SIZE):
+            recorder.record(frames[offset:offset + CHUNK_SIZE], timestamp=offset / 1_000_000)
+
+
+def replay(path: str):
+    device = ReplayDevice(path, realtime=False, read_depth=8)
+    source = ScanModeSource(device, HeartRateMonitorProfile([0] * 8))
+    output = CountingOutput()
+    source.attach_output(output)
+    messages = 0
+
+    start = time.perf_counter()
+    device.open()
+
+    while not device.finished:
+        for message in device.read_messages(0.01):
+            if isinstance(message, BroadcastDataMessage):
+                source.handle(message)
+
+            messages += 1
+
+    duration = time.perf_counter() - start
+    device.close()
+    source.dispatcher.join()
+    source.close()
+
+    print(f'messages:        {messages:>12,}')
+    print(f'notifications:   {output.count:>12,}')
+    print(f'sensors:         {len(source.sensors):>12,}')
+    print(f'throughput:      {messages / duration:>12,.0f} messages/sec')
+
+
+def main():
+    if len(sys.argv) > 1:
+        replay(sys.argv[1])
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'session.luts')
+        generate_session(path)
+        replay(path)
+
+
+if __name__ == '__main__':
+    main()
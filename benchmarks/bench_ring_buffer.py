@@ -0,0 +1,74 @@
+"""
+Compares the throughput of the previous per byte Queue with the RingBuffer
+
+A producer thread writes 64 byte chunks (one USB packet) while the consumer reads
+13 byte frames (the size of a broadcast data message), which mirrors how USBThread
+and USBDevice.read interact.
+
+Usage: python benchmarks/bench_ring_buffer.py
+"""
+import time
+from queue import Queue
+from threading import Thread
+from typing import Optional
+
+from lightuptraining.sources.antplus.usbdevice.buffer import RingBuffer
+
+CHUNK = bytes(range(64))
+CHUNKS = 20_000
+FRAME_SIZE = 13
+TOTAL = len(CHUNK) * CHUNKS
+
+
+def bench_queue() -> float:
+    queue: Queue[Optional[int]] = Queue()
+
+    def produce():
+        for _ in range(CHUNKS):
+            for byte in CHUNK:
+                queue.put(byte)
+
+    producer = Thread(target=produce)
+    start = time.perf_counter()
+    producer.start()
+
+    received = 0
+    while received + FRAME_SIZE <= TOTAL:
+        bytes([queue.get() for _ in range(FRAME_SIZE)])
+        received += FRAME_SIZE
+
+    producer.join()
+    return TOTAL / (time.perf_counter() - start)
+
+
+def bench_ring_buffer() -> float:
+    buffer = RingBuffer()
+
+    def produce():
+        for _ in range(CHUNKS):
+            buffer.put(CHUNK)
+
+    producer = Thread(target=produce)
+    start = time.perf_counter()
+    producer.start()
+
+    received = 0
+    while received + FRAME_SIZE <= TOTAL:
+        buffer.wait_for(FRAME_SIZE)
+        buffer.get(FRAME_SIZE)
+        received += FRAME_SIZE
+
+    producer.join()
+    return TOTAL / (time.perf_counter() - start)
+
+
+def main():
+    queue_rate = bench_queue()
+    ring_buffer_rate = bench_ring_buffer()
+    print(f'Queue (per byte):  {queue_rate:>14,.0f} bytes/sec')
+    print(f'RingBuffer:        {ring_buffer_rate:>14,.0f} bytes/sec')
+    print(f'speedup:           {ring_buffer_rate / queue_rate:>14.1f}x')
+
+
+if __name__ == '__main__':
+    main()
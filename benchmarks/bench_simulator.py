@@ -0,0 +1,75 @@
+"""
+Load tests the whole receive pipeline with a simulated device: read thread, ring buffer, frame
+assembler, message decoding and the scan mode source notifying an output
+
+The simulated device broadcasts extended data messages of heart rate monitors in scan mode, by
+default 400 sensors (about 10 times a large gym) at 4 times their normal rate, for 5 seconds.
+
+Usage: python benchmarks/bench_simulator.py [sensors] [rate multiplier] [seconds]
+"""
+import sys
+import time
+
+from lightuptraining.sources.antplus.messages.data_messages import BroadcastDataMessage
+from lightuptraining.sources.antplus.profiles.heart_rate_monitor import HeartRateMonitorProfile
+from lightuptraining.sources.antplus.scan_mode import ScanModeSource
+from lightuptraining.sources.antplus.usbdevice.device import USBDevice
+from lightuptraining.sources.antplus.usbdevice.simulator import SIMULATED_PRODUCT_ID, SIMULATED_VENDOR_ID, \
+    SimulatedDevice, VirtualHeartRateMonitor
+
+SENSORS = 400
+RATE_MULTIPLIER = 4
+DURATION = 5.0
+READ_DEPTH = 8
+
+
+class CountingOutput:
+    def __init__(self):
+        self.count = 0
+
+    def notify(self, value):
+        self.count += 1
+
+
+def main():
+    sensors = int(sys.argv[1]) if len(sys.argv) > 1 else SENSORS
+    multiplier = float(sys.argv[2]) if len(sys.argv) > 2 else RATE_MULTIPLIER
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else DURATION
+
+    simulator = SimulatedDevice([
+        VirtualHeartRateMonitor(1000 + i, heart_rate=60 + i % 120, rate=multiplier * 32768 / 8070)
+        for i in range(sensors)
+    ])
+    device = USBDevice(SIMULATED_VENDOR_ID, SIMULATED_PRODUCT_ID, device=simulator, read_depth=READ_DEPTH)
+    source = ScanModeSource(device, HeartRateMonitorProfile([0] * 8))
+    output = CountingOutput()
+    source.attach_output(output)
+    broadcasts = 0
+
+    device.open()
+    # The responses are resolved while reading, the scan mode channel is opened by the simulator right away
+    device.send_batch(source.configuration_messages())
+
+    start = time.perf_counter()
+
+    while time.perf_counter() - start < duration:
+        for message in device.read_messages(0.01):
+            if isinstance(message, BroadcastDataMessage):
+                source.handle(message)
+                broadcasts += 1
+
+    elapsed = time.perf_counter() - start
+    device.close()
+    source.dispatcher.join()
+    source.close()
+    sent = sum(sensor.broadcasts for sensor in simulator.sensors)
+
+    print(f'sensors:         {sensors:>12,}')
+    print(f'broadcasts sent: {sent:>12,}')
+    print(f'received:        {broadcasts:>12,}')
+    print(f'notifications:   {output.count:>12,}')
+    print(f'throughput:      {broadcasts / elapsed:>12,.0f} messages/sec')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Compares reading one packet per transfer (USBThread) with reading multiple packets
+per transfer into a preallocated buffer (BufferedUSBThread) for several read depths
+
+The fake endpoint has a fixed amount of 64 byte packets queued and every read costs a
+fixed overhead, which stands in for the time between transfers. A read returns as many
+queued packets as fit in the requested size.
+
+Usage: python benchmarks/bench_usb_read.py
+"""
+import array
+import time
+from typing import Union
+
+from lightuptraining.sources.antplus.usbdevice.buffer import RingBuffer
+from lightuptraining.sources.antplus.usbdevice.thread import BufferedUSBThread, USBThread
+
+PACKET_SIZE = 64
+PACKETS = 20_000
+TRANSFER_OVERHEAD = 0.00005  # seconds
+REPEAT = 5
+PACKET = bytes(range(PACKET_SIZE))
+
+
+class FakeEndpoint:
+    wMaxPacketSize = PACKET_SIZE  # noqa
+
+    def __init__(self):
+        self.packets = PACKETS
+
+    def read(self, size_or_buffer: Union[int, array.array]):
+        deadline = time.perf_counter() + TRANSFER_OVERHEAD
+
+        while time.perf_counter() < deadline:
+            pass
+
+        size = size_or_buffer if isinstance(size_or_buffer, int) else len(size_or_buffer)
+        packets = min(self.packets, size // PACKET_SIZE)
+        self.packets -= packets
+        data = PACKET * packets
+
+        if isinstance(size_or_buffer, int):
+            return array.array('B', data)
+
+        memoryview(size_or_buffer)[:len(data)] = data
+        return len(data)
+
+
+class FakeDevice:
+    is_open = False
+
+    def __init__(self):
+        self.endpoint_in = FakeEndpoint()
+
+    def close(self):
+        pass
+
+
+def best_rate(thread_class, depth: int) -> float:
+    durations = []
+
+    for _ in range(REPEAT):
+        thread = thread_class(FakeDevice(), depth * PACKET_SIZE, RingBuffer(PACKETS * PACKET_SIZE))
+        start = time.perf_counter()
+        thread.run()
+        durations.append(time.perf_counter() - start)
+
+    return PACKETS / min(durations)
+
+
+def main():
+    single_rate = best_rate(USBThread, 1)
+    print(f'USBThread (depth 1):          {single_rate:>12,.0f} packets/sec')
+
+    for depth in (1, 4, 8, 16):
+        rate = best_rate(BufferedUSBThread, depth)
+        print(f'BufferedUSBThread (depth {depth:>2}): {rate:>12,.0f} packets/sec  ({rate / single_rate:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
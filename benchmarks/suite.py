@@ -0,0 +1,283 @@
+"""
+Measures the hot paths of the ANT+ stack: checksums, decoding and encoding messages, the byte path from
+the USB read thread to USBDevice.read, and decoding profile data
+
+Every benchmark reports its throughput (best of REPEAT runs) and the memory it allocates, measured in a
+separate run with tracemalloc: the peak of the memory allocated during the run and the memory that is
+still allocated after the run, per operation.
+
+Results can be saved as a JSON baseline. When a baseline exists, the results are compared with it and the
+suite exits with status 1 when a benchmark is slower, or allocates more memory at its peak, than the
+baseline by more than the threshold. Baselines are machine specific, so save one on the machine the
+suite is checked on.
+
+Usage: python benchmarks/suite.py [--save] [--baseline PATH] [--threshold FRACTION] [--filter TEXT]
+"""
+import argparse
+import array
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.channel_response_message import ChannelResponseMessage
+from lightuptraining.sources.antplus.messages.configuration_messages import SetChannelIdMessage
+from lightuptraining.sources.antplus.messages.data_messages import BroadcastDataMessage
+from lightuptraining.sources.antplus.messages.decoder import decode_frame
+from lightuptraining.sources.antplus.messages.util import calculate_checksum
+from lightuptraining.sources.antplus.profiles.heart_rate_monitor import HeartRateMonitorProfile
+from lightuptraining.sources.antplus.usbdevice.device import USBDevice
+from lightuptraining.sources.antplus.usbdevice.simulator import SIMULATED_PRODUCT_ID, SIMULATED_VENDOR_ID, \
+    SimulatedDevice
+from lightuptraining.sources.antplus.usbdevice.thread import USBThread
+
+REPEAT = 5
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.25
+# Peak memory differences below this amount of bytes are noise, not a regression
+PEAK_MEMORY_SLACK = 1024
+
+
+def _frame(message_id: int, *content: int) -> bytes:
+    frame = bytes([const.MESSAGE_SYNC, len(content), message_id, *content])
+    return frame + bytes([calculate_checksum(frame)])
+
+
+# Data page 4 of a heart rate monitor
+PAYLOAD = (0x04, 0xFF, 0x00, 0x04, 0x00, 0x08, 0x02, 0x3C)
+BROADCAST_FRAME = _frame(const.MESSAGE_BROADCAST_DATA, 0, *PAYLOAD)
+EXTENDED_BROADCAST_FRAME = _frame(const.MESSAGE_BROADCAST_DATA, 0, *PAYLOAD,
+                                  const.EXTENDED_FLAG_CHANNEL_ID | const.EXTENDED_FLAG_RSSI,
+                                  0xE8, 0x03, 0x78, 0x01, 0x20, 0xC4, 0xA0)
+CHANNEL_RESPONSE_FRAME = _frame(const.MESSAGE_CHANNEL_RESPONSE, 1, const.MESSAGE_OPEN_CHANNEL, const.RESPONSE_NO_ERROR)
+# A USB packet holds 4 broadcast frames
+PACKET = BROADCAST_FRAME * 4
+
+
+class Benchmark(NamedTuple):
+    name: str
+    ops: int
+    setup: Callable[[], Callable[[], None]]
+
+
+class Result(NamedTuple):
+    ops_per_sec: float
+    peak_bytes: int
+    retained_bytes_per_op: float
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, ops: int):
+    """
+    Registers a benchmark, the decorated function returns the operation that is measured ops times per run
+    """
+    def register(setup: Callable[[], Callable[[], None]]) -> Callable[[], Callable[[], None]]:
+        BENCHMARKS.append(Benchmark(name, ops, setup))
+        return setup
+
+    return register
+
+
+@benchmark('calculate_checksum', ops=200_000)
+def checksum():
+    frame = BROADCAST_FRAME[:-1]
+    return lambda: calculate_checksum(frame)
+
+
+@benchmark('from_bytes.broadcast_data', ops=200_000)
+def broadcast_from_bytes():
+    return lambda: BroadcastDataMessage.from_bytes(BROADCAST_FRAME)
+
+
+@benchmark('from_bytes.extended_broadcast_data', ops=200_000)
+def extended_broadcast_from_bytes():
+    return lambda: BroadcastDataMessage.from_bytes(EXTENDED_BROADCAST_FRAME)
+
+
+@benchmark('from_bytes.channel_response', ops=200_000)
+def channel_response_from_bytes():
+    return lambda: ChannelResponseMessage.from_bytes(CHANNEL_RESPONSE_FRAME)
+
+
+@benchmark('decode_frame.broadcast_data', ops=200_000)
+def decode_broadcast_frame():
+    return lambda: decode_frame(BROADCAST_FRAME)
+
+
+@benchmark('encode.set_channel_id', ops=100_000)
+def encode():
+    return lambda: SetChannelIdMessage(1, 1000, 0x78, 1).encode()
+
+
+@benchmark('encode.set_channel_id.cached', ops=200_000)
+def encode_cached():
+    message = SetChannelIdMessage(1, 1000, 0x78, 1)
+    return message.encode
+
+
+@benchmark('profile.heart_rate_monitor.decode', ops=200_000)
+def decode_heart_rate():
+    profile = HeartRateMonitorProfile([0] * 8)
+    payload = bytes(PAYLOAD)
+    return lambda: profile.decode(payload)
+
+
+class PacketEndpoint:
+    """
+    Endpoint that returns the same USB packet for every read
+    """
+
+    def __init__(self):
+        self.packet = array.array('B', PACKET)
+
+    def read(self, size: int, timeout: Optional[int] = None) -> array.array:
+        return self.packet
+
+
+class PacketDevice:
+    is_open = True
+
+    def __init__(self):
+        self.endpoint_in = PacketEndpoint()
+
+    def close(self):
+        pass
+
+
+@benchmark('usb.read_thread_to_read', ops=50_000)
+def usb_read():
+    """
+    A packet is read by the read thread into the buffer of the device, and read by the device frame by frame
+    """
+    device = USBDevice(SIMULATED_VENDOR_ID, SIMULATED_PRODUCT_ID, device=SimulatedDevice())
+    device._is_open = True
+    thread = USBThread(PacketDevice(), len(PACKET), device._buffer)
+    frame_size = len(BROADCAST_FRAME)
+
+    def read():
+        thread._try_read()
+
+        for _ in range(4):
+            device.read(frame_size)
+
+    return read
+
+
+def measure(item: Benchmark) -> Result:
+    """
+    Runs the benchmark REPEAT times for the throughput, and once more with tracemalloc for the allocations
+    """
+    operation = item.setup()
+    iterations = range(item.ops)
+    durations = []
+
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+
+        for _ in iterations:
+            operation()
+
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    for _ in iterations:
+        operation()
+
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return Result(item.ops / min(durations), peak - before, (after - before) / item.ops)
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Dict[str, float]]]:
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as file:
+        return dict(json.load(file)['results'])
+
+
+def save_baseline(path: str, results: Dict[str, Result]):
+    """
+    Saves the results as baseline, the baseline of benchmarks that were not run is kept
+    """
+    saved = load_baseline(path) or {}
+    saved.update((name, dict(result._asdict())) for name, result in results.items())
+    baseline = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': saved,
+    }
+
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2)
+        file.write('\n')
+
+
+def compare(result: Result, baseline: Dict[str, float], threshold: float) -> Tuple[str, List[str]]:
+    """
+    Returns the change in throughput compared with the baseline and the regressions beyond the threshold
+    """
+    change = result.ops_per_sec / baseline['ops_per_sec'] - 1
+    regressions = []
+
+    if change < -threshold:
+        regressions.append(f'{-change:.0%} slower')
+
+    if result.peak_bytes > baseline['peak_bytes'] * (1 + threshold) + PEAK_MEMORY_SLACK:
+        regressions.append(f'peak memory {result.peak_bytes:,} bytes, baseline {baseline["peak_bytes"]:,.0f} bytes')
+
+    return f'{change:+.0%}', regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Performance benchmarks of the ANT+ stack')
+    parser.add_argument('--save', action='store_true', help='save the results as baseline')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='path of the JSON baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='fraction a benchmark may regress compared with the baseline')
+    parser.add_argument('--filter', default='', help='only run benchmarks with the text in their name')
+    args = parser.parse_args()
+
+    baseline = None if args.save else load_baseline(args.baseline)
+    results: Dict[str, Result] = {}
+    failures = []
+
+    print(f'{"benchmark":<36} {"ops/sec":>14} {"peak bytes":>12} {"retained/op":>12} {"baseline":>9}')
+
+    for item in BENCHMARKS:
+        if args.filter not in item.name:
+            continue
+
+        result = results[item.name] = measure(item)
+        change = ''
+
+        if baseline is not None and item.name in baseline:
+            change, regressions = compare(result, baseline[item.name], args.threshold)
+            failures.extend(f'{item.name}: {regression}' for regression in regressions)
+
+        print(f'{item.name:<36} {result.ops_per_sec:>14,.0f} {result.peak_bytes:>12,} '
+              f'{result.retained_bytes_per_op:>12.1f} {change:>9}')
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f'saved baseline to {args.baseline}')
+    elif baseline is None:
+        print(f'no baseline at {args.baseline}, run with --save to create one')
+
+    for failure in failures:
+        print(f'regression: {failure}', file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import concurrent.futures
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Mapping, Optional, Sequence, Set
+
+from lightuptraining.sources.antplus.messages.configuration_messages import ConfigurationMessage, \
+    SetNetworkKeyMessage
+from lightuptraining.sources.antplus.messages.message import AbstractMessage
+from lightuptraining.sources.antplus.profiles.profile import AbstractProfile
+from lightuptraining.sources.antplus.usbdevice.device import USBDevice
+
+
+class ChannelConfigurator:
+    """
+    Configures and opens channels on a USB device for profiles.
+
+    Instead of writing a configuration message and waiting for its response before writing the next
+    one, the configuration messages of all channels are sent in as few USB transfers as possible and
+    the responses are matched to the messages when they are read.
+    """
+
+    def __init__(self, device: USBDevice, network_number: int = 0):
+        self.device = device
+        self.network_number = network_number
+
+    def _messages(self, profiles: Mapping[int, AbstractProfile]) -> List[ConfigurationMessage]:
+        """
+        Returns the configuration messages of the channels, a network key is only sent once
+        """
+        messages: List[ConfigurationMessage] = []
+        network_keys: Set[bytes] = set()
+
+        for channel_number, profile in profiles.items():
+            for message in profile.configuration_messages(channel_number, self.network_number):
+                if isinstance(message, SetNetworkKeyMessage):
+                    encoded = message.encode()
+
+                    if encoded in network_keys:
+                        continue
+
+                    network_keys.add(encoded)
+
+                messages.append(message)
+
+        return messages
+
+    def configure(self, channel_number: int, profile: AbstractProfile) -> List[Future[AbstractMessage]]:
+        """
+        Sends the configuration messages of the profile for the channel and returns the futures of the responses
+        """
+        return self.configure_all({channel_number: profile})
+
+    def configure_all(self, profiles: Mapping[int, AbstractProfile]) -> List[Future[AbstractMessage]]:
+        """
+        Sends the configuration messages for all channels (channel number to profile) at once and returns
+        the futures of the responses
+        """
+        return self.device.send_batch(self._messages(profiles))
+
+    def wait(self, futures: Sequence[Future[AbstractMessage]], timeout: Optional[float] = None,
+             handler: Optional[Callable[[AbstractMessage], None]] = None) -> List[AbstractMessage]:
+        """
+        Reads messages from the device until all futures are resolved and returns the responses. If a handler
+        is provided, all messages read while waiting are passed to it.
+
+        The first error response is raised as ChannelResponseException, a concurrent.futures.TimeoutError
+        is raised when not all responses are received within the timeout (in seconds).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while not all(future.done() for future in futures):
+            remaining = None if deadline is None else deadline - time.monotonic()
+
+            if remaining is not None and remaining <= 0:
+                raise concurrent.futures.TimeoutError(
+                    f'received {sum(future.done() for future in futures)} of {len(futures)} channel responses')
+
+            # Wait for at most a short interval, so the deadline is checked regularly
+            messages = self.device.read_messages(0.01 if remaining is None else min(remaining, 0.01))
+
+            if handler is not None:
+                for message in messages:
+                    handler(message)
+
+        return [future.result() for future in futures]
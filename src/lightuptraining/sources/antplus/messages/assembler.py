@@ -0,0 +1,133 @@
+import logging
+from typing import List, Optional, Tuple, Union
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.util import calculate_checksum
+
+logger = logging.getLogger(__name__)
+
+Data = Union[bytes, bytearray, memoryview]
+
+
+class FrameAssembler:
+    """
+    Turns a stream of bytes into complete messages (frames), from the sync byte to the checksum.
+
+    Data can be fed in chunks of any size, a frame that is split over multiple chunks is kept
+    until it is complete. When a frame turns out to be corrupt (invalid length or checksum) its
+    sync byte was a data byte instead of the start of a frame, so only the sync byte is dropped and
+    the rest of the frame is searched again for the next sync byte. A frame is at most a few dozen
+    bytes, so every byte is still looked at a constant number of times.
+    """
+
+    def __init__(self, max_content_length: int = const.MESSAGE_MAX_CONTENT_LENGTH):
+        self.max_content_length = max_content_length
+        self.dropped_bytes = 0
+        self.checksum_errors = 0
+        self._frame = bytearray()
+        self._remaining = 0
+
+    def _add_length(self, length: int):
+        """
+        Adds the length byte to the frame that is currently being assembled, if the length is invalid
+        the sync byte is dropped. When the invalid length is a sync byte, it is used as start of a new frame
+        """
+        if length <= self.max_content_length:
+            self._frame.append(length)
+            self._remaining = length + 2  # message id, content and checksum
+            return
+
+        logger.debug(f'invalid message length {length}, searching for next sync byte')
+
+        if length == const.MESSAGE_SYNC:
+            self.dropped_bytes += 1
+            return
+
+        # The length byte is not a sync byte either, so both bytes are dropped
+        self.dropped_bytes += 2
+        self._frame.clear()
+
+    def _complete_frame(self, frames: List[bytes]) -> Optional[bytes]:
+        """
+        Validates the checksum of the assembled frame and adds it to the frames, returns the bytes after
+        the sync byte when the checksum does not match so they can be searched again
+        """
+        frame = bytes(self._frame)
+        self._frame.clear()
+
+        if calculate_checksum(frame[:-1]) != frame[-1]:
+            logger.debug(f'checksum did not match for frame {frame!r}, dropping sync byte')
+            self.checksum_errors += 1
+            self.dropped_bytes += 1
+            return frame[1:]
+
+        frames.append(frame)
+        return None
+
+    @staticmethod
+    def _find_sync(data: Data, position: int) -> Tuple[Data, int, int]:
+        """
+        Returns the data, the position and the position of the next sync byte in the data, or -1 if there is
+        none. A memoryview cannot be searched, so it is only copied when there are bytes between frames.
+        """
+        if data[position] == const.MESSAGE_SYNC:
+            return data, position, position
+
+        if isinstance(data, memoryview):
+            data, position = data[position:].tobytes(), 0
+
+        return data, position, data.find(const.MESSAGE_SYNC, position)
+
+    def _scan(self, data: Data, position: int, frames: List[bytes], pending: List[Tuple[Data, int]]):
+        """
+        Assembles frames from the data starting at the position. When a corrupt frame has to be searched
+        again, the rest of the data and the frame are added to the pending data and scanning stops.
+        """
+        size = len(data)
+
+        while position < size:
+            if not self._frame:
+                data, position, sync = self._find_sync(data, position)
+                size = len(data)
+
+                if sync == -1:
+                    self.dropped_bytes += size - position
+                    return
+
+                self.dropped_bytes += sync - position
+                self._frame.append(const.MESSAGE_SYNC)
+                position = sync + 1
+            elif len(self._frame) == 1:
+                self._add_length(data[position])
+                position += 1
+            else:
+                end = min(position + self._remaining, size)
+                self._frame += data[position:end]
+                self._remaining -= end - position
+                position = end
+
+                if not self._remaining:
+                    rescan = self._complete_frame(frames)
+
+                    if rescan is not None:
+                        pending += [(data, position), (rescan, 0)]
+                        return
+
+    def feed(self, data: Data) -> List[bytes]:
+        """
+        Adds the data to the assembler and returns all frames that were completed by the data
+        """
+        frames: List[bytes] = []
+        pending = [(data, 0)]
+
+        while pending:
+            self._scan(*pending.pop(), frames, pending)
+
+        return frames
+
+    def reset(self):
+        """
+        Drops the partially assembled frame
+        """
+        self._frame.clear()
+        self._remaining = 0
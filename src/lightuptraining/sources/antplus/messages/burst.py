@@ -0,0 +1,105 @@
+import logging
+from typing import List, Optional, Union
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.exceptions import BurstTransferException
+
+logger = logging.getLogger(__name__)
+
+
+class _BurstTransfer:
+    """
+    State of the burst transfer that is in progress on a channel
+    """
+    __slots__ = ('buffer', 'size', 'sequence_number')
+
+    def __init__(self, capacity: int):
+        self.buffer = bytearray(capacity)
+        self.size = 0
+        self.sequence_number = 0
+
+    def append(self, data: Union[bytes, bytearray, memoryview]):
+        """
+        Appends the data of a packet to the buffer, the buffer doubles in size when the data does not fit
+        """
+        end = self.size + len(data)
+
+        if end > len(self.buffer):
+            self.buffer.extend(bytes(max(len(self.buffer), end - len(self.buffer))))
+
+        self.buffer[self.size:end] = data
+        self.size = end
+
+
+class BurstReassembler:
+    """
+    Reassembles the packets of burst transfers (0x50) and advanced burst transfers (0x72) into complete transfers.
+
+    The first byte of a burst packet contains the channel number (bits 0-4), the sequence number (bits 5-6) and
+    a flag that marks the last packet (bit 7). The sequence number of the first packet is 0, the following
+    packets count 1, 2, 3, 1, 2, 3 and so on.
+
+    The data of every packet is copied into a preallocated buffer per channel, which grows when needed. When the
+    last packet of a transfer is received, the transfer is returned as a memoryview of that buffer and a new
+    buffer is used for the next transfer on the channel.
+    """
+
+    def __init__(self, initial_capacity: int = 64):
+        self.initial_capacity = initial_capacity
+        self._transfers: List[Optional[_BurstTransfer]] = [None] * (const.BURST_CHANNEL_NUMBER_MASK + 1)
+
+    def feed(self, frame: Union[bytes, bytearray, memoryview]) -> Optional[memoryview]:
+        """
+        Adds the packet in the (validated) frame to the burst transfer of its channel, and returns the
+        transfer when the frame contains the last packet.
+
+        Raises a BurstTransferException when a packet is missing, the transfer of the channel is then dropped
+        """
+        length = frame[1]
+        message_id = frame[2]
+        sequence_byte = frame[3]
+
+        if message_id == const.MESSAGE_BURST_TRANSFER_DATA:
+            data = frame[4:4 + const.BURST_PACKET_SIZE]
+        elif message_id == const.MESSAGE_ADVANCED_BURST_DATA:
+            data = frame[4:3 + length]
+        else:
+            raise ValueError(f'message id {message_id:#04x} is not a burst transfer message')
+
+        channel_number = sequence_byte & const.BURST_CHANNEL_NUMBER_MASK
+        sequence_number = (sequence_byte & const.BURST_SEQUENCE_NUMBER_MASK) >> 5
+        transfer = self._transfers[channel_number]
+
+        if sequence_number == 0:
+            if transfer is not None:
+                logger.debug(f'burst transfer on channel {channel_number} restarted before it was completed')
+
+            transfer = self._transfers[channel_number] = _BurstTransfer(self.initial_capacity)
+        elif transfer is None or sequence_number != transfer.sequence_number % 3 + 1:
+            expected = 0 if transfer is None else transfer.sequence_number % 3 + 1
+            self._transfers[channel_number] = None
+            raise BurstTransferException(channel_number, expected, sequence_number)
+
+        transfer.append(data)
+        transfer.sequence_number = sequence_number
+
+        if not sequence_byte & const.BURST_LAST_PACKET_MASK:
+            return None
+
+        self._transfers[channel_number] = None
+        return memoryview(transfer.buffer)[:transfer.size]
+
+    def in_progress(self, channel_number: int) -> bool:
+        """
+        Checks if a burst transfer is in progress on the channel
+        """
+        return self._transfers[channel_number] is not None
+
+    def reset(self, channel_number: Optional[int] = None):
+        """
+        Drops the burst transfer in progress on the channel, or on all channels if no channel number is provided
+        """
+        if channel_number is None:
+            self._transfers = [None] * len(self._transfers)
+        else:
+            self._transfers[channel_number] = None
@@ -6,6 +6,8 @@ from lightuptraining.sources.antplus.messages.message import AbstractMessage, Me
 
 
 class ChannelResponseMessage(AbstractMessage):
+    __slots__ = ('response_channel_id', 'response_message_id', 'response_message_code')
+
     message_id = 0x40
     encoding_format = '<BBBBBBB'
 
@@ -14,6 +16,20 @@ class ChannelResponseMessage(AbstractMessage):
         self.response_message_id = response_message_id
         self.response_message_code = response_message_code
 
+    @property
+    def channel_number(self) -> int:
+        """
+        Returns the channel number the response or event is sent for
+        """
+        return self.response_channel_id
+
+    @property
+    def is_event(self) -> bool:
+        """
+        Checks if the message is a channel event instead of a response to a sent message
+        """
+        return self.response_message_id == const.CHANNEL_EVENT_MESSAGE_ID
+
     @property
     def response_no_error(self) -> bool:
         """
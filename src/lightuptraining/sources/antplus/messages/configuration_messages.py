@@ -2,11 +2,11 @@ from __future__ import annotations
 
 import struct
 from abc import ABC
-from typing import List, Tuple, Type
+from typing import List, Optional, Tuple, Union
 
 from lightuptraining.sources.antplus.messages import const
 from lightuptraining.sources.antplus.messages.const import MESSAGE_OPEN_RX_SCAN_MODE, MESSAGE_RESET_SYSTEM
-from lightuptraining.sources.antplus.messages.message import AbstractMessage, MessageData, T
+from lightuptraining.sources.antplus.messages.message import AbstractMessage, MessageData
 from lightuptraining.sources.antplus.messages.util import (calculate_checksum, device_number_to_fields,
                                                            validate_device_number, validate_device_type,
                                                            set_pairing_bit_on_device_type, fields_to_device_number,
@@ -17,10 +17,18 @@ class ConfigurationMessage(AbstractMessage, ABC):
     """
     Configuration messages are used to modify channels (assign, unassign, open, close)
     and configure them for required operations
+
+    The encoded message is cached after the first call to encode, until a new content list is
+    assigned. Changing the content list in place does not clear the cache, so assign a new list
+    instead.
     """
+    __slots__ = ('content', '_encoded', '_encoded_content')
+
     message_id: int
     encoding_format: str
     content: List[int]
+    _encoded: bytes
+    _encoded_content: Optional[List[int]]
 
     @property
     def _message_without_checksum(self) -> Tuple[int, ...]:
@@ -44,7 +52,24 @@ class ConfigurationMessage(AbstractMessage, ABC):
         """
         Uses the encoding format of the configuration message to pack the message into bytes
         """
-        return struct.pack(self.encoding_format, *self.decode())
+        # The content list the cached message was encoded from, compared by identity
+        if getattr(self, '_encoded_content', None) is not self.content:
+            self._encoded = self._get_struct(len(self.content) + 4).pack(*self.decode())
+            self._encoded_content = self.content
+
+        return self._encoded
+
+    def encode_into(self, buffer: Union[bytearray, memoryview], offset: int = 0) -> int:
+        """
+        Packs the message into the buffer, starting at offset, and returns the amount of bytes written
+        """
+        encoded = self.encode()
+
+        if offset + len(encoded) > len(buffer):
+            raise ValueError(f'buffer too small for message {type(self).__name__} at offset {offset}')
+
+        buffer[offset:offset + len(encoded)] = encoded
+        return len(encoded)
 
     def decode(self) -> Tuple[int, ...]:
         """
@@ -52,11 +77,21 @@ class ConfigurationMessage(AbstractMessage, ABC):
         """
         return self._message_without_checksum + (self.checksum,)
 
+    @property
+    def response_message_id(self) -> int:
+        """
+        Returns the message id of the response to this message, which is a channel response for the message
+        itself unless the message requests another message
+        """
+        return self.message_id
+
 
 class UnassignChannelMessage(ConfigurationMessage):
     """
     Message for unassigning a channel
     """
+    __slots__ = ('channel_number',)
+
     message_id = const.MESSAGE_UNASSIGN_CHANNEL
     encoding_format = '<BBBBB'
 
@@ -74,6 +109,8 @@ class AssignChannelMessage(ConfigurationMessage):
     """
     Message for assigning a channel
     """
+    __slots__ = ('channel_number',)
+
     message_id = const.MESSAGE_ASSIGN_CHANNEL
     encoding_format = '<BBBBBBB'
 
@@ -91,6 +128,8 @@ class CloseChannelMessage(ConfigurationMessage):
     """
     Message for closing a channel
     """
+    __slots__ = ('channel_number',)
+
     message_id: int = const.MESSAGE_CLOSE_CHANNEL
     encoding_format = '<BBBBB'
 
@@ -108,6 +147,8 @@ class EnableExtendedMessagesMessage(ConfigurationMessage):
     """
     Enables receiving extended broadcast messages
     """
+    __slots__ = ()
+
     message_id = const.MESSAGE_ENABLE_EXT_RX_MESSAGES
     encoding_format = '<BBBBBB'
 
@@ -125,6 +166,8 @@ class OpenChannelMessage(ConfigurationMessage):
     """
     Message for opening a channel
     """
+    __slots__ = ('channel_number',)
+
     message_id: int = const.MESSAGE_OPEN_CHANNEL
     encoding_format = '<BBBBB'
 
@@ -139,70 +182,73 @@ class OpenChannelMessage(ConfigurationMessage):
 
 
 class OpenRxScanModeMessage(ConfigurationMessage):
+    __slots__ = ('channel_number',)
+
     message_id: int = MESSAGE_OPEN_RX_SCAN_MODE
     encoding_format = '<BBBBB'
+    variable_encoding_formats = ('<BBBBBB',)
 
     def __init__(self, channel_number: int, synchronous_packages_only: bool = False):
         self.channel_number = channel_number
         if synchronous_packages_only:
-            self.encoding_format = '<BBBBBB'
             self.content = [channel_number, int(synchronous_packages_only)]
         else:
             self.content = [channel_number]
 
     @classmethod
-    def from_bytes(cls: Type[T], data: bytes) -> T:
-        encoding_format = cls.encoding_format
-
-        if len(data) == 6:
-            encoding_format = '<BBBBBB'
+    def _from_message(cls, message: MessageData):
+        length = message.length
+        content = message.content
+        channel_number = content[0]
 
-        values = struct.unpack(encoding_format, data)
+        if length == 2:
+            synchronous_packages_only = bool(content[1])
+            return cls(channel_number, synchronous_packages_only)
 
-        sync_byte = values[0]
-        message_length = values[1]
-        message_id = values[2]
-        content = tuple([int(value) for value in values[3:-1]])
-        checksum = values[-1]
+        return cls(channel_number)
 
-        message = [sync_byte, message_length, message_id, *content]
 
-        if not message_id == cls.message_id:
-            raise ValueError(
-                f'message id did not match for message {cls.__name__}, got {message} expected {cls.message_id}')
+class RequestMessage(ConfigurationMessage):
+    """
+    Message for requesting a message from the device, for example the capabilities of the device
+    """
+    __slots__ = ('channel_number', 'requested_message_id')
 
-        if not checksum == calculate_checksum(message):
-            raise ValueError(f'checksum did not match for message {cls.__name__}')
+    message_id: int = const.MESSAGE_REQUEST_MESSAGE
+    encoding_format = '<BBBBBB'
 
-        if not message_length == len(content):
-            raise ValueError(f'content length did not match for message {cls.__name__}')
+    def __init__(self, channel_number: int, requested_message_id: int):
+        self.channel_number = channel_number
+        self.requested_message_id = requested_message_id
+        self.content = [channel_number, requested_message_id]
 
-        message_data = MessageData(sync_byte, message_length, message_id, content, checksum)
-        return cls._from_message(message_data)
+    @property
+    def response_message_id(self) -> int:
+        return self.requested_message_id
 
     @classmethod
     def _from_message(cls, message: MessageData):
-        length = message.length
         content = message.content
-        channel_number = content[0]
-
-        if length == 2:
-            synchronous_packages_only = bool(content[1])
-            return cls(channel_number, synchronous_packages_only)
-
-        return cls(channel_number)
+        return cls(content[0], content[1])
 
 
 class SystemResetMessage(ConfigurationMessage):
     """
-    Message for resetting the system
+    Message for resetting the system, the device does not send a channel response but a start-up message
+    once it is reset
     """
+    __slots__ = ()
+
     message_id: int = MESSAGE_RESET_SYSTEM
     encoding_format = '<BBBBB'
 
     def __init__(self):
         self.content = [0]
 
+    @property
+    def response_message_id(self) -> int:
+        return const.MESSAGE_START_UP_MESSAGE
+
     @classmethod
     def _from_message(cls, message: MessageData):
         return cls()
@@ -219,6 +265,8 @@ class SetChannelIdMessage(ConfigurationMessage):
     you first shift the number 8 places to the right (1000 >> 8) which leaves 0b11.
     You then use the XOR of the res
     """
+    __slots__ = ('channel_number',)
+
     message_id: int = const.MESSAGE_CHANNEL_ID
     encoding_format: str = '<BBBBBBBBB'
 
@@ -247,20 +295,23 @@ class SetChannelPeriodMessage(ConfigurationMessage):
     """
     Message for setting channel period
     """
+    __slots__ = ('channel_number',)
+
     message_id: int = const.MESSAGE_CHANNEL_PERIOD
     encoding_format = '<BBBBBBB'
+    _channel_period_struct = struct.Struct('<H')
 
     def __init__(self, channel_number: int, channel_period: int):
         self.channel_number = channel_number
         content = bytearray([channel_number, ])
-        content[1:3] = struct.pack('<H', channel_period)
+        content[1:3] = self._channel_period_struct.pack(channel_period)
         self.content = [byte for byte in content]
 
     @classmethod
     def _from_message(cls, message: MessageData):
         content = message.content
         channel_number = content[0]
-        channel_period = struct.unpack('<H', bytes(content[1:3]))[0]
+        channel_period = cls._channel_period_struct.unpack(bytes(content[1:3]))[0]
         return cls(channel_number, channel_period)
 
 
@@ -268,6 +319,8 @@ class SetSearchTimeoutMessage(ConfigurationMessage):
     """
     Message for setting search timeout on the channel
     """
+    __slots__ = ('channel_number',)
+
     message_id: int = const.MESSAGE_CHANNEL_SEARCH_TIMEOUT
     encoding_format = '<BBBBBB'
 
@@ -287,6 +340,8 @@ class SetNetworkKeyMessage(ConfigurationMessage):
     """
     Message for setting network key on the channel
     """
+    __slots__ = ('channel_number',)
+
     message_id: int = const.MESSAGE_SET_NETWORK_KEY
     encoding_format = '<BBBBBBBBBBBBB'
 
@@ -306,6 +361,8 @@ class SetRfFrequencyMessage(ConfigurationMessage):
     """
     Message for setting RF frequency for the channel
     """
+    __slots__ = ('channel_number',)
+
     message_id: int = const.MESSAGE_CHANNEL_RF_FREQUENCY
     encoding_format = '<BBBBBB'
 
@@ -325,6 +382,8 @@ class SetTransmissionPowerMessage(ConfigurationMessage):
     """
     Message for setting transmit power on the channel
     """
+    __slots__ = ('channel_number',)
+
     message_id: int = const.MESSAGE_SET_CHANNEL_TRANSMIT_POWER
     encoding_format = '<BBBBBB'
 
@@ -1,5 +1,6 @@
 MESSAGE_SYNC = 0xA4  # 10100100 (most significant byte, msg)
 MESSAGE_SYNC_LSB = 0xA5  # 10100101 (least significant byte, lsb)
+MESSAGE_MAX_CONTENT_LENGTH = 0x29  # 41, largest content length of a single message
 
 # Configuration message ids
 MESSAGE_UNASSIGN_CHANNEL = 0x41
@@ -44,6 +45,14 @@ MESSAGE_SET_USB_DESCRIPTOR_STRING = 0xC7
 MESSAGE_START_UP_MESSAGE = 0x6F
 MESSAGE_SERIAL_ERROR_MESSAGE = 0xAE
 
+# Start-up message reasons, a power on reset has no bits set
+STARTUP_POWER_ON_RESET = 0x00
+STARTUP_HARDWARE_RESET_LINE = 0x01
+STARTUP_WATCH_DOG_RESET = 0x02
+STARTUP_COMMAND_RESET = 0x20
+STARTUP_SYNCHRONOUS_RESET = 0x40
+STARTUP_SUSPEND_RESET = 0x80
+
 # Control message ids
 MESSAGE_RESET_SYSTEM = 0x4A
 MESSAGE_OPEN_CHANNEL = 0x4B
@@ -84,7 +93,19 @@ MESSAGE_EXTENDED_BROADCAST_DATA = 0x5D
 MESSAGE_EXTENDED_ACKNOWLEDGED_DATA = 0x5E
 MESSAGE_EXTENDED_BURST_DATA = 0x5F
 
+# Extended data flags, the flag byte follows the 8 byte payload of a flagged extended data message
+EXTENDED_FLAG_CHANNEL_ID = 0x80  # device number (2 bytes), device type and transmission type
+EXTENDED_FLAG_RSSI = 0x40  # measurement type, RSSI value and threshold
+EXTENDED_FLAG_RX_TIMESTAMP = 0x20  # rx timestamp (2 bytes)
+
+# Burst transfer packets, the first content byte holds the channel number, sequence number and last packet flag
+BURST_CHANNEL_NUMBER_MASK = 0x1F
+BURST_SEQUENCE_NUMBER_MASK = 0x60
+BURST_LAST_PACKET_MASK = 0x80
+BURST_PACKET_SIZE = 8  # data bytes per (legacy) burst packet
+
 # Channel response constants
+CHANNEL_EVENT_MESSAGE_ID = 0x01  # message id in a channel response message for RF events, instead of a message id
 RESPONSE_NO_ERROR = 0x00
 EVENT_RX_SEARCH_TIMEOUT = 0x01
 EVENT_RX_FAIL = 0x02
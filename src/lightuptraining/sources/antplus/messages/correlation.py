@@ -0,0 +1,96 @@
+from collections import deque
+from concurrent.futures import Future
+from threading import Lock
+from typing import Deque, Dict, Tuple
+
+from lightuptraining.sources.antplus.messages.channel_response_message import ChannelResponseMessage
+from lightuptraining.sources.antplus.messages.exceptions import ChannelResponseException
+from lightuptraining.sources.antplus.messages.message import AbstractMessage
+
+
+def response_key(message: AbstractMessage) -> Tuple[int, int]:
+    """
+    Returns the key (channel number, message id) of the message a received message responds to.
+
+    A channel response message contains the channel number and message id of the message it acknowledges.
+    Other messages, like requested messages, respond to a request for their own message id.
+    """
+    if isinstance(message, ChannelResponseMessage):
+        return message.response_channel_id, message.response_message_id
+
+    return getattr(message, 'channel_number', 0), message.message_id
+
+
+class ResponseCorrelator:
+    """
+    Matches received responses to the messages that were sent, using futures.
+
+    For every sent message a future is registered with the channel number and message id of the expected
+    response. When the response is received, the oldest pending future with the same key is resolved, or gets
+    a ChannelResponseException when the response message code is not RESPONSE_NO_ERROR. This allows sending
+    multiple messages without waiting for each response.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._pending: Dict[Tuple[int, int], Deque[Future[AbstractMessage]]] = {}
+
+    def __len__(self) -> int:
+        """
+        Returns the amount of futures that are still waiting for a response
+        """
+        with self._lock:
+            return sum(not future.done() for futures in self._pending.values() for future in futures)
+
+    def expect(self, channel_number: int, message_id: int) -> Future[AbstractMessage]:
+        """
+        Registers and returns a future that is resolved when a response for the channel number and message id
+        is received
+        """
+        future: Future[AbstractMessage] = Future()
+
+        with self._lock:
+            self._pending.setdefault((channel_number, message_id), deque()).append(future)
+
+        return future
+
+    def resolve(self, message: AbstractMessage) -> bool:
+        """
+        Resolves the oldest pending future that expects the message, returns False if no future expects it
+        """
+        key = response_key(message)
+
+        with self._lock:
+            futures = self._pending.get(key)
+
+            # Skip futures that are already done, for example because sending their message failed
+            while futures and futures[0].done():
+                futures.popleft()
+
+            if not futures:
+                return False
+
+            future = futures.popleft()
+
+        try:
+            if isinstance(message, ChannelResponseMessage):
+                message.raise_for_message_code()
+        except ChannelResponseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(message)
+
+        return True
+
+    def cancel_all(self, exception: Exception):
+        """
+        Sets the exception on all pending futures
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+
+        for futures in pending.values():
+            for future in futures:
+                if not future.done():
+                    future.set_exception(exception)
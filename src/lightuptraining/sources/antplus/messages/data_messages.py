@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from typing import Optional, Sequence, Tuple, Union
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.message import AbstractMessage, MessageData
+from lightuptraining.sources.antplus.messages.util import calculate_checksum
+
+
+def _extended_content_length(flags: int) -> int:
+    """
+    Returns the content length of a flagged extended data message with the provided flags
+    """
+    length = 10  # channel number, payload and flag byte
+
+    if flags & const.EXTENDED_FLAG_CHANNEL_ID:
+        length += 4
+
+    if flags & const.EXTENDED_FLAG_RSSI:
+        length += 3
+
+    if flags & const.EXTENDED_FLAG_RX_TIMESTAMP:
+        length += 2
+
+    return length
+
+
+class BroadcastDataMessage(AbstractMessage):
+    """
+    Data message broadcast by the master of a channel, contains the channel number and an 8 byte payload
+
+    When extended messages are enabled, the payload is followed by a flag byte and the extended data
+    indicated by the flags: the channel id of the sensor (device number, device type and transmission type),
+    the RSSI and the rx timestamp. Fields that are not present are None.
+    """
+    __slots__ = ('channel_number', 'payload', 'device_number', 'device_type', 'transmission_type', 'rssi',
+                 'rx_timestamp')
+
+    message_id = const.MESSAGE_BROADCAST_DATA
+    encoding_format = '<BBBBBBBBBBBBB'
+    # Every combination of extended data flags, including the flag byte without extended data
+    variable_encoding_formats = tuple(
+        '<' + 'B' * (_extended_content_length(flags) + 4)
+        for flags in range(0, 0x100, const.EXTENDED_FLAG_RX_TIMESTAMP)
+    )
+
+    def __init__(self, channel_number: int, payload: bytes, device_number: Optional[int] = None,
+                 device_type: Optional[int] = None, transmission_type: Optional[int] = None,
+                 rssi: Optional[int] = None, rx_timestamp: Optional[int] = None):
+        self.channel_number = channel_number
+        self.payload = payload
+        self.device_number = device_number
+        self.device_type = device_type
+        self.transmission_type = transmission_type
+        self.rssi = rssi
+        self.rx_timestamp = rx_timestamp
+
+    @property
+    def channel_id(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Returns the channel id (device type, device number, transmission type) of the sensor that sent
+        the message, if it was included in the extended data
+        """
+        if self.device_number is None:
+            return None
+
+        return self.device_type, self.device_number, self.transmission_type  # type: ignore
+
+    @classmethod
+    def _decode(cls, content: Sequence[int], start: int, length: int) -> BroadcastDataMessage:
+        """
+        Creates an instance of the class from the content of a validated message, which starts
+        at start in the provided sequence of ints
+        """
+        channel_number = content[start]
+        payload = bytes(content[start + 1:start + 9])
+
+        if length == 9:
+            return cls(channel_number, payload)
+
+        flags = content[start + 9]
+        position = start + 10
+        device_number = device_type = transmission_type = rssi = rx_timestamp = None
+
+        if flags & const.EXTENDED_FLAG_CHANNEL_ID:
+            device_number = content[position] | content[position + 1] << 8
+            device_type = content[position + 2] & 0x7F  # the most significant bit is the pairing bit
+            transmission_type = content[position + 3]
+            position += 4
+
+        if flags & const.EXTENDED_FLAG_RSSI:
+            rssi = content[position + 1]
+            rssi = rssi - 0x100 if rssi & 0x80 else rssi  # signed value in dBm
+            position += 3
+
+        if flags & const.EXTENDED_FLAG_RX_TIMESTAMP:
+            rx_timestamp = content[position] | content[position + 1] << 8
+
+        return cls(channel_number, payload, device_number, device_type, transmission_type, rssi, rx_timestamp)
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview], offset: Optional[int] = None) -> BroadcastDataMessage:
+        """
+        Decodes the message in the provided bytes, like AbstractMessage.from_bytes the data must be exactly one
+        message unless an offset is provided.
+
+        Broadcast data is by far the most received message, so instead of unpacking all values of the
+        message, the checksum is validated over the frame and the fields are read directly from the data.
+        A ValueError is raised when the message is invalid.
+        """
+        start = 0 if offset is None else offset
+
+        if len(data) - start < 4:
+            raise ValueError(f'data size {len(data) - start} too small for message {cls.__name__}')
+
+        length = data[start + 1]
+        end = start + length + 3
+
+        if data[start + 2] != cls.message_id:
+            raise ValueError(
+                f'message id did not match for message {cls.__name__}, got {data[start + 2]} expected {cls.message_id}')
+
+        if end >= len(data) or offset is None and end + 1 != len(data) or \
+                not (length == 9 or length > 9 and length == _extended_content_length(data[start + 12])):
+            raise ValueError(f'content length did not match for message {cls.__name__}')
+
+        if calculate_checksum(data[start:end]) != data[end]:
+            raise ValueError(f'checksum did not match for message {cls.__name__}')
+
+        return cls._decode(data, start + 3, length)
+
+    @classmethod
+    def _from_message(cls, message: MessageData) -> BroadcastDataMessage:
+        content = message.content
+        length = message.length
+
+        # The extended data must match the flags, like in from_bytes
+        if not (length == 9 or length > 9 and length == _extended_content_length(content[9])):
+            raise ValueError(f'content length did not match for message {cls.__name__}')
+
+        return cls._decode(content, 0, length)
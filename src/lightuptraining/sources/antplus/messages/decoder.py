@@ -0,0 +1,72 @@
+import struct
+from typing import Dict, List, Tuple, Type, Union
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.message import AbstractMessage, get_message_class
+from lightuptraining.sources.antplus.messages.util import calculate_checksum
+
+# Message classes are registered when they are defined, so all message modules need to be imported
+from lightuptraining.sources.antplus.messages import channel_response_message, configuration_messages, \
+    data_messages, requested_messages  # noqa: F401
+
+_header_struct = struct.Struct('<BBB')
+
+
+def decode_frame(frame: Union[bytes, bytearray]) -> AbstractMessage:
+    """
+    Decodes a complete frame (sync byte up to and including the checksum) into a message.
+
+    The message class is looked up by the message id of the frame, an UnknownMessageException
+    is raised when no message class is registered for the message id. Like from_bytes, a ValueError
+    is raised when the frame is invalid.
+    """
+    message_class = get_message_class(frame[2])
+    return message_class.from_bytes(frame)
+
+
+def decode_frames(buffer: Union[bytes, bytearray, memoryview]) -> List[AbstractMessage]:
+    """
+    Decodes all back-to-back frames in the buffer in a single pass, for example recorded or buffered data.
+
+    Every frame is unpacked once, at its offset in the buffer, instead of being copied out first.
+    The message class and compiled encoding format are looked up once per message id and length, and
+    the checksum is validated on the unpacked values: the XOR of a valid frame including its checksum is 0.
+
+    A ValueError is raised when the buffer contains an invalid or incomplete frame, and an
+    UnknownMessageException when no message class is registered for the message id of a frame.
+    """
+    messages: List[AbstractMessage] = []
+    append = messages.append
+    decoders: Dict[int, Tuple[Type[AbstractMessage], struct.Struct]] = {}
+    unpack_header = _header_struct.unpack_from
+    offset = 0
+    size = len(buffer)
+
+    while offset < size:
+        if size - offset < _header_struct.size:
+            raise ValueError(f'incomplete frame at offset {offset}')
+
+        sync, length, message_id = unpack_header(buffer, offset)
+
+        if sync != const.MESSAGE_SYNC:
+            raise ValueError(f'expected sync byte at offset {offset}')
+
+        if offset + length + 4 > size:
+            raise ValueError(f'incomplete frame at offset {offset}')
+
+        key = length << 8 | message_id
+        decoder = decoders.get(key)
+
+        if decoder is None:
+            message_class = get_message_class(message_id)
+            decoder = decoders[key] = (message_class, message_class._get_struct(length + 4))
+
+        values = decoder[1].unpack_from(buffer, offset)
+
+        if calculate_checksum(values):
+            raise ValueError(f'checksum did not match for frame at offset {offset}')
+
+        append(decoder[0]._from_values(values))
+        offset += length + 4
+
+    return messages
@@ -2,3 +2,16 @@ class ChannelResponseException(Exception):
     def __init__(self, message_code: int, event_label: str):
         message = f'channel response message received with message code {message_code} ({event_label})'
         super().__init__(message)
+
+
+class UnknownMessageException(Exception):
+    def __init__(self, message_id: int):
+        message = f'no message registered for message id {message_id:#04x}'
+        super().__init__(message)
+
+
+class BurstTransferException(Exception):
+    def __init__(self, channel_number: int, expected_sequence_number: int, sequence_number: int):
+        message = f'burst transfer sequence number error on channel {channel_number}, ' \
+                  f'expected sequence number {expected_sequence_number} got {sequence_number}'
+        super().__init__(message)
@@ -1,16 +1,18 @@
 import struct
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Type, TypeVar, Tuple, Iterable
+from typing import Dict, Type, TypeVar, Tuple, Iterable, NamedTuple, Optional, Union
 
+from lightuptraining.sources.antplus.messages.exceptions import UnknownMessageException
 from lightuptraining.sources.antplus.messages.util import calculate_checksum
 
 
 T = TypeVar('T', bound='AbstractMessage')
 
+# Message classes by message id, populated when a message class is defined
+_message_classes: Dict[int, Type['AbstractMessage']] = {}
 
-@dataclass
-class MessageData:
+
+class MessageData(NamedTuple):
     """
     Represents the content of a message, from the sync byte to the checksum
     """
@@ -25,9 +27,39 @@ class AbstractMessage(ABC):
     """
     Ant+ message
     """
+    __slots__ = ()
+
     encoding_format: str
+    # Encoding formats for messages with a variable content length, in addition to encoding_format
+    variable_encoding_formats: Tuple[str, ...] = ()
     message_id: int
 
+    # Compiled encoding formats by message size, created once when the message class is defined
+    _structs: Dict[int, struct.Struct]
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Compiles the encoding formats of the message class and registers every message class
+        that defines a message id, so incoming messages can be decoded by looking up the class
+        by their message id
+        """
+        super().__init_subclass__(**kwargs)
+
+        if hasattr(cls, 'encoding_format'):
+            structs = [struct.Struct(encoding_format)
+                       for encoding_format in (cls.encoding_format, *cls.variable_encoding_formats)]
+            cls._structs = {compiled.size: compiled for compiled in structs}
+
+        if 'message_id' not in cls.__dict__:
+            return
+
+        registered = _message_classes.get(cls.message_id)
+
+        if registered is not None:
+            raise ValueError(f'message id {cls.message_id:#04x} is already registered for message {registered.__name__}')
+
+        _message_classes[cls.message_id] = cls
+
     @classmethod
     @abstractmethod
     def _from_message(cls: Type[T], message: MessageData) -> T:
@@ -39,21 +71,59 @@ class AbstractMessage(ABC):
         pass
 
     @classmethod
-    def from_bytes(cls: Type[T], data: bytes) -> T:
+    def _get_struct(cls, size: int) -> struct.Struct:
         """
-        Using the class field encoding_format, this method will unpack the provided bytes
-        into a Tuple of ints.
+        Returns the compiled encoding format for a message of the provided size (sync byte up to
+        and including the checksum), raises a ValueError if the message does not support the size
+        """
+        try:
+            return cls._structs[size]
+        except KeyError:
+            raise ValueError(f'unexpected message size {size} for message {cls.__name__}') from None
+
+    @classmethod
+    def _from_values(cls: Type[T], values: Tuple[int, ...]) -> T:
+        """
+        Creates an instance of the class from the unpacked values of a message that is already validated
+        """
+        return cls._from_message(MessageData(values[0], values[1], values[2], values[3:-1], values[-1]))
+
+    @classmethod
+    def _unpack(cls, data: Union[bytes, bytearray, memoryview], offset: Optional[int]) -> Tuple[int, ...]:
+        """
+        Unpacks the values of the message at offset in the data, or of the whole data if no offset is provided.
+        A ValueError is raised when the data does not contain the message of the size given by its length byte.
+        """
+        start = 0 if offset is None else offset
+        size = len(data) - start
+
+        if size < 2:
+            raise ValueError(f'data size {size} too small for message {cls.__name__}')
+
+        compiled = cls._get_struct(data[start + 1] + 4)
+
+        if size < compiled.size or offset is None and size != compiled.size:
+            raise ValueError(f'data size {size} did not match message size {compiled.size} for message {cls.__name__}')
+
+        return compiled.unpack_from(data, start)
+
+    @classmethod
+    def from_bytes(cls: Type[T], data: Union[bytes, bytearray, memoryview], offset: Optional[int] = None) -> T:
+        """
+        Using the compiled encoding format of the class, this method will unpack the message
+        into a Tuple of ints. Without an offset the data must be exactly one message, with an offset
+        the message starting at offset is unpacked and the data can continue after the message.
 
         The contents of the message are used to calculate a checksum, which is then compared to
         the provided checksum to validate the message. If the message is valid, an instance of the class
         will be returned. If not, a ValueError is raised.
         """
-        values = struct.unpack(cls.encoding_format, data)
+        values = cls._unpack(data, offset)
 
         sync_byte = values[0]
         message_length = values[1]
         message_id = values[2]
-        content = tuple([int(value) for value in values[3:-1]])
+        content = values[3:-1]
         checksum = values[-1]
 
         message = [sync_byte, message_length, message_id, *content]
@@ -85,3 +155,14 @@ class AbstractMessage(ABC):
         will be returned. If not, a ValueError is raised.
         """
         return cls.from_bytes(bytes(iterable))
+
+
+def get_message_class(message_id: int) -> Type[AbstractMessage]:
+    """
+    Returns the message class registered for the message id, raises an UnknownMessageException
+    when no message class is registered for the message id
+    """
+    try:
+        return _message_classes[message_id]
+    except KeyError:
+        raise UnknownMessageException(message_id) from None
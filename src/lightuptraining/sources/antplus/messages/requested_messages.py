@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import Tuple
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.message import AbstractMessage, MessageData
+
+
+class CapabilitiesMessage(AbstractMessage):
+    """
+    Message sent by the device in response to a request for its capabilities, contains the max amount of
+    channels and networks and the option bytes (standard, advanced and, depending on the device, more
+    advanced options)
+    """
+    __slots__ = ('max_channels', 'max_networks', 'options')
+
+    message_id = const.MESSAGE_CAPABILITIES
+    encoding_format = '<BBBBBBBBBB'
+    variable_encoding_formats = ('<BBBBBBBB', '<BBBBBBBBBBBB')
+
+    def __init__(self, max_channels: int, max_networks: int, options: Tuple[int, ...] = ()):
+        self.max_channels = max_channels
+        self.max_networks = max_networks
+        self.options = options
+
+    @classmethod
+    def _from_message(cls, message: MessageData) -> CapabilitiesMessage:
+        content = message.content
+        return cls(content[0], content[1], tuple(content[2:]))
+
+
+class StartUpMessage(AbstractMessage):
+    """
+    Message sent by the device when it starts, for example after a system reset. The reason is a bit field
+    of the start-up reasons, it is 0 after a power on reset.
+    """
+    __slots__ = ('reason',)
+
+    message_id = const.MESSAGE_START_UP_MESSAGE
+    encoding_format = '<BBBBB'
+
+    def __init__(self, reason: int):
+        self.reason = reason
+
+    @classmethod
+    def _from_message(cls, message: MessageData) -> StartUpMessage:
+        return cls(message.content[0])
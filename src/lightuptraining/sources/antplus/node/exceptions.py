@@ -0,0 +1,4 @@
+class NoChannelAvailableException(Exception):
+    def __init__(self, max_channels: int):
+        message = f'no channel available, all {max_channels} channels are allocated'
+        super().__init__(message)
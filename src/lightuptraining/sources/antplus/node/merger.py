@@ -0,0 +1,90 @@
+from collections import deque
+from threading import Lock
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from lightuptraining.sources.antplus.messages.data_messages import BroadcastDataMessage
+from lightuptraining.sources.antplus.messages.message import AbstractMessage
+
+
+class _SensorHistory:
+    """
+    Recently received payloads of a sensor and the best RSSI they were received with
+    """
+    __slots__ = ('payloads', 'rssi')
+
+    def __init__(self, history: int):
+        self.payloads: Deque[bytes] = deque(maxlen=history)
+        self.rssi: Optional[int] = None
+
+
+class BroadcastMerger:
+    """
+    Drops duplicate broadcasts of a sensor that is received by multiple devices.
+
+    Broadcasts are identified by the channel id of the sensor (which requires extended messages)
+    and the payload, which contains the page and event counters of the sensor. The first copy of a
+    broadcast is passed on, copies received by other devices are dropped. A few recent payloads are
+    kept per sensor, so a copy that arrives after a newer broadcast of the same sensor is still
+    recognized. Broadcasts without a channel id are always passed on.
+
+    Because the first copy is passed on immediately, the best RSSI of a broadcast is tracked per
+    sensor instead of waiting for all copies.
+
+    The merger can be shared by the threads that process the messages of different devices.
+    """
+
+    def __init__(self, history: int = 4):
+        self.history = history
+        self.duplicates = 0
+        self._sensors: Dict[Tuple[int, int, int], _SensorHistory] = {}
+        self._lock = Lock()
+
+    def rssi(self, channel_id: Tuple[int, int, int]) -> Optional[int]:
+        """
+        Returns the best RSSI of the last broadcast of the sensor, or None if the sensor was not received
+        """
+        with self._lock:
+            sensor = self._sensors.get(channel_id)
+            return sensor.rssi if sensor is not None else None
+
+    def merge(self, message: BroadcastDataMessage) -> bool:
+        """
+        Returns True if the message is the first copy of the broadcast and must be handled, or False if it
+        is a duplicate
+        """
+        channel_id = message.channel_id
+
+        if channel_id is None:
+            return True
+
+        with self._lock:
+            sensor = self._sensors.get(channel_id)
+
+            if sensor is None:
+                sensor = _SensorHistory(self.history)
+                self._sensors[channel_id] = sensor
+
+            payload = message.payload
+
+            if payload in sensor.payloads:
+                self.duplicates += 1
+
+                if payload == sensor.payloads[-1] and message.rssi is not None and \
+                        (sensor.rssi is None or message.rssi > sensor.rssi):
+                    sensor.rssi = message.rssi
+
+                return False
+
+            sensor.payloads.append(payload)
+            sensor.rssi = message.rssi
+            return True
+
+    def wrap(self, handler: Callable[[AbstractMessage], None]) -> Callable[[AbstractMessage], None]:
+        """
+        Returns a handler that passes messages on to the provided handler, except duplicate broadcasts
+        """
+        def merged_handler(message: AbstractMessage):
+            if not isinstance(message, BroadcastDataMessage) or self.merge(message):
+                handler(message)
+
+        return merged_handler
@@ -0,0 +1,326 @@
+import concurrent.futures
+import logging
+import time
+from concurrent.futures import Future
+from threading import Event
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from lightuptraining.sources.antplus.channels.configurator import ChannelConfigurator
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.channel_response_message import ChannelResponseMessage
+from lightuptraining.sources.antplus.messages.configuration_messages import CloseChannelMessage, RequestMessage, \
+    UnassignChannelMessage
+from lightuptraining.sources.antplus.messages.exceptions import ChannelResponseException
+from lightuptraining.sources.antplus.messages.message import AbstractMessage
+from lightuptraining.sources.antplus.messages.requested_messages import CapabilitiesMessage
+from lightuptraining.sources.antplus.node.exceptions import NoChannelAvailableException
+from lightuptraining.sources.antplus.profiles.profile import AbstractProfile
+from lightuptraining.sources.antplus.usbdevice.device import USBDevice
+from lightuptraining.sources.antplus.usbdevice.exceptions import USBDeviceException
+from lightuptraining.sources.antplus.usbdevice.supervisor import DeviceSupervisor
+
+logger = logging.getLogger(__name__)
+
+ChannelHandler = Callable[[AbstractMessage], None]
+
+
+class Node:
+    """
+    A node is a single ANT USB device, which supports a limited amount of channels.
+
+    The capabilities of the device are requested once, to learn the amount of channels and networks
+    it supports. Channels are allocated to profiles and every received message is passed to the handler
+    of its channel. Handlers are stored in a list indexed by channel number, so dispatching a message
+    does not search through the handlers.
+    """
+
+    def __init__(self, device: USBDevice, network_number: int = 0, timeout: float = 1.0):
+        self.device = device
+        self.timeout = timeout
+        self._configurator = ChannelConfigurator(device, network_number)
+        self._capabilities: Optional[CapabilitiesMessage] = None
+        self._handlers: List[Optional[ChannelHandler]] = []
+        self._profiles: List[Optional[AbstractProfile]] = []
+        self._unopened: Dict[int, AbstractProfile] = {}
+        self._closing: Set[int] = set()
+        self._supervisor: Optional[DeviceSupervisor] = None
+        self._reconnected = Event()
+
+    @property
+    def capabilities(self) -> CapabilitiesMessage:
+        """
+        Returns the capabilities of the device, they are requested from the device the first time
+        """
+        return self._ensure_capabilities()
+
+    def _ensure_capabilities(self) -> CapabilitiesMessage:
+        """
+        Requests the capabilities if they are not known yet, which also sizes the channel lists
+        """
+        if self._capabilities is None:
+            future = self.device.send(RequestMessage(0, const.MESSAGE_CAPABILITIES))
+
+            try:
+                capabilities = self.wait([future])[0]
+            except concurrent.futures.TimeoutError:
+                # A late response answers the next request just as well
+                future.cancel()
+                raise
+
+            if not isinstance(capabilities, CapabilitiesMessage):
+                raise ValueError(f'unexpected response {type(capabilities).__name__} to capabilities request')
+
+            self._capabilities = capabilities
+            self._handlers = [None] * capabilities.max_channels
+            self._profiles = [None] * capabilities.max_channels
+
+        return self._capabilities
+
+    @property
+    def max_channels(self) -> int:
+        """
+        Returns the amount of channels supported by the device
+        """
+        return self.capabilities.max_channels
+
+    @property
+    def available_channels(self) -> int:
+        """
+        Returns the amount of channels that can still be allocated
+        """
+        self._ensure_capabilities()
+        return sum(profile is None for profile in self._profiles) - len(self._closing)
+
+    def profile(self, channel_number: int) -> Optional[AbstractProfile]:
+        """
+        Returns the profile allocated to the channel, or None if the channel is not allocated
+        """
+        return self._profiles[channel_number] if channel_number < len(self._profiles) else None
+
+    def _process_until(self, condition: Callable[[], bool]) -> bool:
+        """
+        Processes messages until the condition is met, returns False if the timeout expired first
+        """
+        deadline = time.monotonic() + self.timeout
+
+        while not condition():
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                return False
+
+            self.process(min(remaining, 0.01))
+
+        return True
+
+    def wait(self, futures: Sequence[Future[AbstractMessage]]) -> List[AbstractMessage]:
+        """
+        Processes messages until all futures are resolved and returns their results. Messages for
+        open channels are still dispatched while waiting. A TimeoutError is raised when not all futures
+        are resolved within the timeout, the futures are left pending so late responses still resolve them.
+        """
+        if not self._process_until(lambda: all(future.done() for future in futures)):
+            raise concurrent.futures.TimeoutError(
+                f'received {sum(future.done() for future in futures)} of {len(futures)} responses')
+
+        return [future.result() for future in futures]
+
+    def allocate(self, profile: AbstractProfile, handler: ChannelHandler) -> int:
+        """
+        Allocates the first available channel to the profile and returns the channel number. Messages
+        received on the channel are passed to the handler. The channel is configured and opened with
+        open_channels, so multiple channels can be opened at once.
+        """
+        self._ensure_capabilities()
+
+        for channel_number, allocated in enumerate(self._profiles):
+            if allocated is None and channel_number not in self._closing:
+                self._profiles[channel_number] = profile
+                self._handlers[channel_number] = handler
+                self._unopened[channel_number] = profile
+                return channel_number
+
+        raise NoChannelAvailableException(len(self._profiles))
+
+    def configure_channels(self) -> Tuple[List[int], List[Future[AbstractMessage]]]:
+        """
+        Sends the configuration of all allocated channels that are not opened yet, in as few transfers as
+        possible, without waiting for the responses. Returns the channel numbers and the response futures,
+        the channels are opened once confirm_channels received the responses.
+        """
+        if not self._unopened:
+            return [], []
+
+        profiles = dict(self._unopened)
+        return list(profiles), self._configurator.configure_all(profiles)
+
+    def confirm_channels(self, channel_numbers: List[int], futures: Sequence[Future[AbstractMessage]]) -> List[int]:
+        """
+        Waits for the responses to the configuration sent by configure_channels and returns the channel numbers.
+        The channels are only marked as opened when all responses succeeded. If a response failed or did not
+        arrive in time, the channels are closed and unassigned, so the next call of open_channels configures
+        them again from the start.
+        """
+        try:
+            self.wait(futures)
+        except (ChannelResponseException, concurrent.futures.TimeoutError):
+            self._reset_channels(channel_numbers)
+
+            # The device responds in order, so responses that were not read before the reset are lost
+            for future in futures:
+                future.cancel()
+
+            raise
+
+        for channel_number in channel_numbers:
+            self._unopened.pop(channel_number, None)
+
+        return channel_numbers
+
+    def _reset_channels(self, channel_numbers: List[int]):
+        """
+        Closes and unassigns channels whose configuration failed. The configuration may have failed at any
+        message, so a channel that is not open is only unassigned and errors of these messages are ignored.
+        An open channel is unassigned by process once the device reports that it is closed.
+        """
+        self._closing.update(channel_numbers)
+        closes = self.device.send_batch([CloseChannelMessage(channel_number) for channel_number in channel_numbers])
+        self._process_until(lambda: all(future.done() for future in closes))
+        unassigns = []
+
+        for channel_number, future in zip(channel_numbers, closes):
+            if not future.done() or future.exception() is not None:
+                # The channel was not open, so no channel closed event follows
+                self._closing.discard(channel_number)
+                unassigns.append(UnassignChannelMessage(channel_number))
+
+        futures = self.device.send_batch(unassigns)
+
+        if not self._process_until(lambda: all(future.done() for future in futures) and
+                                   not self._closing.intersection(channel_numbers)):
+            logger.warning(f'channels {channel_numbers} were not reset in time after configuring them failed')
+
+    def open_channels(self) -> List[int]:
+        """
+        Configures and opens all allocated channels that are not opened yet and returns their channel numbers.
+        A ChannelResponseException is raised if configuring a channel failed.
+        """
+        return self.confirm_channels(*self.configure_channels())
+
+    def restore_channels(self) -> List[int]:
+        """
+        Configures and opens all allocated channels again and returns their channel numbers, for example after
+        the device was reconnected. The configuration messages cached by the profiles are sent again.
+        """
+        # A reconnected device is reset, so channels that were closing are unassigned already
+        self._closing.clear()
+
+        for channel_number, profile in enumerate(self._profiles):
+            if profile is not None:
+                self._unopened[channel_number] = profile
+
+        return self.open_channels()
+
+    def supervise(self, interval: float = 0.1) -> DeviceSupervisor:
+        """
+        Starts a supervisor that reconnects the device when it is unplugged. The supervisor only flags that the
+        device was reconnected, the channels are restored by the next call of process, because the device must
+        only be read by the thread that processes the messages.
+        """
+        if self._supervisor is None:
+            self._supervisor = DeviceSupervisor(self.device, interval, callbacks=[self._reconnected.set])
+            self._supervisor.start()
+
+        return self._supervisor
+
+    def _restore_if_reconnected(self):
+        """
+        Restores the channels if the supervisor reconnected the device
+        """
+        if not self._reconnected.is_set():
+            return
+
+        self._reconnected.clear()
+
+        try:
+            self.restore_channels()
+        except Exception as e:  # noqa, a failed restore must not stop processing the other channels
+            logger.error(f'failed to restore channels of {self.device} after reconnecting: {e}')
+
+    def close(self):
+        """
+        Stops the supervisor, so the device is not reconnected, and closes the device
+        """
+        if self._supervisor is not None:
+            self._supervisor.stop()
+            self._supervisor.join()
+            self._supervisor = None
+
+        if self.device.is_open:
+            self.device.close()
+
+    def release(self, channel_number: int):
+        """
+        Closes the channel and removes its handler. The channel is unassigned and can be allocated again once
+        the device reports that the channel is closed.
+        """
+        if self.profile(channel_number) is None:
+            raise ValueError(f'channel {channel_number} is not allocated')
+
+        self._profiles[channel_number] = None
+        self._handlers[channel_number] = None
+
+        if self._unopened.pop(channel_number, None) is None:
+            self.device.send(CloseChannelMessage(channel_number))
+            self._closing.add(channel_number)
+
+    def _channel_closed(self, message: ChannelResponseMessage):
+        """
+        Unassigns the channel when the device reports that a released channel is closed
+        """
+        if message.is_event and message.response_message_code == const.EVENT_CHANNEL_CLOSED:
+            logger.debug(f'channel {message.channel_number} closed, unassigning channel')
+            self.device.send(UnassignChannelMessage(message.channel_number))
+            self._closing.discard(message.channel_number)
+
+    def _read_messages(self, timeout: Optional[float]) -> List[AbstractMessage]:
+        """
+        Reads the available messages from the device. While a supervised device is unplugged no messages are
+        read, the supervisor reconnects the device and process restores the channels afterwards.
+        """
+        try:
+            return self.device.read_messages(timeout)
+        except USBDeviceException:
+            if self._supervisor is None or self.device.is_open:
+                raise
+
+            time.sleep(timeout or 0)
+            return []
+
+    def process(self, timeout: Optional[float] = None) -> int:
+        """
+        Reads the available messages from the device, passes them to the handler of their channel and
+        returns the amount of messages that were handled. When the device is supervised, processing continues
+        while the device is unplugged.
+        """
+        self._restore_if_reconnected()
+        handlers = self._handlers
+        handled = 0
+
+        for message in self._read_messages(timeout):
+            channel_number = getattr(message, 'channel_number', None)
+
+            if channel_number is None or channel_number >= len(handlers):
+                continue
+
+            if channel_number in self._closing and isinstance(message, ChannelResponseMessage):
+                self._channel_closed(message)
+                continue
+
+            handler = handlers[channel_number]
+
+            if handler is not None:
+                handler(message)
+                handled += 1
+
+        return handled
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Sequence, Tuple
+
+from lightuptraining.sources.antplus.node.exceptions import NoChannelAvailableException
+from lightuptraining.sources.antplus.node.node import ChannelHandler, Node
+from lightuptraining.sources.antplus.profiles.profile import AbstractProfile
+from lightuptraining.sources.antplus.usbdevice.device import USBDevice
+from lightuptraining.sources.antplus.usbdevice.exceptions import USBDeviceException
+
+logger = logging.getLogger(__name__)
+
+
+class NodePool:
+    """
+    Distributes channels over multiple nodes (ANT USB devices), so more sensors can be tracked than
+    a single device has channels.
+
+    A profile is allocated to the node with the lowest load, the fraction of its channels that is
+    allocated, so devices with a different amount of channels are filled evenly.
+    """
+
+    def __init__(self, nodes: Sequence[Node]):
+        self.nodes = list(nodes)
+
+    @classmethod
+    def from_devices(cls, vendor_id: int, product_id: int, **kwargs: Any) -> NodePool:
+        """
+        Opens all connected USB devices with the vendor and product id and creates a node for each device,
+        every device reads data with its own read thread. Keyword arguments are passed to the nodes.
+        """
+        devices = USBDevice.find_all(vendor_id, product_id)
+
+        if not devices:
+            raise USBDeviceException(message='device not found', vendor_id=vendor_id, product_id=product_id)
+
+        for device in devices:
+            device.open()
+
+        logger.info(f'created node pool with {len(devices)} devices')
+        return cls([Node(device, **kwargs) for device in devices])
+
+    @property
+    def max_channels(self) -> int:
+        """
+        Returns the amount of channels of all nodes
+        """
+        return sum(node.max_channels for node in self.nodes)
+
+    @property
+    def available_channels(self) -> int:
+        """
+        Returns the amount of channels that can still be allocated on all nodes
+        """
+        return sum(node.available_channels for node in self.nodes)
+
+    def _least_loaded_node(self) -> Node:
+        """
+        Returns the node with the lowest fraction of allocated channels that still has an available channel
+        """
+        best = None
+        best_load = 1.0
+
+        for node in self.nodes:
+            available = node.available_channels
+
+            if not available:
+                continue
+
+            load = 1 - available / node.max_channels
+
+            if best is None or load < best_load:
+                best = node
+                best_load = load
+
+        if best is None:
+            raise NoChannelAvailableException(self.max_channels)
+
+        return best
+
+    def allocate(self, profile: AbstractProfile, handler: ChannelHandler) -> Tuple[Node, int]:
+        """
+        Allocates a channel to the profile on the node with the lowest load and returns the node and the channel
+        number. Like Node.allocate, the channel is opened with open_channels.
+        """
+        node = self._least_loaded_node()
+        return node, node.allocate(profile, handler)
+
+    def open_channels(self) -> Dict[Node, List[int]]:
+        """
+        Opens the allocated channels of all nodes and returns the opened channel numbers by node. The
+        configuration is sent to all nodes before waiting for the responses, so the nodes are configured
+        at the same time.
+        """
+        configured = [(node, *node.configure_channels()) for node in self.nodes]
+        opened = {node: node.confirm_channels(channel_numbers, futures) for node, channel_numbers, futures in configured}
+
+        return {node: channel_numbers for node, channel_numbers in opened.items() if channel_numbers}
+
+    def process(self) -> int:
+        """
+        Processes the available messages of all nodes and returns the amount of messages that were handled
+        """
+        return sum(node.process() for node in self.nodes)
+
+    def close(self):
+        """
+        Stops the supervisors and closes the USB devices of all nodes
+        """
+        for node in self.nodes:
+            node.close()
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 
 from lightuptraining.sources.antplus.profiles.const import SLAVE_RECEIVE_ONLY_CHANNEL, DEFAULT_SEARCH_TIMEOUT, \
     DEVICE_TYPE_HEART_RATE
@@ -16,5 +16,17 @@ class HeartRateMonitorProfile(AbstractProfile):
         Device number and transmission type have default value of 0, which acts as a wildcard while searching
         for devices.
         """
+        super().__init__()
         self._set_channel_id(DEVICE_TYPE_HEART_RATE, device_number, transmission_type)
         self.network_key = network_key
+
+    def decode(self, payload: bytes) -> Dict[str, int]:
+        """
+        Decodes the fields that are present in every data page of a heart rate monitor: the heart beat
+        event time (1/1024 second), the heart beat count and the computed heart rate
+        """
+        return {
+            'heart_beat_event_time': payload[4] | payload[5] << 8,
+            'heart_beat_count': payload[6],
+            'heart_rate': payload[7],
+        }
@@ -1,5 +1,9 @@
-from abc import ABC
-from typing import List, Tuple, Protocol
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple, Protocol
+
+from lightuptraining.sources.antplus.messages.configuration_messages import ConfigurationMessage, \
+    SetNetworkKeyMessage, AssignChannelMessage, SetChannelIdMessage, SetChannelPeriodMessage, \
+    SetSearchTimeoutMessage, SetRfFrequencyMessage, OpenChannelMessage
 
 
 class Profile(Protocol):
@@ -19,8 +23,64 @@ class AbstractProfile(ABC):
     channel_period: int
     search_timeout: int
 
+    def __init__(self):
+        self._configurations: Dict[Tuple[int, int], Tuple[ConfigurationMessage, ...]] = {}
+
     def _set_channel_id(self, device_type: int, device_number: int, transmission_type: int):
         """
         Sets the channel id (device type, device number, transmission type)
         """
         self.channel_id = (device_type, device_number, transmission_type)
+        self.clear_configuration_cache()
+
+    def clear_configuration_cache(self):
+        """
+        Clears the cached configuration messages, this is required when the network key, channel period,
+        search timeout or RF frequency of the profile is changed
+        """
+        # A new dict is assigned, so the cache also works for subclasses that do not call super().__init__()
+        self._configurations = {}
+
+    def configuration_messages(self, channel_number: int, network_number: int = 0) -> Tuple[ConfigurationMessage, ...]:
+        """
+        Returns the messages that configure and open a channel for this profile, in the order they must be sent.
+
+        The messages are created once per channel and network number. Because configuration messages cache
+        their encoded bytes, re-opening a channel (for example after a dropout) does not encode them again.
+        """
+        key = (channel_number, network_number)
+        configurations = getattr(self, '_configurations', None)
+
+        if configurations is None:
+            configurations = self._configurations = {}
+
+        messages = configurations.get(key)
+
+        if messages is None:
+            device_type, device_number, transmission_type = self.channel_id
+            messages = (
+                SetNetworkKeyMessage(network_number, self.network_key),
+                AssignChannelMessage(channel_number, self.channel_type, network_number),
+                SetChannelIdMessage(channel_number, device_number, device_type, transmission_type,
+                                    set_pairing_bit=False),
+                SetChannelPeriodMessage(channel_number, self.channel_period),
+                SetSearchTimeoutMessage(channel_number, self.search_timeout),
+                SetRfFrequencyMessage(channel_number, self.rf_channel_frequency),
+                OpenChannelMessage(channel_number),
+            )
+            configurations[key] = messages
+
+        return messages
+
+    @abstractmethod
+    def decode(self, payload: bytes) -> Dict[str, int]:
+        """
+        Decodes the 8 byte payload of a data message sent by a sensor of this profile
+        """
+        pass
+
+    def encoded_configuration(self, channel_number: int, network_number: int = 0) -> bytes:
+        """
+        Returns the encoded configuration messages of the channel as a single bytes object
+        """
+        return b''.join(message.encode() for message in self.configuration_messages(channel_number, network_number))
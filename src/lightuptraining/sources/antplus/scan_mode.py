@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+from threading import Event, Thread
+from typing import Dict, List, Optional
+
+from lightuptraining.sources.antplus.channels.configurator import ChannelConfigurator
+from lightuptraining.sources.antplus.messages.configuration_messages import AssignChannelMessage, \
+    CloseChannelMessage, ConfigurationMessage, EnableExtendedMessagesMessage, OpenRxScanModeMessage, \
+    SetChannelIdMessage, SetNetworkKeyMessage, SetRfFrequencyMessage
+from lightuptraining.sources.antplus.messages.data_messages import BroadcastDataMessage
+from lightuptraining.sources.antplus.messages.message import AbstractMessage
+from lightuptraining.sources.antplus.node.merger import BroadcastMerger
+from lightuptraining.sources.antplus.profiles.profile import AbstractProfile
+from lightuptraining.sources.antplus.usbdevice.aio import AsyncUSBDevice
+from lightuptraining.sources.antplus.usbdevice.device import USBDevice
+from lightuptraining.sources.dispatcher import Dispatcher
+from lightuptraining.sources.source import Source
+
+logger = logging.getLogger(__name__)
+
+
+class SensorState:
+    """
+    Last known state of a sensor received in scan mode
+    """
+    __slots__ = ('device_number', 'transmission_type', 'payload', 'rssi', 'last_seen', 'messages')
+
+    def __init__(self, device_number: int, transmission_type: int):
+        self.device_number = device_number
+        self.transmission_type = transmission_type
+        self.payload = b''
+        self.rssi: Optional[int] = None
+        self.last_seen = 0.0
+        self.messages = 0
+
+
+class ScanModeSource(Source):
+    """
+    Receives data from any amount of sensors of a profile using a single channel in continuous scan mode.
+
+    In scan mode the device receives the messages of all sensors on the RF frequency of the profile,
+    instead of one sensor per channel. Extended messages are enabled so every message contains the channel
+    id of the sensor that sent it, which is used to keep the state of every sensor in a dict by device number.
+    Handling a message costs a single dict lookup, and a payload that did not change since the previous
+    message of the sensor is not decoded again.
+
+    Outputs are notified with the decoded payload and the device number of the sensor, through the dispatcher
+    of the source. When multiple devices scan the same sensors, their sources can share a BroadcastMerger so
+    a broadcast is only handled once.
+    """
+
+    def __init__(self, device: USBDevice, profile: AbstractProfile, channel_number: int = 0,
+                 network_number: int = 0, timeout: float = 1.0, merger: Optional[BroadcastMerger] = None,
+                 dispatcher: Optional[Dispatcher] = None):
+        super().__init__(dispatcher)
+        self.device = device
+        self.merger = merger
+        self.profile = profile
+        self.channel_number = channel_number
+        self.network_number = network_number
+        self.timeout = timeout
+        self.device_type = profile.channel_id[0]
+        self._sensors: Dict[int, SensorState] = {}
+        self._configurator = ChannelConfigurator(device, network_number)
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+
+    @property
+    def sensors(self) -> Dict[int, SensorState]:
+        """
+        Returns the state of all received sensors by device number
+        """
+        return self._sensors
+
+    def configuration_messages(self) -> List[ConfigurationMessage]:
+        """
+        Returns the messages that configure the channel and open it in continuous scan mode
+        """
+        channel_number = self.channel_number
+        _, device_number, transmission_type = self.profile.channel_id
+
+        return [
+            SetNetworkKeyMessage(self.network_number, self.profile.network_key),
+            AssignChannelMessage(channel_number, self.profile.channel_type, self.network_number),
+            SetChannelIdMessage(channel_number, device_number, self.device_type, transmission_type,
+                                set_pairing_bit=False),
+            SetRfFrequencyMessage(channel_number, self.profile.rf_channel_frequency),
+            EnableExtendedMessagesMessage(True),
+            OpenRxScanModeMessage(channel_number),
+        ]
+
+    def handle(self, message: BroadcastDataMessage) -> Optional[SensorState]:
+        """
+        Updates the state of the sensor that sent the message and notifies the outputs when the payload
+        changed and the message is not a duplicate. Returns the state of the sensor, or None if the message
+        does not belong to the profile.
+        """
+        device_number = message.device_number
+
+        if device_number is None or message.device_type != self.device_type:
+            return None
+
+        sensor = self._sensors.get(device_number)
+
+        if sensor is None:
+            logger.info(f'found sensor with device number {device_number}')
+            sensor = SensorState(device_number, message.transmission_type)  # type: ignore
+            self._sensors[device_number] = sensor
+
+        sensor.rssi = message.rssi
+        sensor.last_seen = time.monotonic()
+        sensor.messages += 1
+
+        # A duplicate still shows that the sensor is in range, the merger only decides whether it is decoded
+        if self.merger is not None and not self.merger.merge(message):
+            return sensor
+
+        if message.payload != sensor.payload:
+            sensor.payload = message.payload
+            data = self.profile.decode(message.payload)
+            data['device_number'] = device_number
+            self._notify(data)
+
+        return sensor
+
+    def _handle_message(self, message: AbstractMessage):
+        if isinstance(message, BroadcastDataMessage):
+            self.handle(message)
+
+    def remove_stale_sensors(self, max_age: float) -> List[int]:
+        """
+        Removes the sensors that did not send a message for max_age seconds and returns their device numbers
+        """
+        oldest = time.monotonic() - max_age
+        stale = [device_number for device_number, sensor in self._sensors.items() if sensor.last_seen < oldest]
+
+        for device_number in stale:
+            del self._sensors[device_number]
+
+        return stale
+
+    def _run(self):
+        """
+        Reads messages from the device until the source is stopped
+        """
+        while not self._stopped.is_set() and self.device.is_open:
+            for message in self.device.read_messages(0.1):
+                self._handle_message(message)
+
+        logger.debug('exiting scan mode thread')
+
+    def start(self):
+        """
+        Configures the channel, opens scan mode and starts receiving messages in a separate thread
+        """
+        futures = self.device.send_batch(self.configuration_messages())
+        # Sensors can already be received before the last response is read
+        self._configurator.wait(futures, self.timeout, self._handle_message)
+
+        self._stopped.clear()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops receiving messages, closes the channel and waits until the values that were already dispatched
+        are passed to the outputs
+        """
+        self._stopped.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self.device.is_open:
+            self.device.send(CloseChannelMessage(self.channel_number))
+
+        if not self.dispatcher.join(self.timeout):
+            logger.warning('outputs did not handle all values before the source was stopped')
+
+    def close(self):
+        """
+        Stops the source if it is started, removes all outputs and stops their threads
+        """
+        if self._thread is not None:
+            self.stop()
+
+        super().close()
+
+    async def run(self, device: AsyncUSBDevice):
+        """
+        Configures the channel, opens scan mode and handles the received messages in the event loop until
+        the task is cancelled or the device is closed, the channel is closed when the task is cancelled.
+        This is the asyncio counterpart of start and stop, the async device must wrap the device of the source.
+        """
+        if device.device is not self.device:
+            raise ValueError('async device does not wrap the device of the source')
+
+        # Messages received before the last response are kept by the async device until they are handled
+        await asyncio.wait_for(device.send_batch(self.configuration_messages()), self.timeout)
+
+        try:
+            async for message in device:
+                self._handle_message(message)
+        finally:
+            if device.is_open:
+                await device.write(CloseChannelMessage(self.channel_number))
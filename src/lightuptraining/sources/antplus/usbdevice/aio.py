@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Thread
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from lightuptraining.protocols import Encodeable
+from lightuptraining.sources.antplus.messages.configuration_messages import ConfigurationMessage
+from lightuptraining.sources.antplus.messages.decoder import decode_frame
+from lightuptraining.sources.antplus.messages.exceptions import UnknownMessageException
+from lightuptraining.sources.antplus.messages.message import AbstractMessage
+from lightuptraining.sources.antplus.usbdevice.device import USBDevice
+from lightuptraining.sources.antplus.usbdevice.exceptions import USBDeviceException
+
+logger = logging.getLogger(__name__)
+
+# A received frame and its decoded message, None if the frame could not be decoded
+Received = Tuple[bytes, Optional[AbstractMessage]]
+
+
+class AsyncUSBDevice:
+    """
+    Asyncio interface to a USB device, so a single event loop can drive multiple devices and outputs.
+
+    A bridge thread reads the frames of the device, decodes them and resolves the responses to sent
+    messages. The frames that are read together are delivered to the event loop as a batch with a single
+    call_soon_threadsafe. Writes are done by a single worker thread per device, so they do not block the
+    event loop and are written in order.
+
+    While the device is open, its frames are only read by the bridge thread: use read_frame, read_message
+    or iterate over the device instead of the read methods of the USB device.
+    """
+
+    def __init__(self, device: USBDevice, read_timeout: float = 0.05):
+        self.device = device
+        self.read_timeout = read_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue[Optional[Received]]] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stopped = Event()
+        self._bridge: Optional[Thread] = None
+        self._closed = False
+
+    async def __aenter__(self) -> AsyncUSBDevice:
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    def __aiter__(self) -> AsyncIterator[AbstractMessage]:
+        return self.messages()
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Checks if the device is open and its frames are still delivered
+        """
+        return self._bridge is not None and not self._closed
+
+    def _closed_exception(self) -> USBDeviceException:
+        return USBDeviceException(
+            message='cannot read from device, device is closed',
+            vendor_id=self.device.vendor_id,
+            product_id=self.device.product_id,
+        )
+
+    async def open(self):
+        """
+        Opens the USB device and starts delivering its frames to the running event loop
+        """
+        self._loop = asyncio.get_running_loop()
+        # The queue is created in the running event loop, it cannot be used by another loop
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='usb-write')
+        self.device.open()
+        self._closed = False
+        self._stopped.clear()
+        self._bridge = Thread(target=self._run, daemon=True)
+        self._bridge.start()
+
+    async def close(self):
+        """
+        Stops delivering frames and closes the USB device, pending reads raise a USBDeviceException
+        """
+        if self._bridge is None:
+            return
+
+        self._stopped.set()
+        bridge, self._bridge = self._bridge, None
+        await asyncio.get_running_loop().run_in_executor(None, bridge.join)
+
+        if self.device.is_open:
+            self.device.close()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+        self._end_of_stream()
+
+    def _decode(self, frames: List[bytes]) -> List[Received]:
+        """
+        Decodes the frames and resolves the futures of the responses
+        """
+        received: List[Received] = []
+
+        for frame in frames:
+            try:
+                message = decode_frame(frame)
+            except (UnknownMessageException, ValueError) as e:
+                logger.debug(f'could not decode frame {frame!r}: {e}')
+                received.append((frame, None))
+                continue
+
+            self.device.resolve(message)
+            received.append((frame, message))
+
+        return received
+
+    def _deliver(self, received: List[Received]):
+        """
+        Adds a batch of received frames to the queue, runs in the event loop
+        """
+        assert self._queue is not None
+        put = self._queue.put_nowait
+
+        for item in received:
+            put(item)
+
+    def _end_of_stream(self):
+        """
+        Marks the end of the frames, runs in the event loop
+        """
+        if not self._closed and self._queue is not None:
+            self._closed = True
+            self._queue.put_nowait(None)
+
+    def _run(self):
+        """
+        Reads frames from the device and delivers them to the event loop until the device is closed
+        """
+        loop = self._loop
+        assert loop is not None
+
+        try:
+            while not self._stopped.is_set() and self.device.is_open:
+                frames = self.device.read_frames(self.read_timeout)
+
+                if frames:
+                    loop.call_soon_threadsafe(self._deliver, self._decode(frames))
+        except USBDeviceException as e:
+            # The read thread closes the device when it is unplugged
+            logger.debug(f'stopped reading from device: {e}')
+        finally:
+            logger.debug('exiting async bridge thread')
+
+            # Readers wait for the end of the stream, whatever stopped the thread
+            try:
+                loop.call_soon_threadsafe(self._end_of_stream)
+            except RuntimeError:
+                # The event loop was closed while the device was still open
+                pass
+
+    async def _get(self) -> Received:
+        queue = self._queue
+
+        if queue is None or self._closed and queue.empty():
+            raise self._closed_exception()
+
+        received = await queue.get()
+
+        if received is None:
+            # Keep the end of the stream for other readers
+            queue.put_nowait(None)
+            raise self._closed_exception()
+
+        return received
+
+    async def read_frame(self) -> bytes:
+        """
+        Returns the next received frame (sync byte up to and including the checksum)
+        """
+        frame, _ = await self._get()
+        return frame
+
+    async def read_message(self) -> AbstractMessage:
+        """
+        Returns the next decoded message, frames of unknown or invalid messages are skipped
+        """
+        while True:
+            _, message = await self._get()
+
+            if message is not None:
+                return message
+
+    async def messages(self) -> AsyncIterator[AbstractMessage]:
+        """
+        Yields the decoded messages until the device is closed
+        """
+        while True:
+            try:
+                message = await self.read_message()
+            except USBDeviceException:
+                return
+
+            yield message
+
+    async def write(self, message: Encodeable, timeout: Optional[int] = None) -> int:
+        """
+        Writes the encodable message to the USB device and returns the amount of bytes written
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._writer(), self.device.write, message, timeout)
+
+    async def send(self, message: ConfigurationMessage, timeout: Optional[int] = None) -> AbstractMessage:
+        """
+        Writes the message to the USB device and returns its response. Like USBDevice.send, an error
+        response raises a ChannelResponseException.
+        """
+        future = await asyncio.get_running_loop().run_in_executor(self._writer(), self.device.send, message, timeout)
+        return await asyncio.wrap_future(future)
+
+    async def send_batch(self, messages: Sequence[ConfigurationMessage], timeout: Optional[int] = None) -> List[AbstractMessage]:
+        """
+        Writes the messages to the USB device in as few transfers as possible and returns their responses,
+        in the same order as the messages
+        """
+        futures = await asyncio.get_running_loop().run_in_executor(self._writer(), self.device.send_batch, messages, timeout)
+        return list(await asyncio.gather(*(asyncio.wrap_future(future) for future in futures)))
+
+    def _writer(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            raise USBDeviceException(
+                message='cannot write to device, device is closed',
+                vendor_id=self.device.vendor_id,
+                product_id=self.device.product_id,
+            )
+
+        return self._executor
@@ -0,0 +1,167 @@
+from threading import Condition, Lock
+from typing import Optional, Union
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+class RingBuffer:
+    """
+    Thread safe byte ring buffer backed by a bytearray
+
+    Data is written and read in chunks instead of per byte, so a single lock acquisition
+    is needed per USB read instead of one for every received byte. The buffer grows when a
+    write does not fit, so no received data is dropped.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        if capacity <= 0:
+            raise ValueError('capacity must be greater than 0')
+
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._capacity = capacity
+        self._start = 0
+        self._size = 0
+        self._closed = False
+        self._lock = Lock()
+        self._data_available = Condition(self._lock)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        """
+        Returns the amount of bytes the buffer can hold before it has to grow
+        """
+        return self._capacity
+
+    @property
+    def closed(self) -> bool:
+        """
+        Checks if the buffer is closed, a closed buffer will not accept new data
+        """
+        return self._closed
+
+    def _grow(self, required: int):
+        """
+        Grows the buffer to fit at least the required amount of bytes, the buffered data
+        is moved to the start of the new buffer
+        """
+        capacity = self._capacity
+
+        while capacity < required:
+            capacity *= 2
+
+        buffer = bytearray(capacity)
+        buffer[:self._size] = self._copy(self._size)
+
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._capacity = capacity
+        self._start = 0
+
+    def _copy(self, size: int) -> bytes:
+        """
+        Copies size bytes from the start of the buffered data, without consuming them
+        """
+        end = self._start + size
+
+        if end <= self._capacity:
+            return bytes(self._view[self._start:end])
+
+        return bytes(self._view[self._start:]) + bytes(self._view[:end - self._capacity])
+
+    def _consume(self, size: int):
+        """
+        Marks size bytes from the start of the buffered data as read
+        """
+        self._start = (self._start + size) % self._capacity
+        self._size -= size
+
+    def close(self):
+        """
+        Closes the buffer and wakes up all threads waiting for data
+        """
+        with self._lock:
+            self._closed = True
+            self._data_available.notify_all()
+
+    def put(self, data: BytesLike):
+        """
+        Writes the data to the end of the buffer
+        """
+        size = len(data)
+
+        if not size:
+            return
+
+        with self._lock:
+            if self._closed:
+                raise ValueError('cannot write to a closed buffer')
+
+            if self._size + size > self._capacity:
+                self._grow(self._size + size)
+
+            end = (self._start + self._size) % self._capacity
+            first = min(size, self._capacity - end)
+
+            if first == size:
+                self._buffer[end:end + size] = data
+            else:
+                self._buffer[end:] = data[:first]
+                self._buffer[:size - first] = data[first:]
+
+            self._size += size
+            self._data_available.notify_all()
+
+    def get(self, size: Optional[int] = None) -> bytes:
+        """
+        Reads size bytes from the buffer, if size is None all buffered bytes will be read.
+
+        When less than size bytes are buffered, nothing is read and empty bytes are returned
+        """
+        with self._lock:
+            if size is None:
+                size = self._size
+
+            if size > self._size:
+                return b''
+
+            data = self._copy(size)
+            self._consume(size)
+            return data
+
+    def get_into(self, target: Union[bytearray, memoryview]) -> int:
+        """
+        Reads as many buffered bytes as fit into the target and returns the amount of bytes read.
+
+        The bytes are copied directly from the buffer into the target, without creating
+        intermediate bytes objects
+        """
+        view = memoryview(target).cast('B')
+
+        with self._lock:
+            size = min(len(view), self._size)
+            end = self._start + size
+
+            if end <= self._capacity:
+                view[:size] = self._view[self._start:end]
+            else:
+                first = self._capacity - self._start
+                view[:first] = self._view[self._start:]
+                view[first:size] = self._view[:end - self._capacity]
+
+            self._consume(size)
+            return size
+
+    def wait_for(self, size: int, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until at least size bytes are buffered, or until the timeout (in seconds) expires.
+        A timeout of None waits indefinitely, unless the buffer is closed.
+
+        Returns True if the requested amount of bytes is available
+        """
+        with self._lock:
+            self._data_available.wait_for(lambda: self._size >= size or self._closed, timeout)
+            return self._size >= size
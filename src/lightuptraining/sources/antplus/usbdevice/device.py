@@ -1,17 +1,25 @@
 from __future__ import annotations
 
 import logging
-from queue import Queue
-from threading import Lock
-from typing import Optional, Any, List, Union
+from concurrent.futures import Future
+from threading import Lock, RLock
+from typing import Optional, Any, List, Sequence, Union
 
 import usb.control
 import usb.core
 import usb.util
 
 from lightuptraining.protocols import Encodeable
+from lightuptraining.sources.antplus.messages.assembler import FrameAssembler
+from lightuptraining.sources.antplus.messages.configuration_messages import ConfigurationMessage
+from lightuptraining.sources.antplus.messages.correlation import ResponseCorrelator
+from lightuptraining.sources.antplus.messages.decoder import decode_frame
+from lightuptraining.sources.antplus.messages.exceptions import UnknownMessageException
+from lightuptraining.sources.antplus.messages.message import AbstractMessage
+from lightuptraining.sources.antplus.usbdevice.buffer import RingBuffer
 from lightuptraining.sources.antplus.usbdevice.exceptions import USBDeviceException
-from lightuptraining.sources.antplus.usbdevice.thread import USBThread
+from lightuptraining.sources.antplus.usbdevice.session import SessionRecorder
+from lightuptraining.sources.antplus.usbdevice.thread import BufferedUSBThread, USBThread
 
 logger = logging.getLogger(__name__)
 
@@ -19,19 +27,57 @@ logger = logging.getLogger(__name__)
 class USBDevice:
     """
     USBDevice reads serial data from a physical USB port and stores the data
-    in a Queue until it is read
+    in a ring buffer until it is read
+
+    By default the first USB device with the vendor and product id is used, when multiple
+    devices with the same ids are connected a specific device can be provided (see find_all).
+
+    Every read from the device requests a single packet by default. With a read depth greater than 1,
+    every read requests up to read depth packets into a preallocated buffer, so packets that are queued
+    by the device are read in a single transfer.
+
+    If a recorder is provided, all data read from the device is recorded to a session file, which
+    can be replayed with ReplayDevice. The recorder is flushed when the device is closed, but not closed,
+    so it can record the device again after reconnecting.
     """
 
-    def __init__(self, vendor_id: int, product_id: int):
+    def __init__(self, vendor_id: int, product_id: int, device: Optional[usb.core.Device] = None,
+                 read_depth: int = 1, recorder: Optional[SessionRecorder] = None):
+        if read_depth < 1:
+            raise ValueError('read depth must be greater than 0')
+
         self.vendor_id: int = vendor_id
         self.product_id: int = product_id
+        self.read_depth = read_depth
+        self.recorder = recorder
 
+        self._selected_device = device
+        # A selected device is found again on the same bus and port after it is reconnected
+        self._location = (device.bus, device.port_number) if device is not None else None
         self._device: Optional[usb.core.Device] = None
+        self._interface: Optional[usb.core.Interface] = None
+        self._endpoint_in: Optional[usb.core.Endpoint] = None
+        self._endpoint_out: Optional[usb.core.Endpoint] = None
         self._is_open = False
         self._lock = Lock()
-        self._message_queue: Queue[Union[int, None]] = Queue()
+        # Held while the buffer and frame assembler are used, so reconnect can replace them safely
+        self._read_lock = RLock()
+        self._buffer = RingBuffer()
+        self._frame_assembler = FrameAssembler()
+        self._frame_buffer = bytearray(self._buffer.capacity)
+        self._responses = ResponseCorrelator()
         self._configure_device()
-        self._usb_read_thread = USBThread(self, self._max_packet_size(), self._message_queue)
+        self._packet_size = self._max_packet_size()
+        self._usb_read_thread = self._create_read_thread()
+
+    @classmethod
+    def find_all(cls, vendor_id: int, product_id: int, **kwargs: Any) -> List[USBDevice]:
+        """
+        Returns an instance for every connected USB device with the vendor and product id, keyword
+        arguments are passed to every instance
+        """
+        devices = usb.core.find(find_all=True, idVendor=vendor_id, idProduct=product_id)
+        return [cls(vendor_id, product_id, device, **kwargs) for device in devices]
 
     def __enter__(self) -> USBDevice:
         """
@@ -81,7 +127,7 @@ class USBDevice:
         def match_func(e: usb.core.Endpoint) -> bool:
             return bool(usb.util.endpoint_direction(e.bEndpointAddress) == usb.util.ENDPOINT_IN)
 
-        endpoint = usb.util.find_descriptor(self._device_interface, custom_match=match_func)
+        endpoint = usb.util.find_descriptor(self.interface, custom_match=match_func)
 
         if not endpoint:
             raise USBDeviceException(
@@ -107,7 +153,7 @@ class USBDevice:
         def match_func(e: usb.core.Endpoint) -> bool:
             return bool(usb.util.endpoint_direction(e.bEndpointAddress) == usb.util.ENDPOINT_OUT)
 
-        endpoint = usb.util.find_descriptor(self._device_interface, custom_match=match_func)
+        endpoint = usb.util.find_descriptor(self.interface, custom_match=match_func)
 
         if not endpoint:
             raise USBDeviceException(
@@ -154,19 +200,36 @@ class USBDevice:
         cfg = self._device_active_configuration
         return int(cfg[(0, 0)].bInterfaceNumber)
 
+    @property
+    def interface(self) -> usb.core.Interface:
+        """
+        Returns the device interface, which is retrieved once after the device is configured because
+        retrieving it requires a control transfer
+        """
+        if self._interface is None:
+            self._interface = self._device_interface
+
+        return self._interface
+
     @property
     def endpoint_in(self) -> usb.core.Endpoint:
         """
-        Returns the endpoint with direction IN
+        Returns the endpoint with direction IN, which is retrieved once after the device is configured
         """
-        return self._device_endpoint_in
+        if self._endpoint_in is None:
+            self._endpoint_in = self._device_endpoint_in
+
+        return self._endpoint_in
 
     @property
     def endpoint_out(self) -> usb.core.Endpoint:
         """
-        Returns the endpoint with direction OUT
+        Returns the endpoint with direction OUT, which is retrieved once after the device is configured
         """
-        return self._device_endpoint_out
+        if self._endpoint_out is None:
+            self._endpoint_out = self._device_endpoint_out
+
+        return self._endpoint_out
 
     @property
     def is_open(self) -> bool:
@@ -175,11 +238,25 @@ class USBDevice:
         """
         return self._is_open
 
+    def _find_device(self) -> Optional[usb.core.Device]:
+        """
+        Returns the selected USB device, or finds the first USB device with the vendor and product id
+        """
+        if self._selected_device is not None:
+            return self._selected_device
+
+        if self._location is not None:
+            location = self._location
+            return usb.core.find(idVendor=self.vendor_id, idProduct=self.product_id,
+                                 custom_match=lambda device: (device.bus, device.port_number) == location)
+
+        return usb.core.find(idVendor=self.vendor_id, idProduct=self.product_id)
+
     def _configure_device(self):
         """
         Finds and configures the USB device
         """
-        device = usb.core.find(idVendor=self.vendor_id, idProduct=self.product_id)
+        device = self._find_device()
 
         if not device:
             raise USBDeviceException(
@@ -189,10 +266,21 @@ class USBDevice:
             )
 
         self._device = device
+        # Descriptors of a previously configured device are no longer valid
+        self._interface = self._endpoint_in = self._endpoint_out = None
         self._device_detach_kernel()
         self._device.set_configuration()
         self._device_claim_interface()
 
+    def _create_read_thread(self) -> USBThread:
+        """
+        Creates the thread that reads from the device into the buffer
+        """
+        if self.read_depth == 1:
+            return USBThread(self, self._packet_size, self._buffer, self.recorder)
+
+        return BufferedUSBThread(self, self.read_depth * self._packet_size, self._buffer, self.recorder)
+
     def _device_claim_interface(self):
         """
         Claims the interface of the currently active configuration
@@ -236,9 +324,12 @@ class USBDevice:
 
         return max_packet_size
 
-    def _read(self, size: int, timeout: Optional[int] = None) -> bytes:
+    def _read(self, size: int, timeout: Optional[float] = None) -> bytes:
         """
-        Read bytes from the message queue
+        Read bytes from the buffer
+
+        If a timeout (in seconds) is provided, this method waits until enough bytes are
+        available or the timeout expires.
         """
         if not self.is_open:
             raise USBDeviceException(
@@ -247,20 +338,31 @@ class USBDevice:
                 product_id=self.product_id,
             )
 
-        read_bytes: List[int] = []  # alternatively, use bytearray()
+        with self._read_lock:
+            if not self._buffer.wait_for(size, timeout or 0):
+                logger.debug(f'not enough bytes in buffer, tried to read {size} bytes')
+                # Maybe raise an exception?
+                return b""
 
-        if size > self._message_queue.qsize():
-            logger.debug(f'not enough bytes in queue, tried to read {size} bytes')
-            # Maybe raise an exception?
-            return b""
+            return self._buffer.get(size)
 
-        for i in range(size):
-            byte = self._message_queue.get(timeout=timeout)
+    def _read_into(self, buffer: Union[bytearray, memoryview], timeout: Optional[float] = None) -> int:
+        """
+        Read bytes from the buffer into the provided buffer
 
-            if byte:
-                read_bytes.append(byte)
+        If a timeout (in seconds) is provided, this method waits until at least one byte is
+        available or the timeout expires.
+        """
+        if not self.is_open:
+            raise USBDeviceException(
+                message='cannot read from device, device is closed',
+                vendor_id=self.vendor_id,
+                product_id=self.product_id,
+            )
 
-        return bytes(read_bytes)
+        with self._read_lock:
+            self._buffer.wait_for(1, timeout or 0)
+            return self._buffer.get_into(buffer)
 
     def _write(self, data: bytes, timeout: Optional[int] = None) -> int:
         """
@@ -273,7 +375,15 @@ class USBDevice:
                 product_id=self.product_id,
             )
 
-        return int(self._device_endpoint_out.write(data, timeout))
+        return int(self.endpoint_out.write(data, timeout))
+
+    def _expect_response(self, message: ConfigurationMessage) -> Future[AbstractMessage]:
+        """
+        Registers a future for the response of the message, the first byte of the content of a
+        configuration message is the channel (or network) number the response is sent for
+        """
+        channel_number = message.content[0] if message.content else 0
+        return self._responses.expect(channel_number, message.response_message_id)
 
     def close(self) -> None:
         """
@@ -288,8 +398,23 @@ class USBDevice:
 
         with self._lock:
             self._is_open = False
-            self._device_release_interface()
+
+            try:
+                self._device_release_interface()
+            except usb.core.USBError as e:
+                # The device is most likely unplugged, which should not prevent closing it
+                logger.debug(f'could not release interface: {e}')
+
             self._usb_read_thread.stop()
+
+            if self.recorder is not None:
+                self.recorder.flush()
+
+            self._responses.cancel_all(USBDeviceException(
+                message='device closed before a response was received',
+                vendor_id=self.vendor_id,
+                product_id=self.product_id,
+            ))
             logging.info("usb device closed")
 
     def device_info(self) -> str:
@@ -329,12 +454,138 @@ class USBDevice:
             logger.info('USB device opened')
             logger.info('\n' + self.device_info())
 
-    def read(self, size: int, timeout: Optional[int] = None) -> bytes:
+    def reconnect(self) -> None:
         """
-        Reads bytes from the message queue
+        Finds the USB device again after it was disconnected, claims its interface and opens it
+        with a new read thread. Bytes that were not read before the device was closed are dropped.
+        """
+        if self.is_open:
+            raise USBDeviceException(
+                message='cannot reconnect USB device, device is open',
+                vendor_id=self.vendor_id,
+                product_id=self.product_id,
+            )
+
+        # Wait for the previous read thread to exit, so it cannot close the reconnected device
+        if self._usb_read_thread.is_alive():
+            self._usb_read_thread.join()
+
+        # The device that was selected is no longer valid after it is unplugged
+        self._selected_device = None
+        self._device = None
+        self._configure_device()
+
+        # A thread that is reading finishes its read first, it reads nothing until the device is open again
+        with self._read_lock:
+            self._buffer = RingBuffer(self._buffer.capacity)
+            self._frame_assembler.reset()
+
+        self._packet_size = self._max_packet_size()
+        self._usb_read_thread = self._create_read_thread()
+        self.open()
+
+    def read(self, size: int, timeout: Optional[float] = None) -> bytes:
+        """
+        Reads bytes from the buffer
         """
         return self._read(size, timeout)
 
+    def read_into(self, buffer: Union[bytearray, memoryview], timeout: Optional[float] = None) -> int:
+        """
+        Reads as many bytes as available, up to the size of the provided buffer, directly into
+        the buffer and returns the amount of bytes read
+        """
+        return self._read_into(buffer, timeout)
+
+    def read_frames(self, timeout: Optional[float] = None) -> List[bytes]:
+        """
+        Reads all available bytes and returns the complete frames (sync byte up to and including
+        the checksum) that could be assembled from them. Incomplete frames are kept until the
+        remaining bytes are read.
+        """
+        with self._read_lock:
+            size = self._read_into(self._frame_buffer, timeout)
+            return self._frame_assembler.feed(memoryview(self._frame_buffer)[:size])
+
+    def read_messages(self, timeout: Optional[float] = None) -> List[AbstractMessage]:
+        """
+        Reads all available frames and returns the decoded messages. Responses to messages sent
+        with send() resolve their future. Frames of unknown or invalid messages are skipped.
+        """
+        messages = []
+
+        for frame in self.read_frames(timeout):
+            try:
+                message = decode_frame(frame)
+            except (UnknownMessageException, ValueError) as e:
+                logger.debug(f'could not decode frame {frame!r}: {e}')
+                continue
+
+            self.resolve(message)
+            messages.append(message)
+
+        return messages
+
+    def resolve(self, message: AbstractMessage) -> bool:
+        """
+        Resolves the future of the oldest sent message that expects the received message as response,
+        returns False if no sent message expects it. Messages that are not read with read_messages must
+        be passed to resolve, so the futures returned by send() are resolved.
+        """
+        return self._responses.resolve(message)
+
+    def send(self, message: ConfigurationMessage, timeout: Optional[int] = None) -> Future[AbstractMessage]:
+        """
+        Writes the message to the USB device and returns a future that is resolved with the
+        channel response (or the requested message) for the message once it is read with read_messages().
+
+        If the response contains an error, the future raises a ChannelResponseException. This makes
+        it possible to send multiple messages before waiting for their responses.
+        """
+        future = self._expect_response(message)
+
+        try:
+            self._write(message.encode(), timeout)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+
+        return future
+
+    def send_batch(self, messages: Sequence[ConfigurationMessage], timeout: Optional[int] = None) -> List[Future[AbstractMessage]]:
+        """
+        Writes the messages to the USB device in as few transfers as possible and returns a future for the
+        channel response of every message, in the same order as the messages.
+
+        Encoded messages are concatenated into transfers of at most the max packet size of the device, the
+        messages are still sent in order. When a write fails, the futures of the messages that were not
+        written raise the exception.
+        """
+        futures = [self._expect_response(message) for message in messages]
+        transfer = bytearray()
+        written = pending = 0
+
+        try:
+            for message in messages:
+                encoded = message.encode()
+
+                if transfer and len(transfer) + len(encoded) > self._packet_size:
+                    self._write(bytes(transfer), timeout)
+                    transfer.clear()
+                    written = pending
+
+                transfer += encoded
+                pending += 1
+
+            if transfer:
+                self._write(bytes(transfer), timeout)
+        except Exception as e:
+            for future in futures[written:]:
+                future.set_exception(e)
+            raise
+
+        return futures
+
     def write(self, message: Encodeable, timeout: Optional[int] = None) -> int:
         """
         Writes the encodable message to the USB device and returns the amount of bytes written
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import array
+import os
+import time
+from threading import Event
+from typing import Iterator, Optional, Tuple, Union
+
+import usb.core
+
+from lightuptraining.sources.antplus.usbdevice.device import USBDevice
+from lightuptraining.sources.antplus.usbdevice.exceptions import USBDeviceException
+from lightuptraining.sources.antplus.usbdevice.session import SessionReader
+
+
+class ReplayEndpoint:
+    """
+    Endpoint that returns the recorded chunks of a session when it is read, and discards written data.
+
+    In realtime mode a chunk is returned at the time it was received relative to the first chunk
+    of its recording, otherwise the chunks are returned as fast as possible. When all chunks are returned, a read
+    behaves like a device that does not send data and raises a timeout error.
+    """
+
+    def __init__(self, records: Iterator[Tuple[float, memoryview]], realtime: bool = True,
+                 max_packet_size: int = 0x40, idle_timeout: float = 0.01):
+        self.wMaxPacketSize = max_packet_size
+        self.realtime = realtime
+        self.idle_timeout = idle_timeout
+        self.finished = Event()
+        self._records = records
+        self._pending = b''
+        self._first_timestamp: Optional[float] = None
+        self._start = 0.0
+
+    def _next_chunk(self) -> Optional[bytes]:
+        """
+        Returns the next recorded chunk, waits until it is due in realtime mode
+        """
+        for timestamp, data in self._records:
+            chunk = bytes(data)
+            data.release()
+
+            if chunk:
+                break
+
+            # A marker starts a recording with timestamps from a different clock, the next chunk is due now
+            self._first_timestamp = None
+        else:
+            self.finished.set()
+            return None
+
+        if self.realtime:
+            if self._first_timestamp is None:
+                self._first_timestamp = timestamp
+                self._start = time.monotonic()
+
+            delay = self._start + (timestamp - self._first_timestamp) - time.monotonic()
+
+            if delay > 0:
+                time.sleep(delay)
+
+        return chunk
+
+    def read(self, size_or_buffer: Union[int, array.array[int]], timeout: Optional[int] = None) -> Union[array.array[int], int]:
+        if not self._pending:
+            chunk = self._next_chunk()
+
+            if chunk is None:
+                time.sleep(self.idle_timeout)
+                raise usb.core.USBError('Operation timed out', errno=110)
+
+            self._pending = chunk
+
+        size = size_or_buffer if isinstance(size_or_buffer, int) else len(size_or_buffer)
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+
+        if isinstance(size_or_buffer, int):
+            return array.array('B', chunk)
+
+        memoryview(size_or_buffer)[:len(chunk)] = chunk
+        return len(chunk)
+
+    def write(self, data: bytes, timeout: Optional[int] = None) -> int:
+        return len(data)
+
+
+class ReplayDevice(USBDevice):
+    """
+    USB device that replays a recorded session instead of reading from a physical USB device, the
+    session file is memory mapped. Data written to the device is discarded.
+
+    The recorded data goes through the same read thread, buffer and frame assembler as the data of a
+    USB device, so it can be used to reproduce a session or benchmark the whole pipeline without hardware.
+    Closing the device closes the session file, a closed replay device cannot be opened again.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike[str]], realtime: bool = True, read_depth: int = 1):
+        self.path = path
+        self._reader = SessionReader(path)
+        self._records = self._reader.records()
+        self._endpoint = ReplayEndpoint(self._records, realtime)
+        super().__init__(0, 0, read_depth=read_depth)
+
+    def __str__(self) -> str:
+        return f'replay device ({self.path})'
+
+    def __rich__(self) -> str:
+        return f'[blue]replay device [yellow]({self.path})[/yellow]'
+
+    @property
+    def endpoint_in(self) -> ReplayEndpoint:  # type: ignore[override]
+        return self._endpoint
+
+    @property
+    def endpoint_out(self) -> ReplayEndpoint:  # type: ignore[override]
+        return self._endpoint
+
+    @property
+    def finished(self) -> bool:
+        """
+        Checks if all recorded data was read by the read thread and from the buffer
+        """
+        return self._endpoint.finished.is_set() and not len(self._buffer)
+
+    def close(self) -> None:
+        """
+        Closes the device and the memory map of the session file
+        """
+        super().close()
+
+        # The read thread must not read the next record while the memory map is closed
+        if self._usb_read_thread.is_alive():
+            self._usb_read_thread.join()
+
+        # Closing the records releases their view on the memory map
+        self._records.close()
+        self._reader.close()
+
+    def _configure_device(self):
+        pass
+
+    def _device_release_interface(self):
+        pass
+
+    def _max_packet_size(self) -> int:
+        return int(self._endpoint.wMaxPacketSize)
+
+    def device_info(self) -> str:
+        return str(self)
+
+    def reconnect(self) -> None:
+        raise USBDeviceException(
+            message='cannot reconnect a replay device',
+            vendor_id=self.vendor_id,
+            product_id=self.product_id,
+        )
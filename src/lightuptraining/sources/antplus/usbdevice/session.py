@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import time
+from threading import Lock
+from typing import BinaryIO, Generator, Iterator, Optional, Tuple, Union
+
+SESSION_MAGIC = b'LUTS'
+SESSION_VERSION = 1
+
+_header_struct = struct.Struct('<4sB')
+# Monotonic timestamp (seconds) and size of the received chunk, followed by the chunk itself
+_record_struct = struct.Struct('<dI')
+
+
+class SessionRecorder:
+    """
+    Appends every chunk of data received from a USB device to a session file, together with the
+    monotonic time it was received. A session file can be replayed with ReplayDevice.
+
+    The file is flushed at most every flush interval (in seconds), so a session that ends without
+    closing the recorder (for example when the process is killed) only loses the last chunks.
+
+    Monotonic time has no meaning across processes, so every recorder starts with a marker: a record
+    without data. The timestamps after a marker are only relative to the other timestamps after it.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike[str]], flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = Lock()
+        self._file: Optional[BinaryIO] = open(path, 'ab')
+        self._flushed_at = time.monotonic()
+
+        if self._file.tell() == 0:
+            self._file.write(_header_struct.pack(SESSION_MAGIC, SESSION_VERSION))
+
+        self._file.write(_record_struct.pack(self._flushed_at, 0))
+
+    def __enter__(self) -> SessionRecorder:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def record(self, data: Union[bytes, bytearray, memoryview], timestamp: Optional[float] = None):
+        """
+        Appends the data to the session file, by default with the current monotonic time. Empty data is
+        not recorded, a record without data is a marker.
+        """
+        if not data:
+            return
+
+        now = time.monotonic()
+
+        if timestamp is None:
+            timestamp = now
+
+        with self._lock:
+            if self._file is None:
+                raise ValueError('cannot record to a closed session')
+
+            self._file.write(_record_struct.pack(timestamp, len(data)))
+            self._file.write(data)
+
+            if now - self._flushed_at >= self.flush_interval:
+                self._file.flush()
+                self._flushed_at = now
+
+    def flush(self):
+        """
+        Writes the recorded chunks that are still buffered to the session file
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                self._flushed_at = time.monotonic()
+
+    def close(self):
+        """
+        Flushes and closes the session file
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class SessionReader:
+    """
+    Reads the recorded chunks of a session file, the file is memory mapped so chunks are not copied
+    until they are used
+    """
+
+    def __init__(self, path: Union[str, os.PathLike[str]]):
+        self.path = path
+
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = _header_struct.unpack_from(self._mmap, 0)
+
+        if magic != SESSION_MAGIC or version != SESSION_VERSION:
+            self._mmap.close()
+            raise ValueError(f'{path} is not a session file (version {SESSION_VERSION})')
+
+    def __iter__(self) -> Iterator[Tuple[float, memoryview]]:
+        return self.records()
+
+    def records(self) -> Generator[Tuple[float, memoryview], None, None]:
+        """
+        Yields the timestamp and data of every recorded chunk, a truncated last record is skipped.
+        The data of the marker that starts every recording is empty.
+
+        The data is a view on the memory map, release it when it is no longer used so the reader can be closed.
+        """
+        view = memoryview(self._mmap)
+        offset = _header_struct.size
+        end = len(view)
+
+        try:
+            while offset + _record_struct.size <= end:
+                timestamp, size = _record_struct.unpack_from(view, offset)
+                offset += _record_struct.size
+
+                if offset + size > end:
+                    break
+
+                yield timestamp, view[offset:offset + size]
+                offset += size
+        finally:
+            view.release()
+
+    def close(self):
+        """
+        Closes the memory map of the session file
+        """
+        self._mmap.close()
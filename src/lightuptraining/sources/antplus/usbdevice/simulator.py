@@ -0,0 +1,525 @@
+from __future__ import annotations
+
+import array
+import heapq
+import time
+from abc import ABC, abstractmethod
+from threading import Condition
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import usb.core
+import usb.util
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.assembler import FrameAssembler
+from lightuptraining.sources.antplus.messages.util import calculate_checksum
+from lightuptraining.sources.antplus.profiles.const import DEVICE_TYPE_BIKE_POWER, DEVICE_TYPE_BIKE_SPEED_CADENCE, \
+    DEVICE_TYPE_HEART_RATE
+
+SIMULATED_VENDOR_ID = 0x0FCF
+SIMULATED_PRODUCT_ID = 0x1008
+
+_ENDPOINT_IN_ADDRESS = 0x81
+_ENDPOINT_OUT_ADDRESS = 0x01
+_CHANNEL_PERIOD_UNIT = 32768  # channel periods are in 1/32768 second
+_RSSI_MEASUREMENT_TYPE = 0x20
+_RSSI_THRESHOLD = -96
+_WHEEL_CIRCUMFERENCE = 2.096  # meters, a 700x23C wheel
+
+
+def _frame(message_id: int, content: Sequence[int]) -> bytes:
+    """
+    Returns the frame of a message, from the sync byte up to and including the checksum
+    """
+    frame = bytearray((const.MESSAGE_SYNC, len(content), message_id))
+    frame += bytes(content)
+    frame.append(calculate_checksum(frame))
+    return bytes(frame)
+
+
+class VirtualSensor(ABC):
+    """
+    Sensor that broadcasts the data pages of an ANT+ device profile.
+
+    By default a sensor broadcasts at the rate of the channel period of its profile, a different
+    rate (broadcasts per second) can be provided to generate more traffic. The payload is computed
+    from the time since the first broadcast, so the values are consistent at any rate.
+    """
+    device_type: int
+    channel_period: int
+
+    def __init__(self, device_number: int, transmission_type: int = 1, rate: Optional[float] = None, rssi: int = -60):
+        self.device_number = device_number
+        self.transmission_type = transmission_type
+        self.rate = rate if rate is not None else _CHANNEL_PERIOD_UNIT / self.channel_period
+        self.rssi = rssi
+        self.broadcasts = 0
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(device_number={self.device_number})'
+
+    @property
+    def channel_id(self) -> Tuple[int, int, int]:
+        """
+        Returns the channel id of the sensor (device type, device number, transmission type)
+        """
+        return self.device_type, self.device_number, self.transmission_type
+
+    @property
+    def interval(self) -> float:
+        """
+        Returns the time between two broadcasts in seconds
+        """
+        return 1 / self.rate
+
+    def broadcast(self, elapsed: float) -> bytes:
+        """
+        Returns the payload of the next broadcast, elapsed is the time in seconds since the first broadcast
+        """
+        payload = self._payload(elapsed)
+        self.broadcasts += 1
+        return payload
+
+    @abstractmethod
+    def _payload(self, elapsed: float) -> bytes:
+        """
+        Returns the 8 byte payload of the data page that is broadcast at the elapsed time
+        """
+        pass
+
+
+class VirtualHeartRateMonitor(VirtualSensor):
+    """
+    Heart rate monitor broadcasting data page 4 (previous heart beat event time) at a constant heart rate
+    """
+    device_type = DEVICE_TYPE_HEART_RATE
+    channel_period = 8070
+
+    def __init__(self, device_number: int, heart_rate: int = 120, **kwargs):
+        super().__init__(device_number, **kwargs)
+        self.heart_rate = heart_rate
+
+    def _payload(self, elapsed: float) -> bytes:
+        beat_interval = 60 / self.heart_rate
+        beats = int(elapsed / beat_interval)
+        event_time = int(beats * beat_interval * 1024) & 0xFFFF
+        previous_event_time = int((beats - 1) * beat_interval * 1024) & 0xFFFF if beats else 0
+        return bytes((0x04, 0xFF, previous_event_time & 0xFF, previous_event_time >> 8,
+                      event_time & 0xFF, event_time >> 8, beats & 0xFF, self.heart_rate))
+
+
+class VirtualPowerMeter(VirtualSensor):
+    """
+    Power meter broadcasting the standard power-only data page (0x10) at a constant power and cadence
+    """
+    device_type = DEVICE_TYPE_BIKE_POWER
+    channel_period = 8182
+
+    def __init__(self, device_number: int, power: int = 200, cadence: int = 90, **kwargs):
+        super().__init__(device_number, **kwargs)
+        self.power = power
+        self.cadence = cadence
+
+    def _payload(self, elapsed: float) -> bytes:
+        event_count = self.broadcasts + 1
+        accumulated_power = event_count * self.power & 0xFFFF
+        return bytes((0x10, event_count & 0xFF, 0xFF, self.cadence, accumulated_power & 0xFF, accumulated_power >> 8,
+                      self.power & 0xFF, self.power >> 8))
+
+
+class VirtualSpeedCadenceSensor(VirtualSensor):
+    """
+    Combined bike speed and cadence sensor at a constant speed (km/h) and cadence
+    """
+    device_type = DEVICE_TYPE_BIKE_SPEED_CADENCE
+    channel_period = 8086
+
+    def __init__(self, device_number: int, speed: float = 30.0, cadence: int = 90, **kwargs):
+        super().__init__(device_number, **kwargs)
+        self.speed = speed
+        self.cadence = cadence
+
+    def _payload(self, elapsed: float) -> bytes:
+        crank_interval = 60 / self.cadence
+        crank_revolutions = int(elapsed / crank_interval)
+        crank_time = int(crank_revolutions * crank_interval * 1024) & 0xFFFF
+        wheel_interval = _WHEEL_CIRCUMFERENCE / (self.speed / 3.6)
+        wheel_revolutions = int(elapsed / wheel_interval)
+        wheel_time = int(wheel_revolutions * wheel_interval * 1024) & 0xFFFF
+        crank_revolutions &= 0xFFFF
+        wheel_revolutions &= 0xFFFF
+        return bytes((crank_time & 0xFF, crank_time >> 8, crank_revolutions & 0xFF, crank_revolutions >> 8,
+                      wheel_time & 0xFF, wheel_time >> 8, wheel_revolutions & 0xFF, wheel_revolutions >> 8))
+
+
+class _Channel:
+    """
+    State of a channel of the simulated device
+    """
+    __slots__ = ('channel_id', 'is_open', 'scan_mode', 'sensors')
+
+    def __init__(self):
+        self.channel_id = (0, 0, 0)
+        self.is_open = False
+        self.scan_mode = False
+        self.sensors: List[int] = []
+
+    def matches(self, sensor: VirtualSensor) -> bool:
+        """
+        Checks if the channel id matches the sensor, a device type, device number or transmission type of 0
+        matches any sensor
+        """
+        return all(expected in (0, actual) for expected, actual in zip(self.channel_id, sensor.channel_id))
+
+
+class SimulatedEndpoint:
+    """
+    Endpoint of a simulated device, reads and writes are handled by the device
+    """
+
+    def __init__(self, address: int, max_packet_size: int,
+                 transfer: Callable[[Union[int, bytes, array.array[int]]], Union[int, array.array[int]]]):
+        self.bEndpointAddress = address
+        self.wMaxPacketSize = max_packet_size
+        self._transfer = transfer
+
+    def read(self, size_or_buffer: Union[int, array.array[int]], timeout: Optional[int] = None) -> Union[array.array[int], int]:
+        return self._transfer(size_or_buffer)
+
+    def write(self, data: bytes, timeout: Optional[int] = None) -> int:
+        return int(self._transfer(data))
+
+
+class SimulatedInterface:
+    """
+    Interface of a simulated device with an IN and OUT endpoint
+    """
+    bInterfaceNumber = 0
+    bAlternateSetting = 0
+    index = 0
+
+    def __init__(self, endpoints: Sequence[SimulatedEndpoint]):
+        self.endpoints = list(endpoints)
+
+    def __iter__(self) -> Iterator[SimulatedEndpoint]:
+        return iter(self.endpoints)
+
+
+class SimulatedConfiguration:
+    """
+    Configuration of a simulated device with a single interface
+    """
+    bConfigurationValue = 1
+
+    def __init__(self, interface: SimulatedInterface):
+        self.interface = interface
+
+    def __iter__(self) -> Iterator[SimulatedInterface]:
+        return iter((self.interface,))
+
+    def __getitem__(self, item: Tuple[int, int]) -> SimulatedInterface:
+        if item != (self.interface.bInterfaceNumber, self.interface.bAlternateSetting):
+            raise IndexError(f'no interface {item}')
+
+        return self.interface
+
+
+class _SimulatedContext:
+    """
+    Keeps track of the claimed interfaces, like the context of a pyusb device
+    """
+
+    def __init__(self):
+        self.claimed: Set[int] = set()
+
+    def managed_claim_interface(self, device: SimulatedDevice, interface: int):
+        self.claimed.add(interface)
+
+    def managed_release_interface(self, device: SimulatedDevice, interface: int):
+        self.claimed.discard(interface)
+
+
+class SimulatedDevice:
+    """
+    Simulated ANT USB device that behaves like a pyusb device, so it can be passed to USBDevice to run the
+    whole stack without hardware.
+
+    Configuration messages written to the device are answered with channel responses, and a request for the
+    capabilities with a capabilities message. The virtual sensors broadcast as soon as the device is created,
+    a broadcast is received by every open channel with a matching channel id: a channel is paired with the first
+    matching sensor that is not received by another channel, while a channel in scan mode receives all matching
+    sensors. When extended messages are enabled, broadcasts include the channel id and RSSI of the sensor.
+
+    Broadcasts that are more than max backlog seconds late, because the device is not read, are dropped
+    like the messages of a dongle whose queue overflows.
+    """
+
+    def __init__(self, sensors: Sequence[VirtualSensor] = (), max_channels: int = 8, max_networks: int = 8,
+                 bus: int = 1, port_number: int = 1, max_packet_size: int = 0x40, idle_timeout: float = 0.01,
+                 max_backlog: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.idVendor = SIMULATED_VENDOR_ID
+        self.idProduct = SIMULATED_PRODUCT_ID
+        self.product = 'simulated ANT USB device'
+        self.manufacturer = 'lightuptraining'
+        self.address = port_number
+        self.bus = bus
+        self.port_number = port_number
+        self.speed = usb.util.SPEED_FULL
+        self.sensors = list(sensors)
+        self.max_channels = max_channels
+        self.max_networks = max_networks
+        self.idle_timeout = idle_timeout
+        self.max_backlog = max_backlog
+        self.clock = clock
+        self.extended_messages = False
+        self.configuration_value: Optional[int] = None
+        self._ctx = _SimulatedContext()
+        self._condition = Condition()
+        self._assembler = FrameAssembler()
+        self._pending = bytearray()
+        self._channels: Dict[int, _Channel] = {}
+        self._receivers: Dict[int, List[int]] = {}
+
+        self.endpoint_in = SimulatedEndpoint(_ENDPOINT_IN_ADDRESS, max_packet_size, self._read)
+        self.endpoint_out = SimulatedEndpoint(_ENDPOINT_OUT_ADDRESS, max_packet_size, self._write)
+        self.configuration = SimulatedConfiguration(SimulatedInterface((self.endpoint_in, self.endpoint_out)))
+
+        self._start = clock()
+        # Next broadcast time and index of every sensor, ordered by time
+        self._schedule = [(self._start + sensor.interval, index) for index, sensor in enumerate(self.sensors)]
+        heapq.heapify(self._schedule)
+
+    def __iter__(self) -> Iterator[SimulatedConfiguration]:
+        return iter((self.configuration,))
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(sensors={len(self.sensors)}, bus={self.bus}, port_number={self.port_number})'
+
+    @property
+    def open_channels(self) -> List[int]:
+        """
+        Returns the channel numbers of the open channels
+        """
+        with self._condition:
+            return sorted(number for number, channel in self._channels.items() if channel.is_open)
+
+    def get_active_configuration(self) -> SimulatedConfiguration:
+        return self.configuration
+
+    def set_configuration(self, configuration: Optional[int] = None):
+        self.configuration_value = self.configuration.bConfigurationValue if configuration is None else configuration
+
+    def is_kernel_driver_active(self, interface: int) -> bool:
+        return False
+
+    def detach_kernel_driver(self, interface: int):
+        pass
+
+    def ctrl_transfer(self, bmRequestType: int, bRequest: int, wValue: int = 0, wIndex: int = 0,  # noqa: N803
+                      data_or_wLength: Union[int, bytes, None] = None, timeout: Optional[int] = None) -> array.array[int]:
+        # The only control transfer used is GET_INTERFACE, which returns the alternate setting
+        return array.array('B', [self.configuration.interface.bAlternateSetting])
+
+    def _read(self, size_or_buffer: Union[int, bytes, array.array[int]]) -> Union[int, array.array[int]]:
+        """
+        Returns the pending responses and due broadcasts, up to the requested size. When no data is
+        available within the idle timeout, a timeout error is raised like a device that does not send data.
+        """
+        if isinstance(size_or_buffer, bytes):
+            raise TypeError('cannot read into bytes')
+
+        size = size_or_buffer if isinstance(size_or_buffer, int) else len(size_or_buffer)
+        deadline = time.monotonic() + self.idle_timeout
+
+        with self._condition:
+            while True:
+                self._broadcast(self.clock())
+
+                if self._pending:
+                    break
+
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    raise usb.core.USBError('Operation timed out', errno=110)
+
+                if self._schedule:
+                    remaining = min(remaining, max(self._schedule[0][0] - self.clock(), 0.0))
+
+                self._condition.wait(remaining)
+
+            chunk = bytes(self._pending[:size])
+            del self._pending[:size]
+
+        if isinstance(size_or_buffer, int):
+            return array.array('B', chunk)
+
+        memoryview(size_or_buffer)[:len(chunk)] = chunk
+        return len(chunk)
+
+    def _write(self, data: Union[int, bytes, array.array[int]]) -> int:
+        """
+        Handles the messages written to the device and queues the responses
+        """
+        if isinstance(data, int):
+            raise TypeError('cannot write a size')
+
+        with self._condition:
+            for frame in self._assembler.feed(bytes(data)):
+                self._handle(frame[2], frame[3:-1])
+
+            self._condition.notify_all()
+
+        return len(data)
+
+    def _respond(self, channel_number: int, message_id: int, code: int = const.RESPONSE_NO_ERROR):
+        self._pending += _frame(const.MESSAGE_CHANNEL_RESPONSE, (channel_number, message_id, code))
+
+    def _handle(self, message_id: int, content: bytes):
+        """
+        Applies a message written to the device and queues the response
+        """
+        channel_number = content[0] if content else 0
+
+        if message_id == const.MESSAGE_RESET_SYSTEM:
+            self._channels.clear()
+            self._receivers.clear()
+            self.extended_messages = False
+            self._pending += _frame(const.MESSAGE_START_UP_MESSAGE, (const.STARTUP_COMMAND_RESET,))
+            return
+
+        if message_id == const.MESSAGE_REQUEST_MESSAGE:
+            if content[1] == const.MESSAGE_CAPABILITIES:
+                self._pending += _frame(const.MESSAGE_CAPABILITIES, (self.max_channels, self.max_networks, 0, 0, 0, 0))
+            else:
+                self._respond(channel_number, message_id, const.INVALID_MESSAGE)
+            return
+
+        if message_id == const.MESSAGE_ENABLE_EXT_RX_MESSAGES:
+            self.extended_messages = bool(content[1])
+            self._respond(channel_number, message_id)
+            return
+
+        if message_id == const.MESSAGE_SET_NETWORK_KEY:
+            code = const.RESPONSE_NO_ERROR if channel_number < self.max_networks else const.INVALID_NETWORK_NUMBER
+            self._respond(channel_number, message_id, code)
+            return
+
+        if channel_number >= self.max_channels:
+            self._respond(channel_number, message_id, const.INVALID_PARAMETER_PROVIDED)
+            return
+
+        self._handle_channel(channel_number, message_id, content)
+
+    def _handle_channel(self, channel_number: int, message_id: int, content: bytes):
+        """
+        Applies a message for a channel and queues the response, the channel must be assigned first
+        """
+        channel = self._channels.get(channel_number)
+
+        if message_id == const.MESSAGE_ASSIGN_CHANNEL:
+            code = const.CHANNEL_IN_WRONG_STATE if channel is not None else const.RESPONSE_NO_ERROR
+            self._channels.setdefault(channel_number, _Channel())
+            self._respond(channel_number, message_id, code)
+        elif channel is None:
+            self._respond(channel_number, message_id, const.CHANNEL_IN_WRONG_STATE)
+        elif message_id == const.MESSAGE_UNASSIGN_CHANNEL:
+            if channel.is_open:
+                self._respond(channel_number, message_id, const.CHANNEL_IN_WRONG_STATE)
+            else:
+                del self._channels[channel_number]
+                self._respond(channel_number, message_id)
+        elif message_id == const.MESSAGE_CHANNEL_ID:
+            channel.channel_id = (content[3] & 0x7F, content[1] | content[2] << 8, content[4])
+            self._respond(channel_number, message_id)
+        elif message_id in (const.MESSAGE_OPEN_CHANNEL, const.MESSAGE_OPEN_RX_SCAN_MODE):
+            self._open(channel_number, channel, message_id)
+        elif message_id == const.MESSAGE_CLOSE_CHANNEL:
+            self._close(channel_number, channel)
+        else:
+            # Other channel configuration (period, frequency, search timeout, ...) does not affect the simulation
+            self._respond(channel_number, message_id)
+
+    def _open(self, channel_number: int, channel: _Channel, message_id: int):
+        """
+        Opens the channel, in scan mode if the message id is the open rx scan mode message
+        """
+        if channel.is_open:
+            self._respond(channel_number, message_id, const.CHANNEL_IN_WRONG_STATE)
+            return
+
+        channel.is_open = True
+        channel.scan_mode = message_id == const.MESSAGE_OPEN_RX_SCAN_MODE
+        self._pair(channel)
+        self._respond(channel_number, message_id)
+
+    def _close(self, channel_number: int, channel: _Channel):
+        """
+        Closes the channel, the response is followed by a channel closed event
+        """
+        if not channel.is_open:
+            self._respond(channel_number, const.MESSAGE_CLOSE_CHANNEL, const.CHANNEL_NOT_OPENED)
+            return
+
+        channel.is_open = False
+        channel.sensors = []
+        self._update_receivers()
+        self._respond(channel_number, const.MESSAGE_CLOSE_CHANNEL)
+        self._respond(channel_number, const.CHANNEL_EVENT_MESSAGE_ID, const.EVENT_CHANNEL_CLOSED)
+
+    def _pair(self, channel: _Channel):
+        """
+        Selects the sensors received by a channel that was opened
+        """
+        matching = [index for index, sensor in enumerate(self.sensors) if channel.matches(sensor)]
+
+        if channel.scan_mode:
+            channel.sensors = matching
+        else:
+            paired = {index for other in self._channels.values() if not other.scan_mode for index in other.sensors}
+            channel.sensors = [index for index in matching if index not in paired][:1]
+
+        self._update_receivers()
+
+    def _update_receivers(self):
+        """
+        Rebuilds the channel numbers that receive the broadcasts of each sensor
+        """
+        self._receivers = {}
+
+        for channel_number, channel in sorted(self._channels.items()):
+            for index in channel.sensors:
+                self._receivers.setdefault(index, []).append(channel_number)
+
+    def _broadcast(self, now: float):
+        """
+        Queues the broadcasts of all sensors that are due for the channels that receive them
+        """
+        schedule = self._schedule
+
+        while schedule and schedule[0][0] <= now:
+            due, index = schedule[0]
+
+            if now - due > self.max_backlog:
+                due = now
+
+            sensor = self.sensors[index]
+            payload = sensor.broadcast(due - self._start)
+            heapq.heapreplace(schedule, (due + sensor.interval, index))
+
+            for channel_number in self._receivers.get(index, ()):
+                self._pending += self._broadcast_frame(channel_number, sensor, payload)
+
+    def _broadcast_frame(self, channel_number: int, sensor: VirtualSensor, payload: bytes) -> bytes:
+        """
+        Returns the broadcast data frame of the payload, with the channel id and RSSI of the sensor when
+        extended messages are enabled
+        """
+        if not self.extended_messages:
+            return _frame(const.MESSAGE_BROADCAST_DATA, (channel_number, *payload))
+
+        return _frame(const.MESSAGE_BROADCAST_DATA, (
+            channel_number, *payload, const.EXTENDED_FLAG_CHANNEL_ID | const.EXTENDED_FLAG_RSSI,
+            sensor.device_number & 0xFF, sensor.device_number >> 8, sensor.device_type, sensor.transmission_type,
+            _RSSI_MEASUREMENT_TYPE, sensor.rssi & 0xFF, _RSSI_THRESHOLD & 0xFF,
+        ))
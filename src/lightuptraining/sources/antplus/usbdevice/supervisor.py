@@ -0,0 +1,82 @@
+import logging
+import time
+from threading import Event, Thread
+from typing import Any, Callable, List, Optional
+
+import usb.core
+
+from lightuptraining.sources.antplus.usbdevice.device import USBDevice
+from lightuptraining.sources.antplus.usbdevice.exceptions import USBDeviceException
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceSupervisor(Thread):
+    """
+    Thread that reconnects a USB device when it is disconnected.
+
+    The read thread of a USB device closes the device when the device is unplugged. The supervisor
+    checks if the device is still open every interval, and tries to reconnect a closed device until it
+    succeeds. After reconnecting, the callbacks are called to restore the state of the device.
+
+    The callbacks run on the supervisor thread, so they must not read from the device while another thread
+    does. Node.supervise starts a supervisor that leaves restoring the channels to the thread that processes
+    the messages. Stop the supervisor before closing the device, otherwise the device is reconnected.
+    """
+
+    def __init__(self, device: USBDevice, interval: float = 0.1,
+                 callbacks: Optional[List[Callable[[], Any]]] = None):
+        super().__init__(daemon=True)
+        self.device = device
+        self.interval = interval
+        self.callbacks = callbacks or []
+        self.reconnects = 0
+        self.last_downtime: Optional[float] = None
+        self._stopped = Event()
+
+    def _reconnect(self, disconnected_at: float) -> bool:
+        """
+        Tries to reconnect the device and restore its state, returns True if the device is reconnected
+        """
+        try:
+            self.device.reconnect()
+        except (USBDeviceException, usb.core.USBError) as e:
+            logger.debug(f'could not reconnect {self.device}: {e}')
+            return False
+
+        for callback in self.callbacks:
+            try:
+                callback()
+            except Exception as e:  # noqa, a failing callback must not stop the supervisor
+                logger.error(f'failed to restore state of {self.device} after reconnecting: {e}')
+
+        self.reconnects += 1
+        self.last_downtime = time.monotonic() - disconnected_at
+        logger.info(f'reconnected {self.device} after {self.last_downtime:.2f} seconds')
+
+        return True
+
+    def run(self) -> None:
+        """
+        Runs the thread and reconnects the device when it is closed
+        """
+        disconnected_at = None
+
+        while not self._stopped.wait(self.interval):
+            if self.device.is_open:
+                continue
+
+            if disconnected_at is None:
+                logger.warning(f'{self.device} disconnected, trying to reconnect')
+                disconnected_at = time.monotonic()
+
+            if self._reconnect(disconnected_at):
+                disconnected_at = None
+
+        logger.debug('exiting device supervisor thread')
+
+    def stop(self) -> None:
+        """
+        Stops supervising the device
+        """
+        self._stopped.set()
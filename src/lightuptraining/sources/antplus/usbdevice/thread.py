@@ -1,11 +1,13 @@
+import array
 import logging
-from queue import Queue
 from threading import Thread
-from typing import Union
+from typing import Optional
 
 import usb.core
 
+from lightuptraining.sources.antplus.usbdevice.buffer import RingBuffer
 from lightuptraining.sources.antplus.usbdevice.protocols import Device
+from lightuptraining.sources.antplus.usbdevice.session import SessionRecorder
 
 logger = logging.getLogger(__name__)
 
@@ -13,15 +15,18 @@ logger = logging.getLogger(__name__)
 class USBThread(Thread):
     """
     Thread that reads from the USB device endpoint IN
+
+    If a recorder is provided, every chunk of data that is read is also recorded to a session file
     """
 
-    def __init__(self, device: Device, read_size: int, queue: Queue[Union[int, None]]):
+    def __init__(self, device: Device, read_size: int, buffer: RingBuffer, recorder: Optional[SessionRecorder] = None):
         super().__init__()
         self.setDaemon(True)
         self.device = device
         self.endpoint_in = device.endpoint_in
         self.read_size = read_size
-        self.message_queue = queue
+        self.buffer = buffer
+        self.recorder = recorder
         self._run = True
 
     def _handle_exception(self, e: usb.core.USBError) -> bool:
@@ -46,7 +51,7 @@ class USBThread(Thread):
 
     def _try_read(self) -> bool:
         """
-        Tries reading from the USB device. If data is read, it will be added to the message queue
+        Tries reading from the USB device. If data is read, it will be added to the buffer
 
         It will return True if operation can continue, and false if operation should be terminated.
         Any exception is allowed to bubble up to the run method
@@ -60,8 +65,10 @@ class USBThread(Thread):
 
         logger.debug(f'read data from USB device: {data}')
 
-        for byte in data:
-            self.message_queue.put(byte)
+        self.buffer.put(data)
+
+        if self.recorder is not None:
+            self.recorder.record(data)
 
         return True
 
@@ -81,7 +88,7 @@ class USBThread(Thread):
                 break
 
         logger.debug('exiting USB read thread')
-        self.message_queue.put(None)
+        self.buffer.close()
 
         if self.device.is_open:
             self.device.close()
@@ -93,3 +100,41 @@ class USBThread(Thread):
         Stops reading data
         """
         self._run = False
+
+
+class BufferedUSBThread(USBThread):
+    """
+    Thread that reads from the USB device endpoint IN directly into a preallocated buffer
+
+    A read returns as soon as the device sends a packet shorter than the max packet size, so reading
+    a multiple of the max packet size does not add latency. When the device has multiple packets
+    queued, they are read in a single transfer, which reduces the time between transfers in which
+    the device cannot send data.
+    """
+
+    def __init__(self, device: Device, read_size: int, buffer: RingBuffer, recorder: Optional[SessionRecorder] = None):
+        super().__init__(device, read_size, buffer, recorder)
+        self._read_buffer = array.array('B', bytes(read_size))
+        self._read_view = memoryview(self._read_buffer)
+
+    def _try_read(self) -> bool:
+        """
+        Tries reading from the USB device into the read buffer, and adds the read bytes to the buffer
+
+        It will return True if operation can continue, and false if operation should be terminated.
+        Any exception is allowed to bubble up to the run method
+        """
+        size = self.endpoint_in.read(self._read_buffer)
+
+        if not size:
+            logger.debug('received no data, stopping usb thread')
+            self.stop()
+            return False
+
+        data = self._read_view[:size]
+        self.buffer.put(data)
+
+        if self.recorder is not None:
+            self.recorder.record(data)
+
+        return True
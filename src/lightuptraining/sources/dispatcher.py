@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from enum import Enum
+from threading import Condition, Lock, Thread
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from lightuptraining.protocols import SupportsNotify
+
+logger = logging.getLogger(__name__)
+
+KeyFunction = Callable[[Dict[str, int]], Any]
+
+
+class OverflowPolicy(Enum):
+    """
+    What happens to a value that is dispatched to an output whose queue is full
+    """
+    # The oldest queued value is dropped to make room for the value
+    DROP_OLDEST = 'drop_oldest'
+    # A queued value with the same key (by default the device number) is dropped and the value is queued at the
+    # end, even when the queue is not full. If no value has the same key and the queue is full, the oldest value
+    # is dropped.
+    COALESCE = 'coalesce'
+    # The source waits until the output has room for the value
+    BLOCK = 'block'
+
+
+def _device_number(value: Dict[str, int]) -> Any:
+    return value.get('device_number')
+
+
+class OutputMetrics:
+    """
+    Delivery statistics of an output, the lag is the time (in seconds) between dispatching a value and
+    passing it to the output
+    """
+    __slots__ = ('delivered', 'dropped', 'coalesced', 'errors', 'lag', 'max_lag', 'queued')
+
+    def __init__(self):
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.queued = 0
+
+    def __repr__(self) -> str:
+        return f'OutputMetrics(delivered={self.delivered}, dropped={self.dropped}, coalesced={self.coalesced}, ' \
+               f'errors={self.errors}, lag={self.lag:.3f}, max_lag={self.max_lag:.3f}, queued={self.queued})'
+
+
+class _OutputWorker(Thread):
+    """
+    Thread that passes the queued values to a single output
+    """
+
+    def __init__(self, output: SupportsNotify, maxsize: int, policy: OverflowPolicy, key: KeyFunction):
+        super().__init__(daemon=True, name=f'output-{type(output).__name__}')
+        self.output = output
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key
+        self.metrics = OutputMetrics()
+        self._queue: Deque[Tuple[float, Dict[str, int]]] = deque()
+        self._condition = Condition()
+        self._running = True
+        self._busy = False
+
+    def _coalesce(self, value: Dict[str, int], dispatched_at: float) -> float:
+        """
+        Removes the queued value with the same key as the value, so the value is queued after the values that
+        were dispatched before it. Returns the dispatch time of the removed value, so the lag is still measured
+        from the first value that was not passed to the output, or the provided time if no value has the same key.
+        """
+        key = self.key(value)
+
+        if key is None:
+            return dispatched_at
+
+        for index, (queued_at, queued) in enumerate(self._queue):
+            if self.key(queued) == key:
+                del self._queue[index]
+                self.metrics.coalesced += 1
+                return queued_at
+
+        return dispatched_at
+
+    def put(self, value: Dict[str, int]):
+        """
+        Queues the value, when the queue is full the overflow policy is applied
+        """
+        dispatched_at = time.monotonic()
+
+        with self._condition:
+            if self.policy is OverflowPolicy.BLOCK:
+                self._condition.wait_for(lambda: not self._running or len(self._queue) < self.maxsize)
+
+            if not self._running:
+                return
+
+            if self.policy is OverflowPolicy.COALESCE:
+                dispatched_at = self._coalesce(value, dispatched_at)
+
+            if len(self._queue) >= self.maxsize:
+                self._queue.popleft()
+                self.metrics.dropped += 1
+
+            self._queue.append((dispatched_at, value))
+            self.metrics.queued = len(self._queue)
+            self._condition.notify_all()
+
+    def _next(self) -> Optional[Tuple[float, Dict[str, int]]]:
+        """
+        Waits for the next queued value, returns None when the worker is stopped
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: not self._running or bool(self._queue))
+
+            if not self._running:
+                return None
+
+            item = self._queue.popleft()
+            self.metrics.queued = len(self._queue)
+            self._busy = True
+            self._condition.notify_all()
+            return item
+
+    def run(self):
+        metrics = self.metrics
+
+        while True:
+            item = self._next()
+
+            if item is None:
+                break
+
+            dispatched_at, value = item
+            metrics.lag = time.monotonic() - dispatched_at
+            metrics.max_lag = max(metrics.max_lag, metrics.lag)
+
+            try:
+                self.output.notify(value)
+            except Exception:
+                logger.exception(f'output {self.output!r} failed to handle {value}')
+                metrics.errors += 1
+
+            with self._condition:
+                metrics.delivered += 1
+                self._busy = False
+                self._condition.notify_all()
+
+        logger.debug(f'exiting output thread of {self.output!r}')
+
+    def wait_until_delivered(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all queued values are passed to the output, returns False if the timeout expired
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._running or not self._queue and not self._busy, timeout)
+
+    def stop(self):
+        """
+        Stops the worker, values that are still queued are dropped
+        """
+        with self._condition:
+            self._running = False
+            self.metrics.dropped += len(self._queue)
+            self.metrics.queued = 0
+            self._queue.clear()
+            self._condition.notify_all()
+
+
+class Dispatcher:
+    """
+    Passes the values of a source to its outputs without blocking the source.
+
+    Every output has its own bounded queue and thread, so a slow output (for example an HTTP call to a smart
+    light) only delays its own values instead of the source and the other outputs. When the queue of an
+    output is full, the overflow policy of the output decides what happens to the value. Values are passed
+    to an output in the order they are dispatched.
+    """
+
+    def __init__(self, maxsize: int = 64, policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                 key: KeyFunction = _device_number):
+        if maxsize < 1:
+            raise ValueError('max size must be greater than 0')
+
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key
+        self._lock = Lock()
+        self._workers: List[_OutputWorker] = []
+
+    def __len__(self) -> int:
+        return len(self._workers)
+
+    @property
+    def outputs(self) -> List[SupportsNotify]:
+        """
+        Returns the attached outputs
+        """
+        return [worker.output for worker in self._workers]
+
+    def _worker(self, output: SupportsNotify) -> _OutputWorker:
+        for worker in self._workers:
+            if worker.output is output:
+                return worker
+
+        raise ValueError(f'output {output!r} is not attached')
+
+    def attach(self, output: SupportsNotify, maxsize: Optional[int] = None, policy: Optional[OverflowPolicy] = None):
+        """
+        Attaches the output and starts its thread, the max size and overflow policy of the dispatcher are
+        used unless they are provided
+        """
+        maxsize = self.maxsize if maxsize is None else maxsize
+
+        if maxsize < 1:
+            raise ValueError('max size must be greater than 0')
+
+        worker = _OutputWorker(output, maxsize, policy or self.policy, self.key)
+        worker.start()
+
+        with self._lock:
+            # The list is replaced instead of changed, so dispatch does not need the lock
+            self._workers = [*self._workers, worker]
+
+    def remove(self, output: SupportsNotify):
+        """
+        Removes the output and stops its thread, values that were not passed to the output yet are dropped
+        """
+        with self._lock:
+            worker = self._worker(output)
+            self._workers = [other for other in self._workers if other is not worker]
+
+        worker.stop()
+
+    def dispatch(self, value: Dict[str, int]):
+        """
+        Queues the value for all outputs
+        """
+        for worker in self._workers:
+            worker.put(value)
+
+    def metrics(self, output: SupportsNotify) -> OutputMetrics:
+        """
+        Returns the delivery statistics of the output
+        """
+        return self._worker(output).metrics
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all dispatched values are passed to the outputs, returns False if the timeout expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        for worker in self._workers:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+            if not worker.wait_until_delivered(remaining):
+                return False
+
+        return True
+
+    def close(self):
+        """
+        Removes all outputs and stops their threads
+        """
+        with self._lock:
+            workers, self._workers = self._workers, []
+
+        for worker in workers:
+            worker.stop()
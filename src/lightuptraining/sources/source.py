@@ -1,18 +1,24 @@
 from abc import ABC
-from typing import List, Dict
+from typing import Dict, Optional
 
 from lightuptraining.protocols import SupportsNotify
+from lightuptraining.sources.dispatcher import Dispatcher
 
 
 class Source(ABC):
-    _outputs: List[SupportsNotify] = []
+    """
+    Base class of sources, the outputs of a source are notified by its dispatcher so a slow output does
+    not block the source
+    """
+
+    def __init__(self, dispatcher: Optional[Dispatcher] = None):
+        self.dispatcher = dispatcher if dispatcher is not None else Dispatcher()
 
     def _notify(self, data: Dict[str, int]):
         """
         Updates all outputs with provided data
         """
-        for output in self._outputs:
-            output.notify(data)
+        self.dispatcher.dispatch(data)
 
     def start(self):
         """
@@ -31,10 +37,16 @@ class Source(ABC):
         Attaches the output to the source, whenever data is returned from the source, all attached outputs
         will be updated with the value of the incoming data.
         """
-        raise NotImplementedError
+        self.dispatcher.attach(output)
 
     def remove_output(self, output: SupportsNotify):
         """
         Removes output from the source
         """
-        raise NotImplementedError
+        self.dispatcher.remove(output)
+
+    def close(self):
+        """
+        Removes all outputs and stops their threads, call stop first if the source is started
+        """
+        self.dispatcher.close()
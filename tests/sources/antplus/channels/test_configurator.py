@@ -0,0 +1,80 @@
+import concurrent.futures
+
+import pytest
+import pytest_mock
+
+from lightuptraining.sources.antplus.channels.configurator import ChannelConfigurator
+from lightuptraining.sources.antplus.messages.channel_response_message import ChannelResponseMessage
+from lightuptraining.sources.antplus.messages.exceptions import ChannelResponseException
+from lightuptraining.sources.antplus.messages.util import calculate_checksum
+from lightuptraining.sources.antplus.profiles.heart_rate_monitor import HeartRateMonitorProfile
+
+NETWORK_KEY = [1, 2, 3, 4, 5, 6, 7, 8]
+
+
+def _response(channel_number: int, message_id: int, message_code: int = 0) -> bytes:
+    frame = [0xA4, 3, ChannelResponseMessage.message_id, channel_number, message_id, message_code]
+    return bytes(frame + [calculate_checksum(frame)])
+
+
+@pytest.fixture()
+def mock_write(mocker: pytest_mock.MockerFixture, open_usb_device):
+    return mocker.patch.object(open_usb_device, '_write', side_effect=lambda data, timeout: len(data))
+
+
+def test_configure_single_transfer(open_usb_device, mock_write):
+    profile = HeartRateMonitorProfile(NETWORK_KEY)
+    futures = ChannelConfigurator(open_usb_device).configure(0, profile)
+
+    assert len(futures) == 7
+    mock_write.assert_called_once_with(profile.encoded_configuration(0), None)
+
+
+def test_configure_all_batches_transfers(open_usb_device, mock_write):
+    profiles = {channel_number: HeartRateMonitorProfile(NETWORK_KEY) for channel_number in range(8)}
+    futures = ChannelConfigurator(open_usb_device).configure_all(profiles)
+    written = b''.join(call.args[0] for call in mock_write.call_args_list)
+
+    # The network key is only sent once
+    assert len(futures) == 1 + 8 * 6
+    assert written == profiles[0].encoded_configuration(0) + b''.join(
+        profiles[channel_number].encoded_configuration(channel_number)[13:] for channel_number in range(1, 8))
+    assert all(len(call.args[0]) <= 0x40 for call in mock_write.call_args_list)
+    assert mock_write.call_count < len(futures)
+
+
+def test_wait(open_usb_device, mock_write):
+    configurator = ChannelConfigurator(open_usb_device)
+    profile = HeartRateMonitorProfile(NETWORK_KEY)
+    messages = profile.configuration_messages(1)
+    futures = configurator.configure(1, profile)
+
+    for message in messages:
+        open_usb_device._buffer.put(_response(message.content[0], message.message_id))
+
+    responses = configurator.wait(futures, timeout=1)
+
+    assert [response.response_message_id for response in responses] == [message.message_id for message in messages]
+
+
+def test_wait_error_response(open_usb_device, mock_write):
+    configurator = ChannelConfigurator(open_usb_device)
+    profile = HeartRateMonitorProfile(NETWORK_KEY)
+    messages = profile.configuration_messages(1)
+    futures = configurator.configure(1, profile)
+
+    for message in messages:
+        open_usb_device._buffer.put(_response(message.content[0], message.message_id, 0x15))
+
+    with pytest.raises(ChannelResponseException):
+        configurator.wait(futures, timeout=1)
+
+
+def test_wait_timeout(open_usb_device, mock_write):
+    configurator = ChannelConfigurator(open_usb_device)
+    futures = configurator.configure(1, HeartRateMonitorProfile(NETWORK_KEY))
+
+    with pytest.raises(concurrent.futures.TimeoutError) as wrapped_e:
+        configurator.wait(futures, timeout=0.05)
+
+    assert 'received 0 of 7 channel responses' in str(wrapped_e.value)
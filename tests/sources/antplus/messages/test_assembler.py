@@ -0,0 +1,102 @@
+import pytest
+
+from lightuptraining.sources.antplus.messages.assembler import FrameAssembler
+
+OPEN_CHANNEL = b'\xa4\x01K\x01\xef'
+SET_CHANNEL_ID = b'\xa4\x05Q\x01\xe8\x03\xf8\n\xe8'
+SYSTEM_RESET = b'\xa4\x01J\x00\xef'
+
+
+def test_feed_single_frame():
+    assembler = FrameAssembler()
+
+    assert assembler.feed(OPEN_CHANNEL) == [OPEN_CHANNEL]
+    assert assembler.dropped_bytes == 0
+
+
+def test_feed_multiple_frames():
+    assembler = FrameAssembler()
+
+    assert assembler.feed(OPEN_CHANNEL + SET_CHANNEL_ID + SYSTEM_RESET) == [OPEN_CHANNEL, SET_CHANNEL_ID, SYSTEM_RESET]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 64])
+def test_feed_chunks(chunk_size):
+    assembler = FrameAssembler()
+    data = OPEN_CHANNEL + SET_CHANNEL_ID + SYSTEM_RESET
+    frames = []
+
+    for i in range(0, len(data), chunk_size):
+        frames += assembler.feed(data[i:i + chunk_size])
+
+    assert frames == [OPEN_CHANNEL, SET_CHANNEL_ID, SYSTEM_RESET]
+
+
+def test_feed_memoryview():
+    assembler = FrameAssembler()
+    buffer = bytearray(OPEN_CHANNEL + b'\x00\x00')
+
+    assert assembler.feed(memoryview(buffer)[:len(OPEN_CHANNEL)]) == [OPEN_CHANNEL]
+
+
+def test_feed_skips_bytes_before_sync():
+    assembler = FrameAssembler()
+
+    assert assembler.feed(b'\x00\x01\x02' + OPEN_CHANNEL + b'\x00\x00' + SYSTEM_RESET) == [OPEN_CHANNEL, SYSTEM_RESET]
+    assert assembler.dropped_bytes == 5
+
+
+def test_feed_invalid_checksum():
+    assembler = FrameAssembler()
+    corrupt = OPEN_CHANNEL[:-1] + b'\x00'
+
+    assert assembler.feed(corrupt + SET_CHANNEL_ID) == [SET_CHANNEL_ID]
+    assert assembler.checksum_errors == 1
+    assert assembler.dropped_bytes == len(corrupt)
+
+
+def test_feed_false_sync_byte_before_frame():
+    assembler = FrameAssembler()
+    data = b'\xa4\x03' + OPEN_CHANNEL * 3
+
+    # The length of the false frame ends inside the first valid frame, which is found by searching again
+    assert assembler.feed(data) == [OPEN_CHANNEL] * 3
+    assert (assembler.checksum_errors, assembler.dropped_bytes) == (1, 2)
+
+    assembler = FrameAssembler()
+    frames = []
+
+    for i in range(len(data)):
+        frames += assembler.feed(memoryview(data)[i:i + 1])
+
+    assert frames == [OPEN_CHANNEL] * 3
+
+
+def test_feed_memoryview_with_bytes_before_sync():
+    assembler = FrameAssembler()
+    buffer = bytearray(b'\x00\x01' + OPEN_CHANNEL + b'\x00' + SYSTEM_RESET)
+
+    assert assembler.feed(memoryview(buffer)) == [OPEN_CHANNEL, SYSTEM_RESET]
+    assert assembler.dropped_bytes == 3
+
+
+def test_feed_invalid_length():
+    assembler = FrameAssembler()
+
+    assert assembler.feed(b'\xa4\xff' + OPEN_CHANNEL) == [OPEN_CHANNEL]
+    assert assembler.dropped_bytes == 2
+
+
+def test_feed_invalid_length_is_sync_byte():
+    assembler = FrameAssembler()
+
+    assert assembler.feed(b'\xa4' + OPEN_CHANNEL) == [OPEN_CHANNEL]
+    assert assembler.dropped_bytes == 1
+
+
+def test_reset():
+    assembler = FrameAssembler()
+
+    assert assembler.feed(SET_CHANNEL_ID[:4]) == []
+    assembler.reset()
+    assert assembler.feed(OPEN_CHANNEL) == [OPEN_CHANNEL]
@@ -0,0 +1,133 @@
+from functools import reduce
+from operator import xor
+
+import pytest
+
+from lightuptraining.sources.antplus.messages.burst import BurstReassembler
+from lightuptraining.sources.antplus.messages.const import MESSAGE_BURST_TRANSFER_DATA, MESSAGE_ADVANCED_BURST_DATA
+from lightuptraining.sources.antplus.messages.exceptions import BurstTransferException
+
+
+def _burst_frame(channel_number: int, sequence_number: int, data: bytes, last: bool = False,
+                 message_id: int = MESSAGE_BURST_TRANSFER_DATA) -> bytes:
+    sequence_byte = channel_number | sequence_number << 5 | last << 7
+    frame = bytes([0xA4, len(data) + 1, message_id, sequence_byte]) + data
+    return frame + bytes([reduce(xor, frame)])
+
+
+def _packet(index: int) -> bytes:
+    return bytes([index] * 8)
+
+
+def test_feed_burst_transfer():
+    reassembler = BurstReassembler()
+
+    assert reassembler.feed(_burst_frame(1, 0, _packet(0))) is None
+    assert reassembler.in_progress(1)
+    assert reassembler.feed(_burst_frame(1, 1, _packet(1))) is None
+    transfer = reassembler.feed(_burst_frame(1, 2, _packet(2), last=True))
+
+    assert isinstance(transfer, memoryview)
+    assert transfer == _packet(0) + _packet(1) + _packet(2)
+    assert not reassembler.in_progress(1)
+
+
+def test_feed_single_packet_transfer():
+    reassembler = BurstReassembler()
+
+    assert reassembler.feed(_burst_frame(0, 0, _packet(7), last=True)) == _packet(7)
+
+
+def test_feed_sequence_number_rollover():
+    reassembler = BurstReassembler(initial_capacity=8)
+    sequence_numbers = [0, 1, 2, 3, 1, 2, 3, 1]
+
+    for index, sequence_number in enumerate(sequence_numbers[:-1]):
+        assert reassembler.feed(_burst_frame(2, sequence_number, _packet(index))) is None
+
+    transfer = reassembler.feed(_burst_frame(2, 1, _packet(7), last=True))
+
+    assert transfer == b''.join(_packet(index) for index in range(8))
+
+
+def test_feed_interleaved_channels():
+    reassembler = BurstReassembler()
+
+    reassembler.feed(_burst_frame(0, 0, _packet(0)))
+    reassembler.feed(_burst_frame(1, 0, _packet(10)))
+    transfer_0 = reassembler.feed(_burst_frame(0, 1, _packet(1), last=True))
+    transfer_1 = reassembler.feed(_burst_frame(1, 1, _packet(11), last=True))
+
+    assert transfer_0 == _packet(0) + _packet(1)
+    assert transfer_1 == _packet(10) + _packet(11)
+
+
+def test_feed_transfers_do_not_share_buffers():
+    reassembler = BurstReassembler()
+
+    first = reassembler.feed(_burst_frame(0, 0, _packet(1), last=True))
+    second = reassembler.feed(_burst_frame(0, 0, _packet(2), last=True))
+
+    assert first == _packet(1)
+    assert second == _packet(2)
+
+
+def test_feed_advanced_burst_transfer():
+    reassembler = BurstReassembler()
+    data = bytes(range(24))
+
+    reassembler.feed(_burst_frame(3, 0, data, message_id=MESSAGE_ADVANCED_BURST_DATA))
+    transfer = reassembler.feed(_burst_frame(3, 1, data, last=True, message_id=MESSAGE_ADVANCED_BURST_DATA))
+
+    assert transfer == data + data
+
+
+def test_feed_sequence_number_gap():
+    reassembler = BurstReassembler()
+    reassembler.feed(_burst_frame(1, 0, _packet(0)))
+    reassembler.feed(_burst_frame(1, 1, _packet(1)))
+
+    with pytest.raises(BurstTransferException) as wrapped_e:
+        reassembler.feed(_burst_frame(1, 3, _packet(3)))
+
+    assert 'burst transfer sequence number error on channel 1, expected sequence number 2 got 3' in str(wrapped_e.value)
+    assert not reassembler.in_progress(1)
+
+
+def test_feed_without_first_packet():
+    reassembler = BurstReassembler()
+
+    with pytest.raises(BurstTransferException) as wrapped_e:
+        reassembler.feed(_burst_frame(1, 1, _packet(1)))
+
+    assert 'expected sequence number 0 got 1' in str(wrapped_e.value)
+
+
+def test_feed_restart_transfer():
+    reassembler = BurstReassembler()
+    reassembler.feed(_burst_frame(1, 0, _packet(0)))
+    reassembler.feed(_burst_frame(1, 0, _packet(5)))
+
+    assert reassembler.feed(_burst_frame(1, 1, _packet(6), last=True)) == _packet(5) + _packet(6)
+
+
+def test_feed_not_a_burst_message():
+    reassembler = BurstReassembler()
+
+    with pytest.raises(ValueError) as wrapped_e:
+        reassembler.feed(b'\xa4\x01K\x01\xef')
+
+    assert 'message id 0x4b is not a burst transfer message' in str(wrapped_e.value)
+
+
+def test_reset():
+    reassembler = BurstReassembler()
+    reassembler.feed(_burst_frame(1, 0, _packet(0)))
+    reassembler.feed(_burst_frame(2, 0, _packet(0)))
+
+    reassembler.reset(1)
+    assert not reassembler.in_progress(1)
+    assert reassembler.in_progress(2)
+
+    reassembler.reset()
+    assert not reassembler.in_progress(2)
@@ -401,3 +401,27 @@ def test_set_transmission_power_message_power_out_of_range():
         SetTransmissionPowerMessage(channel_number, 5)
 
     assert 'transmit power out of range' in str(wrapped_e.value)
+
+
+def test_encode_is_cached():
+    message = OpenChannelMessage(1)
+    encoded = message.encode()
+
+    assert message.encode() is encoded
+
+
+def test_encode_cache_cleared_on_change():
+    message = OpenChannelMessage(1)
+    assert message.encode() == b'\xa4\x01K\x01\xef'
+
+    message.channel_number = 2
+    message.content = [2]
+
+    assert message.encode() == b'\xa4\x01K\x02\xec'
+
+
+def test_encode_into_buffer_too_small():
+    with pytest.raises(ValueError) as wrapped_e:
+        OpenChannelMessage(1).encode_into(bytearray(6), 2)
+
+    assert 'buffer too small for message OpenChannelMessage at offset 2' in str(wrapped_e.value)
@@ -0,0 +1,78 @@
+import pytest
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.channel_response_message import ChannelResponseMessage
+from lightuptraining.sources.antplus.messages.correlation import ResponseCorrelator, response_key
+from lightuptraining.sources.antplus.messages.data_messages import BroadcastDataMessage
+from lightuptraining.sources.antplus.messages.exceptions import ChannelResponseException
+
+
+def test_response_key():
+    assert response_key(ChannelResponseMessage(1, const.MESSAGE_OPEN_CHANNEL, 0)) == (1, const.MESSAGE_OPEN_CHANNEL)
+    assert response_key(BroadcastDataMessage(2, bytes(8))) == (2, const.MESSAGE_BROADCAST_DATA)
+
+
+def test_resolve():
+    correlator = ResponseCorrelator()
+    future = correlator.expect(1, const.MESSAGE_OPEN_CHANNEL)
+    response = ChannelResponseMessage(1, const.MESSAGE_OPEN_CHANNEL, const.RESPONSE_NO_ERROR)
+
+    assert not future.done()
+    assert correlator.resolve(response)
+    assert future.result(timeout=0) is response
+    assert len(correlator) == 0
+
+
+def test_resolve_error():
+    correlator = ResponseCorrelator()
+    future = correlator.expect(1, const.MESSAGE_OPEN_CHANNEL)
+
+    assert correlator.resolve(ChannelResponseMessage(1, const.MESSAGE_OPEN_CHANNEL, 0x15))
+
+    with pytest.raises(ChannelResponseException):
+        future.result(timeout=0)
+
+
+def test_resolve_in_order_per_key():
+    correlator = ResponseCorrelator()
+    first = correlator.expect(1, const.MESSAGE_OPEN_CHANNEL)
+    other_channel = correlator.expect(2, const.MESSAGE_OPEN_CHANNEL)
+    second = correlator.expect(1, const.MESSAGE_OPEN_CHANNEL)
+
+    correlator.resolve(ChannelResponseMessage(1, const.MESSAGE_OPEN_CHANNEL, const.RESPONSE_NO_ERROR))
+
+    assert first.done()
+    assert not second.done()
+    assert not other_channel.done()
+    assert len(correlator) == 2
+
+
+def test_resolve_unexpected():
+    correlator = ResponseCorrelator()
+    correlator.expect(1, const.MESSAGE_OPEN_CHANNEL)
+
+    assert not correlator.resolve(ChannelResponseMessage(1, const.MESSAGE_CLOSE_CHANNEL, const.RESPONSE_NO_ERROR))
+    assert not correlator.resolve(BroadcastDataMessage(1, bytes(8)))
+
+
+def test_resolve_skips_done_futures():
+    correlator = ResponseCorrelator()
+    failed = correlator.expect(1, const.MESSAGE_OPEN_CHANNEL)
+    failed.set_exception(ValueError('write failed'))
+    future = correlator.expect(1, const.MESSAGE_OPEN_CHANNEL)
+
+    assert correlator.resolve(ChannelResponseMessage(1, const.MESSAGE_OPEN_CHANNEL, const.RESPONSE_NO_ERROR))
+    assert future.done()
+
+
+def test_cancel_all():
+    correlator = ResponseCorrelator()
+    futures = [correlator.expect(channel, const.MESSAGE_OPEN_CHANNEL) for channel in range(3)]
+
+    correlator.cancel_all(ValueError('closed'))
+
+    assert len(correlator) == 0
+
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=0)
@@ -0,0 +1,137 @@
+from functools import reduce
+from operator import xor
+
+import pytest
+
+from lightuptraining.sources.antplus.messages.data_messages import BroadcastDataMessage
+from lightuptraining.sources.antplus.messages.decoder import decode_frame, decode_frames
+
+BROADCAST_DATA = b'\xa4\tN\x01\x04\x00\x00\x00\x10\x20\x01H\x9f'
+PAYLOAD = b'\x04\x00\x00\x00\x10\x20\x01H'
+
+
+def _extended_frame(flags: int, extended_data: bytes) -> bytes:
+    content = b'\x00' + PAYLOAD + bytes([flags]) + extended_data
+    frame = bytes([0xA4, len(content), 0x4E]) + content
+    return frame + bytes([reduce(xor, frame)])
+
+
+def test_broadcast_data_message_from_bytes():
+    message = BroadcastDataMessage.from_bytes(BROADCAST_DATA)
+
+    assert message.channel_number == 1
+    assert message.payload == b'\x04\x00\x00\x00\x10\x20\x01H'
+
+
+def test_broadcast_data_message_from_bytes_offset():
+    data = bytearray(b'\x00\x00' + BROADCAST_DATA + b'\x00')
+    message = BroadcastDataMessage.from_bytes(memoryview(data), offset=2)
+
+    assert message.channel_number == 1
+    assert message.payload == b'\x04\x00\x00\x00\x10\x20\x01H'
+    assert isinstance(message.payload, bytes)
+
+
+@pytest.mark.parametrize(['data', 'expected'], [
+    (b'\xa4\x01K\x01\xef', 'message id did not match for message BroadcastDataMessage'),
+    (b'\xa4\x08N\x01\x04\x00\x00\x00\x10\x20\x01\x8e', 'content length did not match for message BroadcastDataMessage'),
+    (BROADCAST_DATA[:-1], 'content length did not match for message BroadcastDataMessage'),
+    (BROADCAST_DATA[:-1] + b'\x00', 'checksum did not match for message BroadcastDataMessage'),
+    (BROADCAST_DATA + b'\x00', 'content length did not match for message BroadcastDataMessage'),
+    (BROADCAST_DATA[:3], 'data size 3 too small for message BroadcastDataMessage'),
+])
+def test_broadcast_data_message_from_bytes_invalid(data, expected):
+    with pytest.raises(ValueError) as wrapped_e:
+        BroadcastDataMessage.from_bytes(data)
+
+    assert expected in str(wrapped_e.value)
+
+
+def test_broadcast_data_message_decode_frame():
+    message = decode_frame(BROADCAST_DATA)
+
+    assert isinstance(message, BroadcastDataMessage)
+    assert message.channel_number == 1
+
+
+def test_broadcast_data_message_decode_frames():
+    messages = decode_frames(BROADCAST_DATA * 3)
+
+    assert len(messages) == 3
+    assert all(message.payload == b'\x04\x00\x00\x00\x10\x20\x01H' for message in messages)
+
+
+def test_broadcast_data_message_not_extended():
+    message = BroadcastDataMessage.from_bytes(BROADCAST_DATA)
+
+    assert message.channel_id is None
+    assert message.rssi is None
+    assert message.rx_timestamp is None
+
+
+def test_extended_broadcast_data_message_channel_id():
+    # device number 1000, device type heart rate with pairing bit, transmission type 1
+    frame = _extended_frame(0x80, b'\xe8\x03\xf8\x01')
+    message = BroadcastDataMessage.from_bytes(frame)
+
+    assert message.payload == PAYLOAD
+    assert message.device_number == 1000
+    assert message.device_type == 0x78
+    assert message.transmission_type == 1
+    assert message.channel_id == (0x78, 1000, 1)
+    assert message.rssi is None
+    assert message.rx_timestamp is None
+
+
+def test_extended_broadcast_data_message_all_flags():
+    frame = _extended_frame(0xE0, b'\xe8\x03\x78\x01' + b'\x20\xc4\xa0' + b'\x34\x12')
+    message = BroadcastDataMessage.from_bytes(frame)
+
+    assert message.channel_id == (0x78, 1000, 1)
+    assert message.rssi == -60
+    assert message.rx_timestamp == 0x1234
+
+
+@pytest.mark.parametrize(['flags', 'extended_data', 'rssi', 'rx_timestamp'], [
+    (0x40, b'\x20\xc4\xa0', -60, None),
+    (0x20, b'\x34\x12', None, 0x1234),
+    (0x60, b'\x20\x10\xa0\x34\x12', 16, 0x1234),
+])
+def test_extended_broadcast_data_message_without_channel_id(flags, extended_data, rssi, rx_timestamp):
+    message = BroadcastDataMessage.from_bytes(_extended_frame(flags, extended_data))
+
+    assert message.channel_id is None
+    assert message.rssi == rssi
+    assert message.rx_timestamp == rx_timestamp
+
+
+@pytest.mark.parametrize('decode', [BroadcastDataMessage.from_bytes, decode_frames])
+def test_extended_broadcast_data_message_length_does_not_match_flags(decode):
+    # The length of an RSSI (3 bytes) with the flag of a channel id (4 bytes)
+    with pytest.raises(ValueError) as wrapped_e:
+        decode(_extended_frame(0x80, b'\xe8\x03\x78'))
+
+    assert 'content length did not match for message BroadcastDataMessage' in str(wrapped_e.value)
+
+
+def test_extended_broadcast_data_message_decode_frames():
+    data = BROADCAST_DATA + _extended_frame(0xE0, b'\xe8\x03\x78\x01\x20\xc4\xa0\x34\x12') + BROADCAST_DATA
+    messages = decode_frames(data)
+
+    assert len(messages) == 3
+    assert messages[1].channel_id == (0x78, 1000, 1)
+    assert messages[1].rssi == -60
+    assert messages[1].rx_timestamp == 0x1234
+
+
+@pytest.mark.parametrize('flags', range(0, 0x100, 0x20))
+def test_extended_broadcast_data_message_decode_frames_all_flags(flags):
+    extended_data = (b'\xe8\x03\x78\x01' if flags & 0x80 else b'') + (b'\x20\xc4\xa0' if flags & 0x40 else b'') + \
+        (b'\x34\x12' if flags & 0x20 else b'')
+    frame = _extended_frame(flags, extended_data)
+    message = decode_frames(frame)[0]
+
+    assert message.payload == PAYLOAD
+    assert message.channel_id == ((0x78, 1000, 1) if flags & 0x80 else None)
+    assert message.rssi == (-60 if flags & 0x40 else None)
+    assert message.rx_timestamp == (0x1234 if flags & 0x20 else None)
@@ -0,0 +1,89 @@
+import pytest
+
+from lightuptraining.sources.antplus.messages.channel_response_message import ChannelResponseMessage
+from lightuptraining.sources.antplus.messages.configuration_messages import OpenChannelMessage, SetChannelIdMessage, \
+    OpenRxScanModeMessage
+from lightuptraining.sources.antplus.messages.const import MESSAGE_OPEN_CHANNEL, RESPONSE_NO_ERROR
+from lightuptraining.sources.antplus.messages.decoder import decode_frame, decode_frames
+from lightuptraining.sources.antplus.messages.exceptions import UnknownMessageException
+
+
+def test_decode_frame_channel_response():
+    message = decode_frame(b'\xa4\x03@\x01K\x00\xad')
+
+    assert isinstance(message, ChannelResponseMessage)
+    assert message.response_channel_id == 1
+    assert message.response_message_id == MESSAGE_OPEN_CHANNEL
+    assert message.response_message_code == RESPONSE_NO_ERROR
+
+
+@pytest.mark.parametrize(['frame', 'message_class'], [
+    (b'\xa4\x01K\x01\xef', OpenChannelMessage),
+    (b'\xa4\x05Q\x01\xe8\x03\xf8\n\xe8', SetChannelIdMessage),
+    (b'\xa4\x02[\x01\x01\xfd', OpenRxScanModeMessage),
+])
+def test_decode_frame_configuration_messages(frame, message_class):
+    message = decode_frame(frame)
+
+    assert isinstance(message, message_class)
+    assert message.encode() == frame
+
+
+def test_decode_frame_bytearray():
+    message = decode_frame(bytearray(b'\xa4\x01K\x01\xef'))
+
+    assert isinstance(message, OpenChannelMessage)
+
+
+def test_decode_frame_unknown_message_id():
+    with pytest.raises(UnknownMessageException) as wrapped_e:
+        decode_frame(b'\xa4\x01\x00\x01\xa4')
+
+    assert 'no message registered for message id 0x00' in str(wrapped_e.value)
+
+
+def test_decode_frame_invalid_checksum():
+    with pytest.raises(ValueError) as wrapped_e:
+        decode_frame(b'\xa4\x01K\x01\x00')
+
+    assert 'checksum did not match for message OpenChannelMessage' in str(wrapped_e.value)
+
+
+def test_decode_frames():
+    data = b'\xa4\x03@\x01K\x00\xad' + b'\xa4\x01K\x01\xef' + b'\xa4\x02[\x01\x01\xfd' + b'\xa4\x01[\x01\xff'
+    messages = decode_frames(data)
+
+    assert [type(message) for message in messages] == [
+        ChannelResponseMessage, OpenChannelMessage, OpenRxScanModeMessage, OpenRxScanModeMessage
+    ]
+    assert messages[2].content == [1, 1]
+    assert messages[3].content == [1]
+
+
+def test_decode_frames_memoryview():
+    data = bytearray(b'\xa4\x01K\x01\xef' * 3)
+    messages = decode_frames(memoryview(data))
+
+    assert len(messages) == 3
+
+
+def test_decode_frames_empty():
+    assert decode_frames(b'') == []
+
+
+@pytest.mark.parametrize(['data', 'expected'], [
+    (b'\xa4\x01K\x01\xef\x00\x01K\x01\xef', 'expected sync byte at offset 5'),
+    (b'\xa4\x01K\x01\xef\xa4\x01K\x01', 'incomplete frame at offset 5'),
+    (b'\xa4\x01K\x01\xef\xa4\x01', 'incomplete frame at offset 5'),
+    (b'\xa4\x01K\x01\xef\xa4\x01K\x01\x00', 'checksum did not match for frame at offset 5'),
+])
+def test_decode_frames_invalid(data, expected):
+    with pytest.raises(ValueError) as wrapped_e:
+        decode_frames(data)
+
+    assert expected in str(wrapped_e.value)
+
+
+def test_decode_frames_unknown_message_id():
+    with pytest.raises(UnknownMessageException):
+        decode_frames(b'\xa4\x01\x00\x01\xa4')
@@ -0,0 +1,153 @@
+import tracemalloc
+
+import pytest
+
+from lightuptraining.sources.antplus.messages.channel_response_message import ChannelResponseMessage
+from lightuptraining.sources.antplus.messages.configuration_messages import ConfigurationMessage, \
+    SetNetworkKeyMessage, OpenChannelMessage, OpenRxScanModeMessage, CloseChannelMessage, RequestMessage, \
+    SystemResetMessage
+from lightuptraining.sources.antplus.messages.const import MESSAGE_CAPABILITIES, MESSAGE_CHANNEL_RESPONSE, \
+    MESSAGE_SET_NETWORK_KEY, MESSAGE_START_UP_MESSAGE, STARTUP_COMMAND_RESET
+from lightuptraining.sources.antplus.messages.decoder import decode_frame
+from lightuptraining.sources.antplus.messages.exceptions import UnknownMessageException
+from lightuptraining.sources.antplus.messages.message import get_message_class, MessageData
+from lightuptraining.sources.antplus.messages.requested_messages import CapabilitiesMessage, StartUpMessage
+
+
+def test_get_message_class():
+    assert get_message_class(MESSAGE_CHANNEL_RESPONSE) is ChannelResponseMessage
+    assert get_message_class(MESSAGE_SET_NETWORK_KEY) is SetNetworkKeyMessage
+
+
+def test_get_message_class_unknown_message_id():
+    with pytest.raises(UnknownMessageException) as wrapped_e:
+        get_message_class(0x00)
+
+    assert 'no message registered for message id 0x00' in str(wrapped_e.value)
+
+
+def test_register_duplicate_message_id():
+    with pytest.raises(ValueError) as wrapped_e:
+        class DuplicateMessage(ConfigurationMessage):
+            message_id = MESSAGE_SET_NETWORK_KEY
+            encoding_format = '<BBBBB'
+
+            @classmethod
+            def _from_message(cls, message: MessageData):
+                pass
+
+    assert 'message id 0x46 is already registered for message SetNetworkKeyMessage' in str(wrapped_e.value)
+    assert get_message_class(MESSAGE_SET_NETWORK_KEY) is SetNetworkKeyMessage
+
+
+def test_message_class_structs():
+    assert OpenRxScanModeMessage._get_struct(5).format == '<BBBBB'
+    assert OpenRxScanModeMessage._get_struct(6).format == '<BBBBBB'
+    assert SetNetworkKeyMessage._get_struct(13).format == '<BBBBBBBBBBBBB'
+
+
+def test_from_bytes_offset():
+    data = b'\x00\x00\xa4\x01K\x01\xef\x00'
+    message = OpenChannelMessage.from_bytes(data, offset=2)
+
+    assert message.channel_number == 1
+
+
+def test_from_bytes_memoryview():
+    data = bytearray(b'\xa4\x01K\x01\xef\xa4\x01L\x01\xe8')
+    message = CloseChannelMessage.from_bytes(memoryview(data), offset=5)
+
+    assert message.channel_number == 1
+
+
+def test_from_bytes_unexpected_size():
+    with pytest.raises(ValueError) as wrapped_e:
+        OpenChannelMessage.from_bytes(b'\xa4\x02K\x01\x00\xec')
+
+    assert 'unexpected message size 6 for message OpenChannelMessage' in str(wrapped_e.value)
+
+
+@pytest.mark.parametrize(['data', 'expected'], [
+    (b'\xa4\x01K\x01\xef\x00', 'data size 6 did not match message size 5 for message OpenChannelMessage'),
+    (b'\xa4\x01K\x01', 'data size 4 did not match message size 5 for message OpenChannelMessage'),
+    (b'\xa4', 'data size 1 too small for message OpenChannelMessage'),
+])
+def test_from_bytes_size_does_not_match(data, expected):
+    with pytest.raises(ValueError) as wrapped_e:
+        OpenChannelMessage.from_bytes(data)
+
+    assert expected in str(wrapped_e.value)
+
+    # With an offset the data may continue after the message, but must contain all of it
+    if len(data) < 5:
+        with pytest.raises(ValueError):
+            OpenChannelMessage.from_bytes(b'\x00' + data, offset=1)
+
+
+def test_encode_into():
+    buffer = bytearray(14)
+    written = OpenChannelMessage(1).encode_into(buffer, 2)
+    written += OpenRxScanModeMessage(1, synchronous_packages_only=True).encode_into(buffer, 2 + written)
+
+    assert written == 11
+    assert buffer == b'\x00\x00\xa4\x01K\x01\xef\xa4\x02[\x01\x01\xfd\x00'
+
+
+def _allocated_per_instance(factory, count: int = 1000) -> float:
+    tracemalloc.start()
+    instances = [factory() for _ in range(count)]  # noqa: F841
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return allocated / count
+
+
+def test_messages_are_slotted():
+    messages = [
+        ChannelResponseMessage(1, 0x4B, 0),
+        OpenChannelMessage(1),
+        OpenRxScanModeMessage(1),
+        SetNetworkKeyMessage(0, [1, 2, 3, 4, 5, 6, 7, 8]),
+        MessageData(0xA4, 1, 0x4B, (1,), 0xEF),
+    ]
+
+    for message in messages:
+        assert not hasattr(message, '__dict__')
+
+
+def test_message_memory():
+    # Measured on CPython 3.11, per instance (including the instance's own containers):
+    #   ChannelResponseMessage   ~105 bytes with __dict__, ~65 bytes slotted
+    #   OpenChannelMessage       ~160 bytes with __dict__, ~120 bytes slotted (includes the content list)
+    #   MessageData              ~121 bytes as dataclass,  ~97 bytes as NamedTuple
+    assert _allocated_per_instance(lambda: ChannelResponseMessage(1, 0x4B, 0)) < 80
+    assert _allocated_per_instance(lambda: OpenChannelMessage(1)) < 140
+    assert _allocated_per_instance(lambda: MessageData(0xA4, 1, 0x4B, (1,), 0xEF)) < 110
+
+
+def test_request_message():
+    message = RequestMessage(0, MESSAGE_CAPABILITIES)
+
+    assert message.encode() == b'\xa4\x02\x4d\x00\x54\xbf'
+    assert message.response_message_id == MESSAGE_CAPABILITIES
+    assert RequestMessage.from_bytes(message.encode()).requested_message_id == MESSAGE_CAPABILITIES
+
+
+@pytest.mark.parametrize('data, options', [
+    (b'\xa4\x04\x54\x08\x03\x00\xba\x45', (0x00, 0xba)),
+    (b'\xa4\x06\x54\x08\x03\x00\xba\x36\x00\x71', (0x00, 0xba, 0x36, 0x00)),
+])
+def test_capabilities_message(data, options):
+    message = decode_frame(data)
+
+    assert isinstance(message, CapabilitiesMessage)
+    assert message.max_channels == 8
+    assert message.max_networks == 3
+    assert message.options == options
+
+
+def test_start_up_message():
+    message = decode_frame(b'\xa4\x01\x6f\x20\xea')
+
+    assert isinstance(message, StartUpMessage)
+    assert message.reason == STARTUP_COMMAND_RESET
+    assert SystemResetMessage().response_message_id == MESSAGE_START_UP_MESSAGE
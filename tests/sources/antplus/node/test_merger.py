@@ -0,0 +1,100 @@
+from threading import Barrier, Thread
+
+from lightuptraining.sources.antplus.messages.channel_response_message import ChannelResponseMessage
+from lightuptraining.sources.antplus.messages.data_messages import BroadcastDataMessage
+from lightuptraining.sources.antplus.node.merger import BroadcastMerger
+from lightuptraining.sources.antplus.profiles.const import DEVICE_TYPE_HEART_RATE
+
+
+def _broadcast(beat_count: int, device_number: int = 1000, rssi: int = -60) -> BroadcastDataMessage:
+    payload = bytes([0, 0, 0, 0, 0, 0, beat_count, 60])
+    return BroadcastDataMessage(0, payload, device_number, DEVICE_TYPE_HEART_RATE, 1, rssi)
+
+
+def test_merge_drops_duplicates():
+    merger = BroadcastMerger()
+
+    assert merger.merge(_broadcast(1))
+    assert not merger.merge(_broadcast(1))
+    assert merger.merge(_broadcast(2))
+    assert merger.merge(_broadcast(1, device_number=1001))
+    assert merger.duplicates == 1
+
+
+def test_merge_late_duplicate():
+    merger = BroadcastMerger()
+    merger.merge(_broadcast(1))
+    merger.merge(_broadcast(2))
+
+    assert not merger.merge(_broadcast(1))
+
+
+def test_merge_history():
+    merger = BroadcastMerger(history=2)
+
+    for beat_count in range(3):
+        merger.merge(_broadcast(beat_count))
+
+    assert merger.merge(_broadcast(0))
+
+
+def test_merge_keeps_best_rssi():
+    merger = BroadcastMerger()
+    channel_id = (DEVICE_TYPE_HEART_RATE, 1000, 1)
+
+    merger.merge(_broadcast(1, rssi=-80))
+    merger.merge(_broadcast(1, rssi=-50))
+    merger.merge(_broadcast(1, rssi=-70))
+
+    assert merger.rssi(channel_id) == -50
+
+    merger.merge(_broadcast(2, rssi=-75))
+
+    assert merger.rssi(channel_id) == -75
+    assert merger.rssi((DEVICE_TYPE_HEART_RATE, 1, 1)) is None
+
+
+def test_merge_from_two_threads():
+    # The history holds all broadcasts, so a thread that runs ahead does not make the copies of the other new
+    merger = BroadcastMerger(history=200)
+    broadcasts = [_broadcast(beat_count, device_number) for beat_count in range(200) for device_number in range(20)]
+    barrier = Barrier(2)
+    merged = [0, 0]
+
+    def merge(index: int):
+        barrier.wait()
+        # Both devices receive every broadcast, only one of the copies is passed on
+        merged[index] = sum(merger.merge(message) for message in broadcasts)
+
+    threads = [Thread(target=merge, args=(index,)) for index in range(2)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert sum(merged) == len(broadcasts)
+    assert merger.duplicates == len(broadcasts)
+
+
+def test_merge_without_channel_id():
+    merger = BroadcastMerger()
+    message = BroadcastDataMessage(0, bytes(8))
+
+    assert merger.merge(message)
+    assert merger.merge(message)
+
+
+def test_wrap():
+    merger = BroadcastMerger()
+    received = []
+    handler = merger.wrap(received.append)
+    response = ChannelResponseMessage(0, 1, 0)
+
+    handler(_broadcast(1))
+    handler(_broadcast(1))
+    handler(response)
+
+    assert len(received) == 2
+    assert received[1] is response
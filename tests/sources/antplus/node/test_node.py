@@ -0,0 +1,177 @@
+import concurrent.futures
+from typing import List
+
+import pytest
+import pytest_mock
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.configuration_messages import CloseChannelMessage, \
+    UnassignChannelMessage
+from lightuptraining.sources.antplus.messages.util import calculate_checksum
+from lightuptraining.sources.antplus.node.exceptions import NoChannelAvailableException
+from lightuptraining.sources.antplus.node.node import Node
+from lightuptraining.sources.antplus.profiles.heart_rate_monitor import HeartRateMonitorProfile
+
+NETWORK_KEY = [1, 2, 3, 4, 5, 6, 7, 8]
+
+
+def _frame(message_id: int, *content: int) -> bytes:
+    frame = [0xA4, len(content), message_id, *content]
+    return bytes(frame + [calculate_checksum(frame)])
+
+
+def _response(channel_number: int, message_id: int, message_code: int = 0) -> bytes:
+    return _frame(const.MESSAGE_CHANNEL_RESPONSE, channel_number, message_id, message_code)
+
+
+def _configuration_responses(profile: HeartRateMonitorProfile, channel_number: int) -> bytes:
+    return b''.join(_response(message.content[0], message.message_id)
+                    for message in profile.configuration_messages(channel_number))
+
+
+@pytest.fixture()
+def mock_write(mocker: pytest_mock.MockerFixture, open_usb_device):
+    return mocker.patch.object(open_usb_device, '_write', side_effect=lambda data, timeout: len(data))
+
+
+@pytest.fixture()
+def node(open_usb_device, mock_write) -> Node:
+    open_usb_device._buffer.put(_frame(const.MESSAGE_CAPABILITIES, 2, 1, 0, 0, 0, 0))
+    return Node(open_usb_device, timeout=0.1)
+
+
+def test_capabilities(node, mock_write):
+    assert node.max_channels == 2
+    assert node.capabilities.max_networks == 1
+    assert node.available_channels == 2
+
+    # The capabilities are only requested once
+    assert node.capabilities is node.capabilities
+    mock_write.assert_called_once_with(b'\xa4\x02\x4d\x00\x54\xbf', None)
+
+
+def test_capabilities_timeout(open_usb_device, mock_write):
+    with pytest.raises(concurrent.futures.TimeoutError):
+        _ = Node(open_usb_device, timeout=0.05).capabilities
+
+
+def test_allocate(node):
+    assert node.allocate(HeartRateMonitorProfile(NETWORK_KEY), print) == 0
+    assert node.allocate(HeartRateMonitorProfile(NETWORK_KEY), print) == 1
+    assert node.available_channels == 0
+
+    with pytest.raises(NoChannelAvailableException) as wrapped_e:
+        node.allocate(HeartRateMonitorProfile(NETWORK_KEY), print)
+
+    assert 'no channel available, all 2 channels are allocated' in str(wrapped_e.value)
+
+
+def test_open_channels(node, mock_write):
+    profiles = [HeartRateMonitorProfile(NETWORK_KEY), HeartRateMonitorProfile(NETWORK_KEY)]
+    channel_numbers = [node.allocate(profile, print) for profile in profiles]
+
+    for profile, channel_number in zip(profiles, channel_numbers):
+        node.device._buffer.put(_configuration_responses(profile, channel_number))
+
+    assert node.open_channels() == [0, 1]
+    assert node.open_channels() == []
+
+
+def test_open_channels_timeout_keeps_channels_unopened(node, mock_write):
+    profile = HeartRateMonitorProfile(NETWORK_KEY)
+    channel_number = node.allocate(profile, print)
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        node.open_channels()
+
+    # The configuration is sent again, because the channel was not opened
+    node.device._buffer.put(_configuration_responses(profile, channel_number))
+
+    assert node.open_channels() == [channel_number]
+    assert node.open_channels() == []
+
+
+def test_process_dispatches_by_channel(node):
+    received: List[List[int]] = [[], []]
+    node.allocate(HeartRateMonitorProfile(NETWORK_KEY), lambda message: received[0].append(message.payload[7]))
+    node.allocate(HeartRateMonitorProfile(NETWORK_KEY), lambda message: received[1].append(message.payload[7]))
+
+    node.device._buffer.put(_frame(const.MESSAGE_BROADCAST_DATA, 1, 0, 0, 0, 0, 0, 0, 0, 60))
+    node.device._buffer.put(_frame(const.MESSAGE_BROADCAST_DATA, 0, 0, 0, 0, 0, 0, 0, 0, 70))
+    node.device._buffer.put(_frame(const.MESSAGE_BROADCAST_DATA, 5, 0, 0, 0, 0, 0, 0, 0, 80))
+
+    assert node.process() == 2
+    assert received == [[70], [60]]
+
+
+def test_release(node, mock_write):
+    profile = HeartRateMonitorProfile(NETWORK_KEY)
+    channel_number = node.allocate(profile, print)
+    node.device._buffer.put(_configuration_responses(profile, channel_number))
+    node.open_channels()
+
+    node.release(channel_number)
+
+    assert node.profile(channel_number) is None
+    assert node.available_channels == 1
+    assert mock_write.call_args.args[0] == CloseChannelMessage(channel_number).encode()
+
+    node.device._buffer.put(_response(channel_number, const.MESSAGE_CLOSE_CHANNEL))
+    node.device._buffer.put(_response(channel_number, const.CHANNEL_EVENT_MESSAGE_ID, const.EVENT_CHANNEL_CLOSED))
+
+    assert node.process() == 0
+    assert node.available_channels == 2
+    assert mock_write.call_args.args[0] == UnassignChannelMessage(channel_number).encode()
+
+
+def test_release_unopened_channel(node, mock_write):
+    channel_number = node.allocate(HeartRateMonitorProfile(NETWORK_KEY), print)
+    node.release(channel_number)
+
+    assert node.available_channels == 2
+    assert node.open_channels() == []
+
+
+def test_release_not_allocated(node):
+    with pytest.raises(ValueError) as wrapped_e:
+        node.release(1)
+
+    assert 'channel 1 is not allocated' in str(wrapped_e.value)
+
+
+def test_restore_channels(node, mock_write):
+    profile = HeartRateMonitorProfile(NETWORK_KEY)
+    channel_number = node.allocate(profile, print)
+    node.device._buffer.put(_configuration_responses(profile, channel_number))
+    node.open_channels()
+    mock_write.reset_mock()
+
+    node.device._buffer.put(_configuration_responses(profile, channel_number))
+
+    assert node.restore_channels() == [channel_number]
+    mock_write.assert_called_once_with(profile.encoded_configuration(channel_number), None)
+
+
+def test_supervise_restores_channels_on_process(node, mock_write, mocker: pytest_mock.MockerFixture):
+    mocker.patch.object(node.device, 'reconnect')
+    profile = HeartRateMonitorProfile(NETWORK_KEY)
+    channel_number = node.allocate(profile, print)
+    node.device._buffer.put(_configuration_responses(profile, channel_number))
+    node.open_channels()
+    mock_write.reset_mock()
+
+    supervisor = node.supervise(interval=0.01)
+    assert node.supervise() is supervisor
+
+    # The supervisor thread only flags the reconnect, the channels are restored by the processing thread
+    assert supervisor._reconnect(0.0)
+    mock_write.assert_not_called()
+
+    node.device._buffer.put(_configuration_responses(profile, channel_number))
+    node.process()
+    mock_write.assert_called_once_with(profile.encoded_configuration(channel_number), None)
+
+    node.close()
+
+    assert not supervisor.is_alive()
+    assert not node.device.is_open
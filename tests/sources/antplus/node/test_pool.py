@@ -0,0 +1,100 @@
+from typing import List
+
+import pytest
+import pytest_mock
+
+from lightuptraining.sources.antplus.node.exceptions import NoChannelAvailableException
+from lightuptraining.sources.antplus.node.pool import NodePool
+from lightuptraining.sources.antplus.profiles.heart_rate_monitor import HeartRateMonitorProfile
+from lightuptraining.sources.antplus.usbdevice.exceptions import USBDeviceException
+
+NETWORK_KEY = [1, 2, 3, 4, 5, 6, 7, 8]
+
+
+class FakeNode:
+    def __init__(self, max_channels: int):
+        self.max_channels = max_channels
+        self.allocated: List[int] = []
+        self.waited = False
+
+    @property
+    def available_channels(self) -> int:
+        return self.max_channels - len(self.allocated)
+
+    def allocate(self, profile, handler) -> int:
+        self.allocated.append(len(self.allocated))
+        return self.allocated[-1]
+
+    def configure_channels(self):
+        return list(self.allocated), ['future'] * len(self.allocated)
+
+    def confirm_channels(self, channel_numbers, futures):
+        self.waited = True
+        return channel_numbers
+
+    def process(self) -> int:
+        return len(self.allocated)
+
+
+def test_allocate_balances_load():
+    small, large = FakeNode(4), FakeNode(8)
+    pool = NodePool([small, large])
+
+    for _ in range(9):
+        pool.allocate(HeartRateMonitorProfile(NETWORK_KEY), print)
+
+    assert len(small.allocated) == 3
+    assert len(large.allocated) == 6
+    assert pool.available_channels == 3
+    assert pool.max_channels == 12
+
+
+def test_allocate_no_channel_available():
+    pool = NodePool([FakeNode(1), FakeNode(1)])
+    pool.allocate(HeartRateMonitorProfile(NETWORK_KEY), print)
+    pool.allocate(HeartRateMonitorProfile(NETWORK_KEY), print)
+
+    with pytest.raises(NoChannelAvailableException) as wrapped_e:
+        pool.allocate(HeartRateMonitorProfile(NETWORK_KEY), print)
+
+    assert 'no channel available, all 2 channels are allocated' in str(wrapped_e.value)
+
+
+def test_open_channels():
+    first, second = FakeNode(8), FakeNode(8)
+    pool = NodePool([first, second])
+    pool.allocate(HeartRateMonitorProfile(NETWORK_KEY), print)
+
+    assert pool.open_channels() == {first: [0]}
+    assert first.waited and second.waited
+
+
+def test_process():
+    pool = NodePool([FakeNode(8), FakeNode(8)])
+
+    for _ in range(3):
+        pool.allocate(HeartRateMonitorProfile(NETWORK_KEY), print)
+
+    assert pool.process() == 3
+
+
+def test_from_devices(mocker: pytest_mock.MockerFixture):
+    devices = [mocker.MagicMock(), mocker.MagicMock()]
+    mocker.patch('lightuptraining.sources.antplus.node.pool.USBDevice.find_all', return_value=devices)
+
+    pool = NodePool.from_devices(0x01, 0x02, timeout=0.5)
+
+    assert [node.device for node in pool.nodes] == devices
+    assert all(node.timeout == 0.5 for node in pool.nodes)
+
+    for device in devices:
+        device.open.assert_called_once()
+
+
+def test_from_devices_not_found(mocker: pytest_mock.MockerFixture):
+    mocker.patch('lightuptraining.sources.antplus.node.pool.USBDevice.find_all', return_value=[])
+
+    with pytest.raises(USBDeviceException) as wrapped_e:
+        NodePool.from_devices(0x01, 0x02)
+
+    assert 'device not found' in str(wrapped_e.value)
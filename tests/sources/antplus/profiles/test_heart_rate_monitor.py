@@ -22,3 +22,13 @@ def test_heart_rate_monitor_wildcards():
     hrm = HeartRateMonitorProfile(network_key)
 
     assert hrm.channel_id == (DEVICE_TYPE_HEART_RATE, 0, 0)
+
+
+def test_heart_rate_monitor_decode():
+    hrm = HeartRateMonitorProfile([1, 2, 3, 4, 5, 6, 7, 8])
+
+    assert hrm.decode(bytes([0x04, 0x01, 0x02, 0x03, 0x00, 0x04, 0x2a, 0x48])) == {
+        'heart_beat_event_time': 1024,
+        'heart_beat_count': 42,
+        'heart_rate': 72,
+    }
@@ -0,0 +1,73 @@
+import pytest
+
+from lightuptraining.sources.antplus.messages.configuration_messages import SetNetworkKeyMessage, \
+    AssignChannelMessage, SetChannelIdMessage, SetChannelPeriodMessage, SetSearchTimeoutMessage, \
+    SetRfFrequencyMessage, OpenChannelMessage
+from lightuptraining.sources.antplus.profiles.const import SLAVE_RECEIVE_ONLY_CHANNEL, DEVICE_TYPE_HEART_RATE
+from lightuptraining.sources.antplus.profiles.heart_rate_monitor import HeartRateMonitorProfile
+from lightuptraining.sources.antplus.profiles.profile import AbstractProfile
+
+NETWORK_KEY = [1, 2, 3, 4, 5, 6, 7, 8]
+
+
+def test_configuration_messages():
+    profile = HeartRateMonitorProfile(NETWORK_KEY, device_number=1000, transmission_type=1)
+    messages = profile.configuration_messages(2, network_number=1)
+
+    assert [type(message) for message in messages] == [
+        SetNetworkKeyMessage, AssignChannelMessage, SetChannelIdMessage, SetChannelPeriodMessage,
+        SetSearchTimeoutMessage, SetRfFrequencyMessage, OpenChannelMessage,
+    ]
+    assert messages[0].content == [1, *NETWORK_KEY]
+    assert messages[1].content == [2, SLAVE_RECEIVE_ONLY_CHANNEL, 1]
+    assert messages[2].content == [2, 232, 3, DEVICE_TYPE_HEART_RATE, 1]
+    assert messages[3].encode() == SetChannelPeriodMessage(2, 8070).encode()
+    assert messages[4].content == [2, profile.search_timeout]
+    assert messages[5].content == [2, 0x39]
+    assert messages[6].content == [2]
+
+
+def test_configuration_messages_are_cached():
+    profile = HeartRateMonitorProfile(NETWORK_KEY)
+    messages = profile.configuration_messages(0)
+
+    assert profile.configuration_messages(0) is messages
+    assert profile.configuration_messages(1) is not messages
+
+
+def test_clear_configuration_cache():
+    profile = HeartRateMonitorProfile(NETWORK_KEY)
+    messages = profile.configuration_messages(0)
+
+    profile.clear_configuration_cache()
+
+    assert profile.configuration_messages(0) is not messages
+
+
+def test_encoded_configuration():
+    profile = HeartRateMonitorProfile(NETWORK_KEY)
+    encoded = profile.encoded_configuration(0)
+
+    assert encoded == b''.join(message.encode() for message in profile.configuration_messages(0))
+    assert len(encoded) == 13 + 7 + 9 + 7 + 6 + 6 + 5
+
+
+def test_profile_must_implement_decode():
+    class IncompleteProfile(AbstractProfile):
+        pass
+
+    with pytest.raises(TypeError) as wrapped_e:
+        IncompleteProfile()
+
+    assert 'decode' in str(wrapped_e.value)
+
+
+def test_profile_without_super_init():
+    class Profile(HeartRateMonitorProfile):
+        def __init__(self):
+            self._set_channel_id(DEVICE_TYPE_HEART_RATE, 1, 1)
+            self.network_key = NETWORK_KEY
+
+    messages = Profile().configuration_messages(0)
+
+    assert messages[2].content[1:4] == [1, 0, DEVICE_TYPE_HEART_RATE]
@@ -0,0 +1,167 @@
+from typing import Generator
+
+import pytest
+import pytest_mock
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.configuration_messages import CloseChannelMessage, \
+    EnableExtendedMessagesMessage, OpenRxScanModeMessage
+from lightuptraining.sources.antplus.messages.data_messages import BroadcastDataMessage
+from lightuptraining.sources.antplus.messages.util import calculate_checksum
+from lightuptraining.sources.antplus.node.merger import BroadcastMerger
+from lightuptraining.sources.antplus.profiles.const import DEVICE_TYPE_BIKE_POWER, DEVICE_TYPE_HEART_RATE
+from lightuptraining.sources.antplus.profiles.heart_rate_monitor import HeartRateMonitorProfile
+from lightuptraining.sources.antplus.scan_mode import ScanModeSource
+from lightuptraining.sources.dispatcher import Dispatcher, OverflowPolicy
+
+NETWORK_KEY = [1, 2, 3, 4, 5, 6, 7, 8]
+
+
+class Output:
+    def __init__(self):
+        self.values = []
+
+    def notify(self, value):
+        self.values.append(value)
+
+
+def _broadcast(device_number: int, heart_rate: int, beat_count: int = 0, device_type: int = DEVICE_TYPE_HEART_RATE,
+               rssi: int = -60) -> BroadcastDataMessage:
+    payload = bytes([0, 0, 0, 0, 0, 0, beat_count, heart_rate])
+    return BroadcastDataMessage(0, payload, device_number, device_type, 1, rssi)
+
+
+@pytest.fixture()
+def mock_write(mocker: pytest_mock.MockerFixture, open_usb_device):
+    return mocker.patch.object(open_usb_device, '_write', side_effect=lambda data, timeout: len(data))
+
+
+@pytest.fixture()
+def source(open_usb_device, mock_write) -> Generator[ScanModeSource, None, None]:
+    # Values are not dropped, so every notification can be checked
+    dispatcher = Dispatcher(policy=OverflowPolicy.BLOCK)
+    source = ScanModeSource(open_usb_device, HeartRateMonitorProfile(NETWORK_KEY), timeout=0.5, dispatcher=dispatcher)
+    output = Output()
+    source.attach_output(output)
+    yield source
+    source.close()
+
+
+def test_configuration_messages(source):
+    messages = source.configuration_messages()
+
+    assert isinstance(messages[-2], EnableExtendedMessagesMessage)
+    assert isinstance(messages[-1], OpenRxScanModeMessage)
+    assert messages[2].content == [0, 0, 0, DEVICE_TYPE_HEART_RATE, 0]
+
+
+def test_handle_demultiplexes_sensors(source):
+    output = source.dispatcher.outputs[0]
+
+    for device_number in range(300):
+        source.handle(_broadcast(device_number, 60 + device_number % 100))
+
+    source.dispatcher.join()
+
+    assert len(source.sensors) == 300
+    assert source.sensors[150].rssi == -60
+    assert output.values[150] == {
+        'heart_beat_event_time': 0, 'heart_beat_count': 0, 'heart_rate': 110, 'device_number': 150,
+    }
+
+
+def test_handle_unchanged_payload(source):
+    output = source.dispatcher.outputs[0]
+
+    source.handle(_broadcast(1, 60))
+    source.handle(_broadcast(1, 60))
+    sensor = source.handle(_broadcast(1, 61, beat_count=1))
+    source.dispatcher.join()
+
+    assert sensor.messages == 3
+    assert [value['heart_rate'] for value in output.values] == [60, 61]
+
+
+@pytest.mark.parametrize('message', [
+    BroadcastDataMessage(0, bytes(8)),
+    _broadcast(1, 60, device_type=DEVICE_TYPE_BIKE_POWER),
+])
+def test_handle_ignored_messages(source, message):
+    assert source.handle(message) is None
+    assert source.sensors == {}
+    source.dispatcher.join()
+    assert source.dispatcher.outputs[0].values == []
+
+
+def test_remove_stale_sensors(source):
+    source.handle(_broadcast(1, 60))
+    source.handle(_broadcast(2, 60))
+    source.sensors[1].last_seen -= 10
+
+    assert source.remove_stale_sensors(5) == [1]
+    assert list(source.sensors) == [2]
+
+
+def test_start_stop(source, mock_write):
+    device = source.device
+
+    for message in source.configuration_messages():
+        frame = [0xA4, 3, const.MESSAGE_CHANNEL_RESPONSE, message.content[0], message.message_id, 0]
+        device._buffer.put(bytes(frame + [calculate_checksum(frame)]))
+
+    frame = [0xA4, 14, const.MESSAGE_BROADCAST_DATA, 0, 0, 0, 0, 0, 0, 0, 0, 72, 0x80, 0x39, 0x30,
+             DEVICE_TYPE_HEART_RATE, 1]
+    device._buffer.put(bytes(frame + [calculate_checksum(frame)]))
+
+    source.start()
+
+    for _ in range(100):
+        if source.sensors:
+            break
+
+        source._stopped.wait(0.01)
+
+    source.stop()
+    output = source.dispatcher.outputs[0]
+
+    assert source.sensors[12345].payload[7] == 72
+    assert mock_write.call_args.args[0] == CloseChannelMessage(0).encode()
+    # Stopping waits until the outputs handled the dispatched values
+    assert output.values[0]['heart_rate'] == 72
+
+    source.close()
+
+    assert len(source.dispatcher) == 0
+
+
+def test_handle_shared_merger(open_usb_device, mock_write):
+    merger = BroadcastMerger()
+    sources = [ScanModeSource(open_usb_device, HeartRateMonitorProfile(NETWORK_KEY), merger=merger) for _ in range(2)]
+    output = Output()
+
+    for source in sources:
+        source.attach_output(output)
+
+    assert sources[0].handle(_broadcast(1, 60, rssi=-70)) is not None
+    assert sources[1].handle(_broadcast(1, 60, rssi=-50)).rssi == -50
+
+    for source in sources:
+        source.dispatcher.join()
+
+    assert len(output.values) == 1
+    assert merger.rssi((DEVICE_TYPE_HEART_RATE, 1, 1)) == -50
+
+
+def test_handle_repeated_payload_with_merger(source):
+    source.merger = BroadcastMerger()
+    output = source.dispatcher.outputs[0]
+
+    source.handle(_broadcast(1, 60))
+    source.sensors[1].last_seen -= 10
+    sensor = source.handle(_broadcast(1, 60, rssi=-55))
+    source.dispatcher.join()
+
+    assert sensor.messages == 2
+    assert sensor.rssi == -55
+    assert source.remove_stale_sensors(5) == []
+    assert [value['heart_rate'] for value in output.values] == [60]
@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.channel_response_message import ChannelResponseMessage
+from lightuptraining.sources.antplus.messages.configuration_messages import AssignChannelMessage, \
+    OpenChannelMessage, RequestMessage, SetChannelIdMessage
+from lightuptraining.sources.antplus.messages.data_messages import BroadcastDataMessage
+from lightuptraining.sources.antplus.messages.exceptions import ChannelResponseException
+from lightuptraining.sources.antplus.messages.requested_messages import CapabilitiesMessage
+from lightuptraining.sources.antplus.profiles.const import DEVICE_TYPE_HEART_RATE
+from lightuptraining.sources.antplus.profiles.heart_rate_monitor import HeartRateMonitorProfile
+from lightuptraining.sources.antplus.scan_mode import ScanModeSource
+from lightuptraining.sources.antplus.usbdevice.aio import AsyncUSBDevice
+from lightuptraining.sources.antplus.usbdevice.device import USBDevice
+from lightuptraining.sources.antplus.usbdevice.exceptions import USBDeviceException
+from lightuptraining.sources.antplus.usbdevice.simulator import SIMULATED_PRODUCT_ID, SIMULATED_VENDOR_ID, \
+    SimulatedDevice, VirtualHeartRateMonitor
+
+NETWORK_KEY = [1, 2, 3, 4, 5, 6, 7, 8]
+
+
+class Output:
+    def __init__(self):
+        self.values = []
+
+    def notify(self, value):
+        self.values.append(value)
+
+
+def _device(*sensors: VirtualHeartRateMonitor) -> AsyncUSBDevice:
+    simulator = SimulatedDevice(sensors, max_channels=4)
+    return AsyncUSBDevice(USBDevice(SIMULATED_VENDOR_ID, SIMULATED_PRODUCT_ID, device=simulator))
+
+
+def test_send():
+    async def send():
+        async with _device() as device:
+            capabilities = await device.send(RequestMessage(0, const.MESSAGE_CAPABILITIES))
+            responses = await device.send_batch([AssignChannelMessage(0, 0, 0), OpenChannelMessage(0)])
+
+            with pytest.raises(ChannelResponseException):
+                await device.send(OpenChannelMessage(1))
+
+            return capabilities, responses
+
+    capabilities, responses = asyncio.run(send())
+
+    assert isinstance(capabilities, CapabilitiesMessage)
+    assert capabilities.max_channels == 4
+    assert [response.response_message_id for response in responses] == \
+        [const.MESSAGE_ASSIGN_CHANNEL, const.MESSAGE_OPEN_CHANNEL]
+
+
+def test_read_frame_and_messages():
+    async def receive():
+        async with _device(VirtualHeartRateMonitor(1, rate=200)) as device:
+            written = await device.write(RequestMessage(0, const.MESSAGE_CAPABILITIES))
+            frame = await device.read_frame()
+
+            await device.send_batch([AssignChannelMessage(0, 0, 0), SetChannelIdMessage(0, 0, DEVICE_TYPE_HEART_RATE, 0),
+                                     OpenChannelMessage(0)])
+            messages = []
+
+            async for message in device:
+                messages.append(message)
+
+                if sum(isinstance(message, BroadcastDataMessage) for message in messages) == 5:
+                    break
+
+            return written, frame, messages
+
+    written, frame, messages = asyncio.run(receive())
+
+    assert written == 6
+    assert frame[2] == const.MESSAGE_CAPABILITIES
+    # The responses that were awaited are also yielded, in the order they were received
+    assert [type(message) for message in messages[:3]] == [ChannelResponseMessage] * 3
+    assert all(isinstance(message, BroadcastDataMessage) for message in messages[3:])
+
+
+def test_close_ends_reads():
+    async def read_after_close():
+        device = _device()
+        await device.open()
+        reader = asyncio.ensure_future(device.read_frame())
+        await asyncio.sleep(0.01)
+        await device.close()
+
+        with pytest.raises(USBDeviceException) as wrapped_e:
+            await reader
+
+        assert 'device is closed' in str(wrapped_e.value)
+        assert [message async for message in device] == []
+        assert not device.is_open
+        assert not device.device.is_open
+
+        with pytest.raises(USBDeviceException):
+            await device.write(RequestMessage(0, const.MESSAGE_CAPABILITIES))
+
+    asyncio.run(read_after_close())
+
+
+def test_bridge_error_ends_reads(mocker):
+    async def read_after_error():
+        device = _device()
+        mocker.patch.object(device.device, 'read_frames', side_effect=OSError('unexpected'))
+        await device.open()
+
+        try:
+            with pytest.raises(USBDeviceException) as wrapped_e:
+                await asyncio.wait_for(device.read_frame(), 1)
+        finally:
+            await device.close()
+
+        assert 'device is closed' in str(wrapped_e.value)
+
+    asyncio.run(read_after_error())
+
+
+def test_scan_mode_source_run():
+    async def run():
+        async with _device(*(VirtualHeartRateMonitor(device_number, rate=100) for device_number in (1, 2, 3))) \
+                as device:
+            source = ScanModeSource(device.device, HeartRateMonitorProfile(NETWORK_KEY))
+            source.attach_output(Output())
+            task = asyncio.ensure_future(source.run(device))
+
+            while len(source.sensors) < 3:
+                await asyncio.sleep(0.01)
+
+            task.cancel()
+
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+            return source
+
+    source = asyncio.run(run())
+
+    assert sorted(source.sensors) == [1, 2, 3]
+
+
+def test_scan_mode_source_run_requires_its_device():
+    source = ScanModeSource(_device().device, HeartRateMonitorProfile(NETWORK_KEY))
+
+    with pytest.raises(ValueError) as wrapped_e:
+        asyncio.run(source.run(_device()))
+
+    assert 'async device does not wrap the device of the source' in str(wrapped_e.value)
@@ -0,0 +1,135 @@
+from threading import Thread
+
+import pytest
+
+from lightuptraining.sources.antplus.usbdevice.buffer import RingBuffer
+
+
+def test_ring_buffer_invalid_capacity():
+    with pytest.raises(ValueError) as wrapped_e:
+        RingBuffer(0)
+
+    assert 'capacity must be greater than 0' in str(wrapped_e.value)
+
+
+def test_put_get():
+    buffer = RingBuffer(8)
+    buffer.put(b'\x01\x02\x03')
+
+    assert len(buffer) == 3
+    assert buffer.get(2) == b'\x01\x02'
+    assert buffer.get(1) == b'\x03'
+    assert len(buffer) == 0
+
+
+def test_put_iterable_of_ints():
+    buffer = RingBuffer(8)
+    buffer.put([1, 2, 3])
+
+    assert buffer.get() == b'\x01\x02\x03'
+
+
+def test_get_not_enough_bytes():
+    buffer = RingBuffer(8)
+    buffer.put(b'\x01\x02')
+
+    assert buffer.get(3) == b''
+    assert len(buffer) == 2
+
+
+def test_get_all():
+    buffer = RingBuffer(8)
+    buffer.put(b'\x01\x02')
+    buffer.put(b'\x03')
+
+    assert buffer.get() == b'\x01\x02\x03'
+    assert buffer.get() == b''
+
+
+def test_wrap_around():
+    buffer = RingBuffer(4)
+    buffer.put(b'\x01\x02\x03')
+    assert buffer.get(2) == b'\x01\x02'
+
+    buffer.put(b'\x04\x05\x06')
+
+    assert buffer.capacity == 4
+    assert buffer.get() == b'\x03\x04\x05\x06'
+
+
+def test_grow():
+    buffer = RingBuffer(4)
+    buffer.put(b'\x01\x02\x03')
+    assert buffer.get(2) == b'\x01\x02'
+
+    buffer.put(b'\x04\x05\x06\x07\x08')
+
+    assert buffer.capacity == 8
+    assert buffer.get() == b'\x03\x04\x05\x06\x07\x08'
+
+
+def test_put_closed():
+    buffer = RingBuffer(4)
+    buffer.close()
+
+    with pytest.raises(ValueError) as wrapped_e:
+        buffer.put(b'\x01')
+
+    assert 'cannot write to a closed buffer' in str(wrapped_e.value)
+
+
+def test_wait_for():
+    buffer = RingBuffer(4)
+    buffer.put(b'\x01\x02')
+
+    assert buffer.wait_for(2, timeout=0)
+    assert not buffer.wait_for(3, timeout=0.01)
+
+
+def test_wait_for_producer_thread():
+    buffer = RingBuffer(4)
+    producer = Thread(target=buffer.put, args=(b'\x01\x02\x03',))
+    producer.start()
+
+    assert buffer.wait_for(3, timeout=1)
+    producer.join()
+    assert buffer.get(3) == b'\x01\x02\x03'
+
+
+def test_wait_for_closed():
+    buffer = RingBuffer(4)
+    closer = Thread(target=buffer.close)
+    closer.start()
+
+    assert not buffer.wait_for(1)
+    closer.join()
+
+
+def test_get_into():
+    buffer = RingBuffer(8)
+    buffer.put(b'\x01\x02\x03')
+    target = bytearray(2)
+
+    assert buffer.get_into(target) == 2
+    assert target == b'\x01\x02'
+    assert len(buffer) == 1
+
+
+def test_get_into_wrap_around():
+    buffer = RingBuffer(4)
+    buffer.put(b'\x01\x02\x03')
+    buffer.get(2)
+    buffer.put(b'\x04\x05\x06')
+    target = bytearray(8)
+
+    assert buffer.get_into(memoryview(target)[2:]) == 4
+    assert target == b'\x00\x00\x03\x04\x05\x06\x00\x00'
+    assert len(buffer) == 0
+
+
+def test_get_into_empty():
+    buffer = RingBuffer(4)
+    target = bytearray(4)
+
+    assert buffer.get_into(target) == 0
+    assert target == bytearray(4)
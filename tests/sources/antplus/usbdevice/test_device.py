@@ -3,6 +3,9 @@ import platform
 import pytest
 import pytest_mock
 
+from lightuptraining.sources.antplus.messages.configuration_messages import OpenChannelMessage
+from lightuptraining.sources.antplus.messages.decoder import decode_frame
+from lightuptraining.sources.antplus.messages.exceptions import ChannelResponseException
 from lightuptraining.sources.antplus.usbdevice.device import USBDevice
 from lightuptraining.sources.antplus.usbdevice.exceptions import USBDeviceException
 
@@ -328,9 +331,7 @@ def test__device_release_interface(mocker: pytest_mock.MockerFixture, mocked_usb
 
 def test__read(mocked_usb_device):
     mocked_usb_device.open()
-    mocked_usb_device._message_queue.put_nowait(1)
-    mocked_usb_device._message_queue.put_nowait(2)
-    mocked_usb_device._message_queue.put_nowait(3)
+    mocked_usb_device._buffer.put(b'\x01\x02\x03')
 
     byte_1 = mocked_usb_device._read(1)
     byte_2 = mocked_usb_device._read(1)
@@ -343,9 +344,7 @@ def test__read(mocked_usb_device):
 
 def test__read_multiple_bytes(mocked_usb_device):
     mocked_usb_device.open()
-    mocked_usb_device._message_queue.put_nowait(1)
-    mocked_usb_device._message_queue.put_nowait(2)
-    mocked_usb_device._message_queue.put_nowait(3)
+    mocked_usb_device._buffer.put(b'\x01\x02\x03')
 
     byte_data = mocked_usb_device._read(3)
 
@@ -354,15 +353,32 @@ def test__read_multiple_bytes(mocked_usb_device):
 
 def test__read_not_enough_bytes(mocked_usb_device):
     mocked_usb_device.open()
-    mocked_usb_device._message_queue.put_nowait(1)
-    mocked_usb_device._message_queue.put_nowait(2)
-    mocked_usb_device._message_queue.put_nowait(3)
+    mocked_usb_device._buffer.put(b'\x01\x02\x03')
 
     byte_data = mocked_usb_device._read(4)
 
     assert byte_data == b''
 
 
+def test__read_zero_bytes(mocked_usb_device):
+    mocked_usb_device.open()
+    mocked_usb_device._buffer.put(b'\xa4\x01J\x00\xef')
+
+    byte_data = mocked_usb_device._read(5)
+
+    assert byte_data == b'\xa4\x01J\x00\xef'
+
+
+def test__read_timeout(mocked_usb_device):
+    mocked_usb_device.open()
+    mocked_usb_device._buffer.put(b'\x01')
+
+    byte_data = mocked_usb_device._read(2, timeout=0.01)
+
+    assert byte_data == b''
+    assert len(mocked_usb_device._buffer) == 1
+
+
 def test__read_device_not_open(closed_usb_device):
     with pytest.raises(USBDeviceException) as wrapped_e:
         closed_usb_device._read(1)
@@ -370,6 +386,43 @@ def test__read_device_not_open(closed_usb_device):
     assert 'cannot read from device, device is closed' in str(wrapped_e.value)
 
 
+def test__read_into(mocked_usb_device):
+    mocked_usb_device.open()
+    mocked_usb_device._buffer.put(b'\x01\x02\x03')
+    buffer = bytearray(2)
+
+    assert mocked_usb_device._read_into(buffer) == 2
+    assert buffer == b'\x01\x02'
+    assert mocked_usb_device._read_into(buffer) == 1
+    assert buffer == b'\x03\x02'
+
+
+def test__read_into_timeout(mocked_usb_device):
+    mocked_usb_device.open()
+    buffer = bytearray(2)
+
+    assert mocked_usb_device._read_into(buffer, timeout=0.01) == 0
+
+
+def test__read_into_device_not_open(closed_usb_device):
+    with pytest.raises(USBDeviceException) as wrapped_e:
+        closed_usb_device._read_into(bytearray(1))
+
+    assert 'cannot read from device, device is closed' in str(wrapped_e.value)
+
+
+def test_read_frames(mocked_usb_device):
+    mocked_usb_device.open()
+    mocked_usb_device._buffer.put(b'\x00\xa4\x01K\x01\xef\xa4\x01J')
+
+    assert mocked_usb_device.read_frames() == [b'\xa4\x01K\x01\xef']
+
+    mocked_usb_device._buffer.put(b'\x00\xef')
+
+    assert mocked_usb_device.read_frames() == [b'\xa4\x01J\x00\xef']
+    assert mocked_usb_device.read_frames() == []
+
+
 def test__write(mocker: pytest_mock.MockerFixture, open_usb_device, mock_endpoint):
     mocker.patch(
         'lightuptraining.sources.antplus.usbdevice.device.USBDevice._device_endpoint_out',
@@ -397,3 +450,170 @@ def test_read(mocker: pytest_mock.MockerFixture, open_usb_device):
     mocked_read = mocker.patch.object(open_usb_device, '_read')
     _ = open_usb_device.read(3)
     mocked_read.assert_called_once_with(3, None)
+
+
+def test_read_into(mocker: pytest_mock.MockerFixture, open_usb_device):
+    mocked_read_into = mocker.patch.object(open_usb_device, '_read_into', return_value=0)
+    buffer = bytearray(3)
+    _ = open_usb_device.read_into(buffer)
+    mocked_read_into.assert_called_once_with(buffer, None)
+
+
+def test_send(open_usb_device):
+    future = open_usb_device.send(OpenChannelMessage(1))
+
+    assert not future.done()
+
+    open_usb_device._buffer.put(b'\xa4\x03\x40\x01\x4b\x00\xad')
+
+    messages = open_usb_device.read_messages()
+
+    assert len(messages) == 1
+    assert future.result(timeout=0) is messages[0]
+
+
+def test_resolve(open_usb_device):
+    future = open_usb_device.send(OpenChannelMessage(1))
+    response = decode_frame(b'\xa4\x03\x40\x01\x4b\x00\xad')
+
+    assert open_usb_device.resolve(response)
+    assert future.result(timeout=0) is response
+    assert not open_usb_device.resolve(response)
+
+
+def test_send_error_response(open_usb_device):
+    future = open_usb_device.send(OpenChannelMessage(1))
+    open_usb_device._buffer.put(b'\xa4\x03\x40\x01\x4b\x15\xb8')
+    open_usb_device.read_messages()
+
+    with pytest.raises(ChannelResponseException):
+        future.result(timeout=0)
+
+
+def test_send_closed_device(closed_usb_device):
+    with pytest.raises(USBDeviceException) as wrapped_e:
+        closed_usb_device.send(OpenChannelMessage(1))
+
+    assert 'cannot write to device, device is closed' in str(wrapped_e.value)
+    assert len(closed_usb_device._responses) == 0
+
+
+def test_close_fails_pending_responses(mocker: pytest_mock.MockerFixture, open_usb_device):
+    mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.util.release_interface')
+    future = open_usb_device.send(OpenChannelMessage(1))
+
+    open_usb_device.close()
+
+    with pytest.raises(USBDeviceException) as wrapped_e:
+        future.result(timeout=0)
+
+    assert 'device closed before a response was received' in str(wrapped_e.value)
+
+
+def test_read_messages_skips_unknown_messages(open_usb_device):
+    open_usb_device._buffer.put(b'\xa4\x01\xff\x00\x5a')
+
+    assert open_usb_device.read_messages() == []
+
+
+def test_send_batch(mocker: pytest_mock.MockerFixture, open_usb_device):
+    mock_write = mocker.patch.object(open_usb_device, '_write', side_effect=lambda data, timeout: len(data))
+    messages = [OpenChannelMessage(channel_number) for channel_number in range(16)]
+
+    futures = open_usb_device.send_batch(messages)
+
+    assert len(futures) == 16
+    assert [call.args[0] for call in mock_write.call_args_list] == [
+        b''.join(message.encode() for message in messages[:12]),
+        b''.join(message.encode() for message in messages[12:]),
+    ]
+
+
+def test_send_batch_write_error(mocker: pytest_mock.MockerFixture, open_usb_device):
+    mocker.patch.object(open_usb_device, '_write', side_effect=[60, USBDeviceException('write failed', 1, 2)])
+    messages = [OpenChannelMessage(channel_number) for channel_number in range(16)]
+
+    with pytest.raises(USBDeviceException):
+        open_usb_device.send_batch(messages)
+
+    assert len(open_usb_device._responses) == 12
+
+
+def test_find_all(mocker: pytest_mock.MockerFixture, mock_endpoint):
+    usb_devices = [mocker.MagicMock(), mocker.MagicMock()]
+    mocked_find = mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.core.find', return_value=usb_devices)
+    mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.util.find_descriptor', return_value=mock_endpoint)
+    mocker.patch('lightuptraining.sources.antplus.usbdevice.device.USBThread')
+
+    devices = USBDevice.find_all(0x01, 0x02)
+
+    mocked_find.assert_called_once_with(find_all=True, idVendor=0x01, idProduct=0x02)
+    assert [device._device for device in devices] == usb_devices
+
+
+def test_reconnect(mocker: pytest_mock.MockerFixture, closed_usb_device):
+    mocked_configure_device = mocker.spy(closed_usb_device, '_configure_device')
+    closed_usb_device._buffer.close()
+
+    closed_usb_device.reconnect()
+
+    mocked_configure_device.assert_called_once()
+    assert closed_usb_device.is_open
+    assert not closed_usb_device._buffer.closed
+
+
+def test_reconnect_open_device(open_usb_device):
+    with pytest.raises(USBDeviceException) as wrapped_e:
+        open_usb_device.reconnect()
+
+    assert 'cannot reconnect USB device, device is open' in str(wrapped_e.value)
+
+
+def test_descriptors_are_cached(mocker: pytest_mock.MockerFixture, mock_endpoint):
+    mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.core.find')
+    mocked_find_descriptor = mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.util.find_descriptor',
+                                          return_value=mock_endpoint)
+    mocked_get_interface = mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.control.get_interface',
+                                        return_value=0)
+    mocker.patch('lightuptraining.sources.antplus.usbdevice.device.USBThread')
+
+    device = USBDevice(0x01, 0x02)
+    device.open()
+    find_descriptor_calls = mocked_find_descriptor.call_count
+
+    for channel_number in range(10):
+        device.write(OpenChannelMessage(channel_number))
+
+    # The control transfer to get the interface is only done once, when the device is configured
+    mocked_get_interface.assert_called_once()
+    # Only the endpoint OUT is resolved once more on the first write
+    assert mocked_find_descriptor.call_count == find_descriptor_calls + 1
+    assert device.endpoint_out is device.endpoint_out
+
+
+def test_descriptors_are_refreshed_on_reconnect(mocker: pytest_mock.MockerFixture, closed_usb_device):
+    mocked_get_interface = mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.control.get_interface',
+                                        return_value=0)
+    _ = closed_usb_device.endpoint_out
+
+    closed_usb_device.reconnect()
+
+    mocked_get_interface.assert_called_once()
+    assert closed_usb_device._endpoint_out is None
+
+
+def test_read_depth(mocker: pytest_mock.MockerFixture, mock_endpoint):
+    mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.core.find')
+    mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.util.find_descriptor', return_value=mock_endpoint)
+    mocked_thread = mocker.patch('lightuptraining.sources.antplus.usbdevice.device.BufferedUSBThread')
+
+    device = USBDevice(0x01, 0x02, read_depth=4)
+
+    mocked_thread.assert_called_once_with(device, 4 * 0x40, device._buffer, None)
+
+
+def test_read_depth_invalid():
+    with pytest.raises(ValueError) as wrapped_e:
+        USBDevice(0x01, 0x02, read_depth=0)
+
+    assert 'read depth must be greater than 0' in str(wrapped_e.value)
@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+from lightuptraining.sources.antplus.messages.channel_response_message import ChannelResponseMessage
+from lightuptraining.sources.antplus.messages.configuration_messages import OpenChannelMessage
+from lightuptraining.sources.antplus.usbdevice.exceptions import USBDeviceException
+from lightuptraining.sources.antplus.usbdevice.replay import ReplayDevice
+from lightuptraining.sources.antplus.usbdevice.session import SessionRecorder
+
+RESPONSE = b'\xa4\x03\x40\x01\x4b\x00\xad'
+
+
+@pytest.fixture()
+def session(tmp_path):
+    path = tmp_path / 'session.luts'
+
+    with SessionRecorder(path) as recorder:
+        # A frame split over two chunks, followed by a chunk with two frames
+        recorder.record(RESPONSE[:3], timestamp=10.0)
+        recorder.record(RESPONSE[3:], timestamp=10.05)
+        recorder.record(RESPONSE * 2, timestamp=10.1)
+
+    return path
+
+
+def _read_until_finished(device):
+    messages = []
+    deadline = time.monotonic() + 2
+
+    while not device.finished and time.monotonic() < deadline:
+        messages += device.read_messages(0.01)
+
+    return messages + device.read_messages()
+
+
+@pytest.mark.parametrize('read_depth', [1, 4])
+def test_replay(session, read_depth):
+    device = ReplayDevice(session, realtime=False, read_depth=read_depth)
+    device.open()
+    messages = _read_until_finished(device)
+    device.close()
+
+    assert len(messages) == 3
+    assert all(isinstance(message, ChannelResponseMessage) for message in messages)
+
+
+def test_replay_close_closes_session(session):
+    device = ReplayDevice(session, realtime=False)
+    device.open()
+    device.read_messages(0.01)
+    device.close()
+
+    assert device._reader._mmap.closed
+
+
+def test_replay_realtime(session):
+    device = ReplayDevice(session)
+    start = time.monotonic()
+    device.open()
+    _read_until_finished(device)
+    device.close()
+
+    assert time.monotonic() - start >= 0.1
+
+
+def test_replay_realtime_appended_session(session):
+    # A recording by another process, with timestamps from an unrelated monotonic clock
+    with SessionRecorder(session) as recorder:
+        recorder.record(RESPONSE, timestamp=5000.0)
+        recorder.record(RESPONSE, timestamp=5000.05)
+
+    device = ReplayDevice(session)
+    start = time.monotonic()
+    device.open()
+    messages = _read_until_finished(device)
+    device.close()
+
+    assert len(messages) == 5
+    assert 0.15 <= time.monotonic() - start < 1
+
+
+def test_replay_resolves_sent_messages(session):
+    device = ReplayDevice(session, realtime=False)
+    device.open()
+    future = device.send(OpenChannelMessage(1))
+    _read_until_finished(device)
+    device.close()
+
+    assert future.result(timeout=0).response_message_id == OpenChannelMessage.message_id
+
+
+def test_replay_reconnect(session):
+    with pytest.raises(USBDeviceException) as wrapped_e:
+        ReplayDevice(session).reconnect()
+
+    assert 'cannot reconnect a replay device' in str(wrapped_e.value)
@@ -0,0 +1,96 @@
+import pytest
+
+from lightuptraining.sources.antplus.usbdevice.session import SessionReader, SessionRecorder
+
+
+def _read_all(path):
+    reader = SessionReader(path)
+    # Markers of the recordings are left out
+    records = [(timestamp, bytes(data)) for timestamp, data in reader if data]
+    reader.close()
+    return records
+
+
+def test_record_and_read(tmp_path):
+    path = tmp_path / 'session.luts'
+
+    with SessionRecorder(path) as recorder:
+        recorder.record(b'\x01\x02', timestamp=1.0)
+        recorder.record(memoryview(b'\x03\x04\x05'), timestamp=1.5)
+
+    assert _read_all(path) == [(1.0, b'\x01\x02'), (1.5, b'\x03\x04\x05')]
+
+
+def test_record_appends(tmp_path):
+    path = tmp_path / 'session.luts'
+
+    for timestamp in (1.0, 2.0):
+        with SessionRecorder(path) as recorder:
+            recorder.record(b'\x01', timestamp=timestamp)
+
+    assert _read_all(path) == [(1.0, b'\x01'), (2.0, b'\x01')]
+
+    reader = SessionReader(path)
+    sizes = [len(data) for _, data in reader]
+    reader.close()
+
+    # Every recording starts with a marker
+    assert sizes == [0, 1, 0, 1]
+
+
+def test_record_empty_data(tmp_path):
+    path = tmp_path / 'session.luts'
+
+    with SessionRecorder(path) as recorder:
+        recorder.record(b'', timestamp=1.0)
+
+    assert _read_all(path) == []
+
+
+def test_record_flushes(tmp_path):
+    path = tmp_path / 'session.luts'
+
+    with SessionRecorder(path, flush_interval=0) as recorder:
+        recorder.record(b'\x01\x02', timestamp=1.0)
+
+        # The recorded chunk is in the file before the recorder is closed
+        assert _read_all(path) == [(1.0, b'\x01\x02')]
+
+    with SessionRecorder(path, flush_interval=60) as recorder:
+        recorder.record(b'\x03', timestamp=2.0)
+        recorder.flush()
+
+        assert _read_all(path)[-1] == (2.0, b'\x03')
+
+
+def test_record_closed(tmp_path):
+    recorder = SessionRecorder(tmp_path / 'session.luts')
+    recorder.close()
+
+    with pytest.raises(ValueError) as wrapped_e:
+        recorder.record(b'\x01')
+
+    assert 'cannot record to a closed session' in str(wrapped_e.value)
+
+
+def test_read_truncated_record(tmp_path):
+    path = tmp_path / 'session.luts'
+
+    with SessionRecorder(path) as recorder:
+        recorder.record(b'\x01\x02', timestamp=1.0)
+        recorder.record(b'\x03\x04\x05', timestamp=1.5)
+
+    with open(path, 'r+b') as file:
+        file.truncate(path.stat().st_size - 1)
+
+    assert _read_all(path) == [(1.0, b'\x01\x02')]
+
+
+def test_read_invalid_file(tmp_path):
+    path = tmp_path / 'session.luts'
+    path.write_bytes(b'\x00' * 16)
+
+    with pytest.raises(ValueError) as wrapped_e:
+        SessionReader(path)
+
+    assert 'is not a session file (version 1)' in str(wrapped_e.value)
@@ -0,0 +1,251 @@
+import array
+from typing import List
+
+import pytest
+import usb.core
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.assembler import FrameAssembler
+from lightuptraining.sources.antplus.messages.channel_response_message import ChannelResponseMessage
+from lightuptraining.sources.antplus.messages.configuration_messages import AssignChannelMessage, \
+    CloseChannelMessage, ConfigurationMessage, EnableExtendedMessagesMessage, OpenChannelMessage, \
+    OpenRxScanModeMessage, RequestMessage, SetChannelIdMessage, SystemResetMessage, UnassignChannelMessage
+from lightuptraining.sources.antplus.messages.data_messages import BroadcastDataMessage
+from lightuptraining.sources.antplus.messages.decoder import decode_frame
+from lightuptraining.sources.antplus.messages.exceptions import ChannelResponseException
+from lightuptraining.sources.antplus.messages.message import AbstractMessage
+from lightuptraining.sources.antplus.messages.requested_messages import CapabilitiesMessage
+from lightuptraining.sources.antplus.node.node import Node
+from lightuptraining.sources.antplus.profiles.const import DEVICE_TYPE_BIKE_POWER, DEVICE_TYPE_HEART_RATE
+from lightuptraining.sources.antplus.profiles.heart_rate_monitor import HeartRateMonitorProfile
+from lightuptraining.sources.antplus.usbdevice.device import USBDevice
+from lightuptraining.sources.antplus.usbdevice.simulator import SIMULATED_PRODUCT_ID, SIMULATED_VENDOR_ID, \
+    SimulatedDevice, VirtualHeartRateMonitor, VirtualPowerMeter, VirtualSpeedCadenceSensor
+
+NETWORK_KEY = [1, 2, 3, 4, 5, 6, 7, 8]
+
+
+class Clock:
+    def __init__(self):
+        self.time = 100.0
+
+    def __call__(self) -> float:
+        return self.time
+
+
+@pytest.fixture()
+def clock() -> Clock:
+    return Clock()
+
+
+@pytest.fixture()
+def simulator(clock) -> SimulatedDevice:
+    sensors = [VirtualHeartRateMonitor(1), VirtualHeartRateMonitor(2, rssi=-70), VirtualPowerMeter(3)]
+    return SimulatedDevice(sensors, max_channels=4, idle_timeout=0.001, clock=clock)
+
+
+def _send(simulator: SimulatedDevice, *messages: ConfigurationMessage):
+    simulator.endpoint_out.write(b''.join(message.encode() for message in messages))
+
+
+def _receive(simulator: SimulatedDevice) -> List[AbstractMessage]:
+    assembler = FrameAssembler()
+    messages = []
+
+    while True:
+        try:
+            data = simulator.endpoint_in.read(0x40)
+        except usb.core.USBError:
+            return messages
+
+        messages.extend(decode_frame(frame) for frame in assembler.feed(bytes(data)))
+
+
+def _open_channel(simulator: SimulatedDevice, channel_number: int, device_type: int, device_number: int = 0):
+    _send(simulator, AssignChannelMessage(channel_number, 0, 0),
+          SetChannelIdMessage(channel_number, device_number, device_type, 0),
+          OpenChannelMessage(channel_number))
+    _receive(simulator)
+
+
+def test_usb_device(simulator):
+    device = USBDevice(SIMULATED_VENDOR_ID, SIMULATED_PRODUCT_ID, device=simulator)
+
+    assert device.endpoint_in is simulator.endpoint_in
+    assert device.endpoint_out is simulator.endpoint_out
+    assert simulator._ctx.claimed == {0}
+    assert simulator.configuration_value == 1
+
+    device.open()
+
+    try:
+        assert Node(device).max_channels == 4
+
+        # A reset is answered with a start-up message instead of a channel response
+        future = device.send(SystemResetMessage())
+
+        for _ in range(100):
+            if future.done():
+                break
+
+            device.read_messages(0.01)
+
+        assert future.result(timeout=0).reason == const.STARTUP_COMMAND_RESET
+    finally:
+        device.close()
+
+    assert simulator._ctx.claimed == set()
+
+
+def test_node_open_channels_after_failed_configuration(simulator):
+    respond = simulator._respond
+    failures = [const.INVALID_PARAMETER_PROVIDED]
+
+    def fail_search_timeout_once(channel_number, message_id, code=const.RESPONSE_NO_ERROR):
+        if message_id == const.MESSAGE_CHANNEL_SEARCH_TIMEOUT and failures:
+            code = failures.pop()
+
+        respond(channel_number, message_id, code)
+
+    simulator._respond = fail_search_timeout_once
+    device = USBDevice(SIMULATED_VENDOR_ID, SIMULATED_PRODUCT_ID, device=simulator)
+    device.open()
+
+    try:
+        node = Node(device)
+        channel_number = node.allocate(HeartRateMonitorProfile(NETWORK_KEY), print)
+
+        with pytest.raises(ChannelResponseException) as wrapped_e:
+            node.open_channels()
+
+        assert 'INVALID_PARAMETER_PROVIDED' in str(wrapped_e.value)
+        # The channel was opened by the rest of the configuration, it is closed and unassigned again
+        assert simulator.open_channels == []
+        assert channel_number not in simulator._channels
+
+        assert node.open_channels() == [channel_number]
+        assert simulator.open_channels == [channel_number]
+    finally:
+        device.close()
+
+
+def test_configuration_responses(simulator):
+    _send(simulator, AssignChannelMessage(0, 0, 0), SetChannelIdMessage(0, 0, DEVICE_TYPE_HEART_RATE, 0),
+          OpenChannelMessage(0), OpenChannelMessage(0), OpenChannelMessage(1), AssignChannelMessage(4, 0, 0))
+
+    responses = [(message.response_channel_id, message.response_message_id, message.response_message_code)
+                 for message in _receive(simulator) if isinstance(message, ChannelResponseMessage)]
+
+    assert responses == [
+        (0, const.MESSAGE_ASSIGN_CHANNEL, const.RESPONSE_NO_ERROR),
+        (0, const.MESSAGE_CHANNEL_ID, const.RESPONSE_NO_ERROR),
+        (0, const.MESSAGE_OPEN_CHANNEL, const.RESPONSE_NO_ERROR),
+        (0, const.MESSAGE_OPEN_CHANNEL, const.CHANNEL_IN_WRONG_STATE),
+        (1, const.MESSAGE_OPEN_CHANNEL, const.CHANNEL_IN_WRONG_STATE),
+        (4, const.MESSAGE_ASSIGN_CHANNEL, const.INVALID_PARAMETER_PROVIDED),
+    ]
+    assert simulator.open_channels == [0]
+
+
+def test_capabilities(simulator):
+    _send(simulator, RequestMessage(0, const.MESSAGE_CAPABILITIES))
+
+    capabilities = _receive(simulator)[0]
+
+    assert isinstance(capabilities, CapabilitiesMessage)
+    assert (capabilities.max_channels, capabilities.max_networks) == (4, 8)
+
+
+def test_close_and_unassign(simulator):
+    _open_channel(simulator, 0, DEVICE_TYPE_HEART_RATE)
+    _send(simulator, UnassignChannelMessage(0), CloseChannelMessage(0), UnassignChannelMessage(0))
+
+    responses = [(message.response_message_id, message.response_message_code) for message in _receive(simulator)]
+
+    assert responses == [
+        (const.MESSAGE_UNASSIGN_CHANNEL, const.CHANNEL_IN_WRONG_STATE),
+        (const.MESSAGE_CLOSE_CHANNEL, const.RESPONSE_NO_ERROR),
+        (const.CHANNEL_EVENT_MESSAGE_ID, const.EVENT_CHANNEL_CLOSED),
+        (const.MESSAGE_UNASSIGN_CHANNEL, const.RESPONSE_NO_ERROR),
+    ]
+    assert simulator.open_channels == []
+
+
+def test_channels_pair_with_different_sensors(simulator, clock):
+    _open_channel(simulator, 0, DEVICE_TYPE_HEART_RATE)
+    _open_channel(simulator, 1, DEVICE_TYPE_HEART_RATE)
+    _open_channel(simulator, 2, DEVICE_TYPE_HEART_RATE)
+    _open_channel(simulator, 3, DEVICE_TYPE_BIKE_POWER, device_number=3)
+
+    clock.time += 1
+    broadcasts = [message for message in _receive(simulator) if isinstance(message, BroadcastDataMessage)]
+
+    # Heart rate monitors and power meters broadcast about 4 times per second, channel 2 has no sensor left
+    assert [sum(message.channel_number == channel_number for message in broadcasts) for channel_number in range(4)] \
+        == [4, 4, 0, 4]
+    assert all(message.channel_id is None for message in broadcasts)
+
+
+def test_scan_mode_extended_messages(simulator, clock):
+    _send(simulator, AssignChannelMessage(0, 0, 0), SetChannelIdMessage(0, 0, DEVICE_TYPE_HEART_RATE, 0),
+          EnableExtendedMessagesMessage(True), OpenRxScanModeMessage(0))
+    _receive(simulator)
+
+    clock.time += 0.5
+    broadcasts = _receive(simulator)
+
+    assert {(message.channel_id, message.rssi) for message in broadcasts} == {
+        ((DEVICE_TYPE_HEART_RATE, 1, 1), -60),
+        ((DEVICE_TYPE_HEART_RATE, 2, 1), -70),
+    }
+    assert len(broadcasts) == 4
+
+
+def test_rate_and_backlog(clock):
+    simulator = SimulatedDevice([VirtualHeartRateMonitor(1, rate=100)], idle_timeout=0.001, max_backlog=0.5,
+                                clock=clock)
+    _open_channel(simulator, 0, DEVICE_TYPE_HEART_RATE)
+
+    clock.time += 0.505
+    assert len(_receive(simulator)) == 50
+
+    # Broadcasts that are more than the max backlog late are dropped
+    clock.time += 10
+    assert len(_receive(simulator)) == 1
+
+
+def test_read_into_buffer(simulator):
+    _send(simulator, RequestMessage(0, const.MESSAGE_CAPABILITIES))
+    buffer = array.array('B', bytes(0x40))
+
+    assert simulator.endpoint_in.read(buffer) == 10
+    assert buffer[:3].tobytes() == bytes([const.MESSAGE_SYNC, 6, const.MESSAGE_CAPABILITIES])
+
+    with pytest.raises(usb.core.USBError):
+        simulator.endpoint_in.read(buffer)
+
+
+def test_heart_rate_monitor_payload():
+    sensor = VirtualHeartRateMonitor(1, heart_rate=60)
+    fields = HeartRateMonitorProfile([0] * 8).decode(sensor.broadcast(2.5))
+
+    assert fields == {'heart_beat_event_time': 2048, 'heart_beat_count': 2, 'heart_rate': 60}
+    assert sensor.rate == pytest.approx(4.06, abs=0.01)
+
+
+def test_power_meter_payload():
+    sensor = VirtualPowerMeter(1, power=300, cadence=85)
+    sensor.broadcast(0.25)
+    payload = sensor.broadcast(0.5)
+
+    assert payload == bytes([0x10, 2, 0xFF, 85, 600 & 0xFF, 600 >> 8, 300 & 0xFF, 300 >> 8])
+
+
+def test_speed_cadence_payload():
+    sensor = VirtualSpeedCadenceSensor(1, speed=37.728, cadence=60)
+    payload = sensor.broadcast(10.01)
+
+    # 10 crank revolutions, and 50 wheel revolutions of 2.096 meters at 10.48 m/s
+    assert payload[2] | payload[3] << 8 == 10
+    assert payload[6] | payload[7] << 8 == 50
+    assert payload[0] | payload[1] << 8 == 10240
@@ -0,0 +1,181 @@
+import time
+from collections import deque
+from threading import Event, Thread
+from typing import Deque
+
+import pytest
+import pytest_mock
+import usb.core
+
+from lightuptraining.sources.antplus.messages import const
+from lightuptraining.sources.antplus.messages.util import calculate_checksum
+from lightuptraining.sources.antplus.node.node import Node
+from lightuptraining.sources.antplus.profiles.heart_rate_monitor import HeartRateMonitorProfile
+from lightuptraining.sources.antplus.usbdevice.device import USBDevice
+from lightuptraining.sources.antplus.usbdevice.supervisor import DeviceSupervisor
+
+OPEN_CHANNEL = b'\xa4\x01K\x01\xef'
+NETWORK_KEY = [1, 2, 3, 4, 5, 6, 7, 8]
+
+
+def _frame(message_id: int, *content: int) -> bytes:
+    frame = [0xA4, len(content), message_id, *content]
+    return bytes(frame + [calculate_checksum(frame)])
+
+
+def _configuration_responses(profile: HeartRateMonitorProfile, channel_number: int) -> bytes:
+    return b''.join(_frame(const.MESSAGE_CHANNEL_RESPONSE, message.content[0], message.message_id, 0)
+                    for message in profile.configuration_messages(channel_number))
+
+
+class FakeEndpoint:
+    """
+    Endpoint of a fake USB backend, which can be unplugged
+    """
+    wMaxPacketSize = 0x40  # noqa
+
+    def __init__(self):
+        self.chunks: Deque[bytes] = deque()
+        self.plugged_in = True
+
+    def read(self, size: int) -> bytes:
+        if not self.plugged_in:
+            raise usb.core.USBError('Input/Output Error', errno=5)
+
+        if not self.chunks:
+            time.sleep(0.001)
+            raise usb.core.USBError('Operation timed out', errno=110)
+
+        return self.chunks.popleft()
+
+    def write(self, data: bytes, timeout=None) -> int:
+        return len(data)
+
+
+@pytest.fixture()
+def endpoint(mocker: pytest_mock.MockerFixture) -> FakeEndpoint:
+    endpoint = FakeEndpoint()
+
+    def find(**kwargs):
+        return mocker.MagicMock() if endpoint.plugged_in else None
+
+    mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.core.find', side_effect=find)
+    mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.util.find_descriptor', return_value=endpoint)
+    mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.util.claim_interface')
+    mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.util.release_interface',
+                 side_effect=usb.core.USBError('No such device', errno=19))
+    mocker.patch('lightuptraining.sources.antplus.usbdevice.device.usb.control.get_interface', return_value=0)
+    return endpoint
+
+
+def _wait_until(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+
+        time.sleep(0.001)
+
+    return True
+
+
+def test_reconnect_after_unplug(endpoint):
+    device = USBDevice(0x01, 0x02)
+    device.open()
+    restored = []
+    supervisor = DeviceSupervisor(device, interval=0.01, callbacks=[lambda: restored.append(True)])
+    supervisor.start()
+
+    endpoint.plugged_in = False
+    unplugged_at = time.monotonic()
+    assert _wait_until(lambda: not device.is_open)
+
+    time.sleep(0.05)
+    endpoint.plugged_in = True
+
+    assert _wait_until(lambda: supervisor.reconnects == 1)
+    downtime = time.monotonic() - unplugged_at
+    supervisor.stop()
+    supervisor.join()
+
+    assert device.is_open
+    assert restored == [True]
+    # Unplugged for 50 ms, the supervisor checks every 10 ms
+    assert downtime < 0.5
+    assert supervisor.last_downtime < downtime
+
+    # Data is read by the new read thread
+    frames = []
+    endpoint.chunks.append(OPEN_CHANNEL)
+
+    assert _wait_until(lambda: bool(frames.extend(device.read_frames(0.01))) or frames == [OPEN_CHANNEL])
+    device._usb_read_thread.stop()
+
+
+def test_supervisor_does_not_reconnect_open_device(endpoint, mocker: pytest_mock.MockerFixture):
+    device = USBDevice(0x01, 0x02)
+    device.open()
+    mocked_reconnect = mocker.patch.object(device, 'reconnect')
+    supervisor = DeviceSupervisor(device, interval=0.01)
+    supervisor.start()
+
+    time.sleep(0.05)
+    supervisor.stop()
+    supervisor.join()
+    device._usb_read_thread.stop()
+
+    mocked_reconnect.assert_not_called()
+    assert supervisor.reconnects == 0
+
+
+def test_failing_callback(endpoint, mocker: pytest_mock.MockerFixture):
+    device = USBDevice(0x01, 0x02)
+    mocker.patch.object(device, 'reconnect')
+    supervisor = DeviceSupervisor(device, callbacks=[mocker.MagicMock(side_effect=ValueError('failed'))])
+
+    assert supervisor._reconnect(time.monotonic())
+    assert supervisor.reconnects == 1
+
+
+def test_node_processes_through_unplug(endpoint):
+    device = USBDevice(0x01, 0x02)
+    device.open()
+    endpoint.chunks.append(_frame(const.MESSAGE_CAPABILITIES, 1, 1, 0, 0, 0, 0))
+    node = Node(device)
+    profile = HeartRateMonitorProfile(NETWORK_KEY)
+    heart_rates = []
+    channel_number = node.allocate(profile, lambda message: heart_rates.extend(getattr(message, 'payload', b'')[7:]))
+    endpoint.chunks.append(_configuration_responses(profile, channel_number))
+    node.open_channels()
+    supervisor = node.supervise(interval=0.01)
+    stopped = Event()
+    errors = []
+
+    def process():
+        try:
+            while not stopped.is_set():
+                node.process(0.01)
+        except Exception as e:  # noqa, the test fails on any exception of the processing loop
+            errors.append(e)
+
+    thread = Thread(target=process)
+    thread.start()
+
+    endpoint.plugged_in = False
+    assert _wait_until(lambda: not device.is_open)
+    time.sleep(0.05)
+
+    # The configuration is sent again after reconnecting, followed by data of the sensor
+    endpoint.chunks.append(_configuration_responses(profile, channel_number))
+    endpoint.chunks.append(_frame(const.MESSAGE_BROADCAST_DATA, channel_number, 0, 0, 0, 0, 0, 0, 0, 72))
+    endpoint.plugged_in = True
+
+    assert _wait_until(lambda: heart_rates == [72] or bool(errors))
+    stopped.set()
+    thread.join()
+    node.close()
+
+    assert errors == []
+    assert supervisor.reconnects == 1
+    assert not supervisor.is_alive()
@@ -1,31 +1,31 @@
-from queue import Queue
-from typing import Union
+import array
 
 import pytest_mock
 import usb.core
 
-from lightuptraining.sources.antplus.usbdevice.thread import USBThread
+from lightuptraining.sources.antplus.usbdevice.buffer import RingBuffer
+from lightuptraining.sources.antplus.usbdevice.thread import BufferedUSBThread, USBThread
 
 
 def test_usb_thread(mocker: pytest_mock.MockerFixture):
     mock_device = mocker.MagicMock()
-    queue: Queue[Union[int, None]] = Queue()
-    thread = USBThread(mock_device, 1, queue)
+    buffer = RingBuffer()
+    thread = USBThread(mock_device, 1, buffer)
 
     # use side effect to return True the first iteration, and False the second time to break out of while loop
     mocked_try_read = mocker.patch.object(thread, '_try_read', side_effect=[True, False])
 
     thread.run()
 
-    assert None in queue.queue
+    assert buffer.closed
     assert mocked_try_read.call_count == 2
     mock_device.close.assert_called_once()
 
 
 def test_usb_thread_usb_error(mocker: pytest_mock.MockerFixture):
     mock_device = mocker.MagicMock()
-    queue: Queue[Union[int, None]] = Queue()
-    thread = USBThread(mock_device, 1, queue)
+    buffer = RingBuffer()
+    thread = USBThread(mock_device, 1, buffer)
 
     mock_err = usb.core.USBError('mock USB err', errno=1)
 
@@ -36,7 +36,7 @@ def test_usb_thread_usb_error(mocker: pytest_mock.MockerFixture):
 
     thread.run()
 
-    assert None in queue.queue
+    assert buffer.closed
     mocked_try_read.assert_called_once()
     mocked_handle_exception.assert_called_once_with(mock_err)
     mock_device.close.assert_called_once()
@@ -44,8 +44,8 @@ def test_usb_thread_usb_error(mocker: pytest_mock.MockerFixture):
 
 def test__handle_exception_timeout_error_errno60(mocker: pytest_mock.MockerFixture):
     mock_device = mocker.MagicMock()
-    queue: Queue[Union[int, None]] = Queue()
-    thread = USBThread(mock_device, 1, queue)
+    buffer = RingBuffer()
+    thread = USBThread(mock_device, 1, buffer)
     mocked_stop = mocker.patch.object(thread, 'stop')
 
     mock_err_60 = usb.core.USBError('mock USB err', errno=60)
@@ -57,8 +57,8 @@ def test__handle_exception_timeout_error_errno60(mocker: pytest_mock.MockerFixtu
 
 def test__handle_exception_timeout_error_errno110(mocker: pytest_mock.MockerFixture):
     mock_device = mocker.MagicMock()
-    queue: Queue[Union[int, None]] = Queue()
-    thread = USBThread(mock_device, 1, queue)
+    buffer = RingBuffer()
+    thread = USBThread(mock_device, 1, buffer)
     mocked_stop = mocker.patch.object(thread, 'stop')
 
     mock_err_110 = usb.core.USBError('mock USB err', errno=110)
@@ -70,8 +70,8 @@ def test__handle_exception_timeout_error_errno110(mocker: pytest_mock.MockerFixt
 
 def test__handle_exception_timeout_error_errno59(mocker: pytest_mock.MockerFixture):
     mock_device = mocker.MagicMock()
-    queue: Queue[Union[int, None]] = Queue()
-    thread = USBThread(mock_device, 1, queue)
+    buffer = RingBuffer()
+    thread = USBThread(mock_device, 1, buffer)
     mocked_stop = mocker.patch.object(thread, 'stop')
 
     mock_err_59 = usb.core.USBError('mock USB err', errno=59)
@@ -83,8 +83,8 @@ def test__handle_exception_timeout_error_errno59(mocker: pytest_mock.MockerFixtu
 
 def test__handle_exception_timeout_error_errno60_116(mocker: pytest_mock.MockerFixture):
     mock_device = mocker.MagicMock()
-    queue: Queue[Union[int, None]] = Queue()
-    thread = USBThread(mock_device, 1, queue)
+    buffer = RingBuffer()
+    thread = USBThread(mock_device, 1, buffer)
     mocked_stop = mocker.patch.object(thread, 'stop')
 
     mock_err_60 = usb.core.USBError('mock USB err', errno=60)
@@ -97,8 +97,8 @@ def test__handle_exception_timeout_error_errno60_116(mocker: pytest_mock.MockerF
 
 def test__handle_exception_timeout_error_errno110_116(mocker: pytest_mock.MockerFixture):
     mock_device = mocker.MagicMock()
-    queue: Queue[Union[int, None]] = Queue()
-    thread = USBThread(mock_device, 1, queue)
+    buffer = RingBuffer()
+    thread = USBThread(mock_device, 1, buffer)
     mocked_stop = mocker.patch.object(thread, 'stop')
 
     mock_err_110 = usb.core.USBError('mock USB err', errno=110)
@@ -111,8 +111,8 @@ def test__handle_exception_timeout_error_errno110_116(mocker: pytest_mock.Mocker
 
 def test__handle_exception_timeout_error_errno5(mocker: pytest_mock.MockerFixture):
     mock_device = mocker.MagicMock()
-    queue: Queue[Union[int, None]] = Queue()
-    thread = USBThread(mock_device, 1, queue)
+    buffer = RingBuffer()
+    thread = USBThread(mock_device, 1, buffer)
     mocked_stop = mocker.patch.object(thread, 'stop')
 
     mock_err_5 = usb.core.USBError('mock USB err', errno=5)
@@ -124,8 +124,8 @@ def test__handle_exception_timeout_error_errno5(mocker: pytest_mock.MockerFixtur
 
 def test__handle_exception_io_error(mocker: pytest_mock.MockerFixture):
     mock_device = mocker.MagicMock()
-    queue: Queue[Union[int, None]] = Queue()
-    thread = USBThread(mock_device, 1, queue)
+    buffer = RingBuffer()
+    thread = USBThread(mock_device, 1, buffer)
     mocked_stop = mocker.patch.object(thread, 'stop')
 
     mock_err_5 = usb.core.USBError('mock USB err', errno=5)
@@ -138,40 +138,79 @@ def test__handle_exception_io_error(mocker: pytest_mock.MockerFixture):
 
 def test__try_read(mocker: pytest_mock.MockerFixture):
     mock_device = mocker.MagicMock()
-    queue: Queue[Union[int, None]] = Queue()
-    thread = USBThread(mock_device, 1, queue)
+    buffer = RingBuffer()
+    thread = USBThread(mock_device, 1, buffer)
     mocked_stop = mocker.patch.object(thread, 'stop')
     mocked_endpoint_in = mocker.patch.object(thread, 'endpoint_in')
     mocked_endpoint_in.read.return_value = [1, 2, 3]
 
     assert thread._try_read()
-    assert queue.qsize() == 3
-    assert queue.get_nowait() == 1
-    assert queue.get_nowait() == 2
-    assert queue.get_nowait() == 3
+    assert len(buffer) == 3
+    assert buffer.get() == b'\x01\x02\x03'
 
     mocked_stop.assert_not_called()
 
 
 def test__try_read_no_data(mocker: pytest_mock.MockerFixture):
     mock_device = mocker.MagicMock()
-    queue: Queue[Union[int, None]] = Queue()
-    thread = USBThread(mock_device, 1, queue)
+    buffer = RingBuffer()
+    thread = USBThread(mock_device, 1, buffer)
     mocked_stop = mocker.patch.object(thread, 'stop')
     mocked_endpoint_in = mocker.patch.object(thread, 'endpoint_in')
     mocked_endpoint_in.read.return_value = []
 
     assert not thread._try_read()
-    assert queue.qsize() == 0
+    assert len(buffer) == 0
 
     mocked_stop.assert_called_once()
 
 
 def test_stop(mocker: pytest_mock.MockerFixture):
     mock_device = mocker.MagicMock()
-    queue: Queue[Union[int, None]] = Queue()
-    thread = USBThread(mock_device, 1, queue)
+    buffer = RingBuffer()
+    thread = USBThread(mock_device, 1, buffer)
 
     assert thread._run
     thread.stop()
     assert not thread._run
+
+
+def test_buffered_try_read(mocker: pytest_mock.MockerFixture):
+    mock_device = mocker.MagicMock()
+    buffer = RingBuffer()
+    thread = BufferedUSBThread(mock_device, 8, buffer)
+    mocked_endpoint_in = mocker.patch.object(thread, 'endpoint_in')
+
+    def read(target):
+        target[:3] = array.array('B', [1, 2, 3])
+        return 3
+
+    mocked_endpoint_in.read.side_effect = read
+
+    assert thread._try_read()
+    assert thread._try_read()
+    assert buffer.get() == b'\x01\x02\x03\x01\x02\x03'
+    assert len(mocked_endpoint_in.read.call_args.args[0]) == 8
+
+
+def test_buffered_try_read_no_data(mocker: pytest_mock.MockerFixture):
+    mock_device = mocker.MagicMock()
+    buffer = RingBuffer()
+    thread = BufferedUSBThread(mock_device, 8, buffer)
+    mocked_stop = mocker.patch.object(thread, 'stop')
+    mocked_endpoint_in = mocker.patch.object(thread, 'endpoint_in')
+    mocked_endpoint_in.read.return_value = 0
+
+    assert not thread._try_read()
+    assert len(buffer) == 0
+    mocked_stop.assert_called_once()
+
+
+def test__try_read_recorder(mocker: pytest_mock.MockerFixture):
+    recorder = mocker.MagicMock()
+    thread = USBThread(mocker.MagicMock(), 1, RingBuffer(), recorder)
+    mocked_endpoint_in = mocker.patch.object(thread, 'endpoint_in')
+    mocked_endpoint_in.read.return_value = [1, 2, 3]
+
+    assert thread._try_read()
+    recorder.record.assert_called_once_with([1, 2, 3])
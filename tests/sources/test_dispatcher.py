@@ -0,0 +1,189 @@
+from threading import Event
+
+import pytest
+
+from lightuptraining.sources.dispatcher import Dispatcher, OverflowPolicy
+from lightuptraining.sources.source import Source
+
+
+class Output:
+    def __init__(self):
+        self.values = []
+
+    def notify(self, value):
+        self.values.append(value)
+
+
+class BlockedOutput(Output):
+    """
+    Output that does not handle values until it is released, the first value is taken from the queue
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.released = Event()
+        self.started = Event()
+
+    def notify(self, value):
+        self.started.set()
+        self.released.wait(1)
+        super().notify(value)
+
+
+class FailingOutput:
+    def notify(self, value):
+        raise RuntimeError('light is unreachable')
+
+
+@pytest.fixture()
+def dispatcher():
+    dispatcher = Dispatcher(maxsize=2)
+    yield dispatcher
+    dispatcher.close()
+
+
+def _value(device_number: int, heart_rate: int):
+    return {'device_number': device_number, 'heart_rate': heart_rate}
+
+
+def _block(dispatcher: Dispatcher, output: BlockedOutput):
+    dispatcher.dispatch(_value(0, 0))
+    assert output.started.wait(1)
+
+
+def test_dispatch(dispatcher):
+    outputs = [Output(), Output()]
+
+    for output in outputs:
+        dispatcher.attach(output)
+
+    dispatcher.dispatch(_value(1, 60))
+    dispatcher.dispatch(_value(1, 61))
+
+    assert dispatcher.join(1)
+    assert [output.values for output in outputs] == [[_value(1, 60), _value(1, 61)]] * 2
+    assert dispatcher.metrics(outputs[0]).delivered == 2
+    assert dispatcher.outputs == outputs
+
+
+def test_slow_output_does_not_block_other_outputs(dispatcher):
+    slow, fast = BlockedOutput(), Output()
+    dispatcher.attach(slow)
+    dispatcher.attach(fast, policy=OverflowPolicy.BLOCK)
+    _block(dispatcher, slow)
+
+    for heart_rate in range(60, 70):
+        dispatcher.dispatch(_value(1, heart_rate))
+
+    assert dispatcher._worker(fast).wait_until_delivered(1)
+    assert len(fast.values) == 11
+
+    slow.released.set()
+    assert dispatcher.join(1)
+
+    # The queue holds 2 values, older values were dropped
+    assert slow.values == [_value(0, 0), _value(1, 68), _value(1, 69)]
+    metrics = dispatcher.metrics(slow)
+    assert (metrics.delivered, metrics.dropped, metrics.queued) == (3, 8, 0)
+    assert metrics.max_lag > 0
+
+
+def test_coalesce(dispatcher):
+    output = BlockedOutput()
+    dispatcher.attach(output, policy=OverflowPolicy.COALESCE)
+    _block(dispatcher, output)
+
+    dispatcher.dispatch(_value(1, 60))
+    dispatcher.dispatch(_value(2, 70))
+    dispatcher.dispatch(_value(1, 61))
+    dispatcher.dispatch(_value(2, 71))
+    dispatcher.dispatch(_value(3, 80))
+
+    output.released.set()
+    assert dispatcher.join(1)
+
+    # The latest value of every sensor replaces its queued value, sensor 3 does not fit and drops sensor 1
+    assert output.values == [_value(0, 0), _value(2, 71), _value(3, 80)]
+    assert (dispatcher.metrics(output).coalesced, dispatcher.metrics(output).dropped) == (2, 1)
+
+
+def test_coalesce_keeps_dispatch_order(dispatcher):
+    output = BlockedOutput()
+    dispatcher.attach(output, maxsize=3, policy=OverflowPolicy.COALESCE)
+    _block(dispatcher, output)
+
+    dispatcher.dispatch(_value(1, 60))
+    dispatcher.dispatch(_value(2, 70))
+    dispatcher.dispatch(_value(1, 61))
+
+    output.released.set()
+    assert dispatcher.join(1)
+
+    assert output.values == [_value(0, 0), _value(2, 70), _value(1, 61)]
+
+
+def test_block(dispatcher):
+    output = BlockedOutput()
+    dispatcher.attach(output, maxsize=1, policy=OverflowPolicy.BLOCK)
+    _block(dispatcher, output)
+    dispatcher.dispatch(_value(1, 60))
+
+    assert not dispatcher.join(0.01)
+
+    output.released.set()
+    dispatcher.dispatch(_value(1, 61))
+
+    assert dispatcher.join(1)
+    assert output.values == [_value(0, 0), _value(1, 60), _value(1, 61)]
+    assert dispatcher.metrics(output).dropped == 0
+
+
+def test_failing_output(dispatcher):
+    failing, output = FailingOutput(), Output()
+    dispatcher.attach(failing)
+    dispatcher.attach(output)
+
+    dispatcher.dispatch(_value(1, 60))
+    dispatcher.dispatch(_value(1, 61))
+
+    assert dispatcher.join(1)
+    assert len(output.values) == 2
+    assert dispatcher.metrics(failing).errors == 2
+
+
+def test_remove(dispatcher):
+    output = Output()
+    dispatcher.attach(output)
+    dispatcher.remove(output)
+    dispatcher.dispatch(_value(1, 60))
+
+    assert len(dispatcher) == 0
+    assert output.values == []
+
+    with pytest.raises(ValueError) as wrapped_e:
+        dispatcher.metrics(output)
+
+    assert 'is not attached' in str(wrapped_e.value)
+
+
+def test_invalid_max_size(dispatcher):
+    with pytest.raises(ValueError) as wrapped_e:
+        Dispatcher(maxsize=0)
+
+    assert 'max size must be greater than 0' in str(wrapped_e.value)
+
+    with pytest.raises(ValueError):
+        dispatcher.attach(Output(), maxsize=0)
+
+
+def test_sources_do_not_share_outputs():
+    sources = [Source(), Source()]
+    output = Output()
+    sources[0].attach_output(output)
+    sources[1]._notify(_value(1, 60))
+
+    assert sources[1].dispatcher.outputs == []
+    assert sources[0].dispatcher.join(1)
+    assert output.values == []
+
+    sources[0].remove_output(output)